@@ -13,6 +13,14 @@ from routes.clinicalrecords import clinical_records_bp # Importa el blueprint de
 from routes.dashboard import dashboard_bp   # Dashboard
 from flask_cors import CORS                 # Añadido para habilitar CORS
 from routes.appointments import appointments_bp  #
+from routes.appointment_series import appointment_series_bp  # Citas recurrentes
+from routes.waitlist import waitlist_bp     # Lista de espera
+from routes.me import me_bp                 # Worklist del médico autenticado
+from routes.changes import changes_bp       # Feed de cambios para sincronización incremental
+from routes.events import events_bp         # Feed SSE de agenda y dashboard
+from routes.analytics import analytics_bp   # Analítica poblacional
+from utils.events import broker             # Difusión de eventos entre workers
+from utils.cache import cache               # Caché compartida (memory | sqlite | redis)
 
 load_dotenv()                              # Carga variables de entorno desde el archivo .env
 
@@ -37,12 +45,26 @@ app.config["JWT_TOKEN_LOCATION"] = ["headers"]                      # Donde busc
 app.config["JWT_HEADER_NAME"] = "Authorization"                     # Nombre del header
 app.config["JWT_HEADER_TYPE"] = "Bearer"                            # Tipo de autenticación
 
+# Caché: 'memory' (por proceso), 'sqlite' (archivo compartido por los workers del host) o 'redis'
+app.config["CACHE_BACKEND"] = os.getenv("CACHE_BACKEND", "memory")
+app.config["CACHE_URL"] = os.getenv("CACHE_URL")                    # Ruta del archivo SQLite o URL de Redis
+
+# Zona horaria que se anuncia en los feeds iCalendar (las citas se guardan en hora local)
+app.config["CALENDAR_TIMEZONE"] = os.getenv("CALENDAR_TIMEZONE", "America/Santiago")
+
+# Notificaciones (recordatorios y ofertas de lista de espera): 'log', 'smtp' o 'webhook'
+for key in ("REMINDER_NOTIFIER", "REMINDER_LOG_PATH", "REMINDER_WEBHOOK_URL", "REMINDER_WEBHOOK_TOKEN",
+            "SMTP_HOST", "SMTP_PORT", "SMTP_USERNAME", "SMTP_PASSWORD", "SMTP_SENDER"):
+    if os.getenv(key) is not None:
+        app.config[key] = os.getenv(key)
+
 # CORS
 CORS(app, resources={
     r"/*": {
         "origins": ["http://localhost:3000", "http://44.199.207.193:3000"],
         "methods": ["GET", "POST", "PUT", "DELETE"],
-        "allow_headers": ["Content-Type", "Authorization"]
+        "allow_headers": ["Content-Type", "Authorization", "If-None-Match", "If-Modified-Since"],
+        "expose_headers": ["ETag", "Last-Modified"]       # Necesario para peticiones condicionales desde el frontend
     }
 })
 
@@ -54,10 +76,18 @@ app.register_blueprint(patients_bp)       #
 app.register_blueprint(clinical_records_bp) #
 app.register_blueprint(dashboard_bp)        #
 app.register_blueprint(appointments_bp)     #
+app.register_blueprint(appointment_series_bp)   # Series de citas recurrentes
+app.register_blueprint(waitlist_bp)         # Lista de espera
+app.register_blueprint(me_bp)               # Worklist
+app.register_blueprint(changes_bp)          # Feed de cambios
+app.register_blueprint(events_bp)           # Eventos en vivo (SSE)
+app.register_blueprint(analytics_bp)        # Analítica
 
 jwt = JWTManager(app)                     # inicializar JWT
 
 db.init_app(app)                          # Inicializa la base de datos con la aplicación Flask
+broker.init_app(app)                      # Publica eventos tras cada commit (LISTEN/NOTIFY en PostgreSQL)
+cache.init_app(app)                       # Selecciona el backend de caché configurado
 
 # Ruta de inicio
 @app.route("/")
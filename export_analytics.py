@@ -0,0 +1,35 @@
+# export_analytics.py
+import argparse
+import os
+from app import app
+from utils.export import export_tables, EXPORT_TABLES, CHUNK_SIZE
+
+def main():
+    parser = argparse.ArgumentParser(description='Exportación de tablas a Parquet/Arrow para análisis')
+    parser.add_argument('directory', help='Directorio de destino (guarda también las marcas de agua)')
+    parser.add_argument('--tables', nargs='+', choices=list(EXPORT_TABLES), help='Tablas a exportar (por defecto todas)')
+    parser.add_argument('--incremental', action='store_true', help='Solo filas modificadas desde la última exportación')
+    parser.add_argument('--format', choices=['parquet', 'arrow'], default='parquet')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='Filas por bloque')
+    parser.add_argument('--pseudonymize', action='store_true',
+                        help='Reemplazar RUT y nombres por HMAC-SHA256 con la clave EXPORT_PSEUDONYM_KEY')
+    args = parser.parse_args()
+
+    pseudonym_key = None
+    if args.pseudonymize:
+        key = os.getenv('EXPORT_PSEUDONYM_KEY')
+        if not key:
+            parser.error('--pseudonymize requiere la variable de entorno EXPORT_PSEUDONYM_KEY')
+        pseudonym_key = key.encode('utf-8')
+
+    def progress(table, result):
+        print(f"{table}: {result['rows']} filas -> {result['file']}")
+
+    with app.app_context():
+        print("Exportando tablas...")
+        export_tables(args.directory, args.tables, args.incremental, args.format,
+                      args.chunk_size, pseudonym_key, progress)
+    print("\nExportación terminada")
+
+if __name__ == "__main__":
+    main()
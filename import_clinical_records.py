@@ -0,0 +1,48 @@
+# import_clinical_records.py
+import argparse
+import json
+import os
+from app import app
+from utils.patient_import import iter_rows
+from utils.record_import import import_records, CHUNK_SIZE
+
+def load_checkpoint(path):
+    if not os.path.exists(path):
+        return 0
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)['checkpoint']
+
+def save_checkpoint(path, report):
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'checkpoint': report['checkpoint'], 'inserted': report['inserted']}, f)
+    os.replace(tmp_path, path)          # Escritura atómica: un corte nunca deja el checkpoint a medias
+
+def main():
+    parser = argparse.ArgumentParser(description='Ingesta masiva de fichas clínicas históricas desde NDJSON')
+    parser.add_argument('path', help='Archivo .ndjson (una ficha por línea con patient_rut y doctor_email)')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='Fichas por lote')
+    parser.add_argument('--checkpoint', help='Archivo de checkpoint (por defecto <archivo>.checkpoint)')
+    parser.add_argument('--restart', action='store_true', help='Ignorar el checkpoint y comenzar desde el inicio')
+    args = parser.parse_args()
+
+    checkpoint_path = args.checkpoint or f'{args.path}.checkpoint'
+    resume_from = 0 if args.restart else load_checkpoint(checkpoint_path)
+    if resume_from:
+        print(f"Reanudando después de la línea {resume_from}")
+
+    def progress(report):
+        save_checkpoint(checkpoint_path, report)
+        print(f"Línea {report['checkpoint']} | insertadas: {report['inserted']} | errores: {report['error_count']}")
+
+    with app.app_context():
+        with open(args.path, encoding='utf-8-sig') as stream:
+            report = import_records(iter_rows(stream, 'ndjson'), chunk_size=args.chunk_size,
+                                    resume_from=resume_from, progress=progress)
+
+    print(f"\nIngesta terminada: {report['inserted']} fichas nuevas, {report['error_count']} filas con error")
+    for error in report['errors'][:20]:
+        print(f"  Línea {error['row']}: {error['error']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+# import_patients.py
+import argparse
+import json
+import os
+from app import app
+from utils.patient_import import iter_rows, import_patients, CHUNK_SIZE
+
+def main():
+    parser = argparse.ArgumentParser(description='Importación masiva de pacientes desde CSV o NDJSON')
+    parser.add_argument('path', help='Archivo .csv, .ndjson o .jsonl')
+    parser.add_argument('--format', choices=['csv', 'ndjson'], help='Formato (por defecto según la extensión)')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='Filas por lote')
+    parser.add_argument('--report', help='Guardar el reporte completo en este archivo JSON')
+    args = parser.parse_args()
+
+    fmt = args.format or {'.csv': 'csv', '.ndjson': 'ndjson', '.jsonl': 'ndjson'}.get(os.path.splitext(args.path)[1].lower())
+    if not fmt:
+        parser.error('No se pudo deducir el formato; use --format')
+
+    def progress(processed, inserted, duplicates, error_count):
+        print(f"Procesadas: {processed} | insertadas: {inserted} | duplicadas: {duplicates} | errores: {error_count}")
+
+    with app.app_context():
+        with open(args.path, encoding='utf-8-sig', newline='') as stream:
+            report = import_patients(iter_rows(stream, fmt), chunk_size=args.chunk_size, progress=progress)
+
+    print(f"\nImportación terminada: {report['inserted']} pacientes nuevos, "
+          f"{report['duplicates']} duplicados, {report['error_count']} filas con error")
+    for error in report['errors'][:20]:
+        print(f"  Fila {error['row']} ({error['rut']}): {error['error']}")
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"Reporte guardado en {args.report}")
+
+if __name__ == "__main__":
+    main()
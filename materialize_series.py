@@ -0,0 +1,21 @@
+# materialize_series.py
+import argparse
+import time
+from app import app
+from utils.series import materialize_all, MATERIALIZE_DAYS
+
+def main():
+    parser = argparse.ArgumentParser(description=f'Crea las citas de las series recurrentes dentro de los próximos {MATERIALIZE_DAYS} días')
+    parser.add_argument('--every', type=int, help='Repetir cada N horas (sin esta opción se ejecuta una vez)')
+    args = parser.parse_args()
+
+    while True:
+        with app.app_context():
+            metrics = materialize_all()
+        print(f"Series avanzadas: {metrics['series']} | citas creadas: {metrics['created']} | horizonte: {metrics['horizon']}")
+        if not args.every:
+            break
+        time.sleep(args.every * 3600)
+
+if __name__ == "__main__":
+    main()
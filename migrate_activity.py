@@ -0,0 +1,32 @@
+# migrate_activity.py
+from app import app
+from models import db
+from sqlalchemy import text
+
+def migrate_activity():
+    with app.app_context():
+        try:
+            print("Creando índices para series de actividad...")
+            
+            # Índices que cubren las columnas de cada serie: los conteos por bucket
+            # se resuelven con index-only scans, sin leer las filas
+            migration_sql = text('''
+            CREATE INDEX IF NOT EXISTS ix_patient_created_at ON patient(created_at);
+            CREATE INDEX IF NOT EXISTS ix_clinical_record_created_at ON clinical_record(created_at);
+            CREATE INDEX IF NOT EXISTS ix_appointment_date_status ON appointment(appointment_date, status);
+            CREATE INDEX IF NOT EXISTS ix_appointment_status_updated_at ON appointment(status, updated_at);
+            ''')
+            
+            db.session.execute(migration_sql)
+            db.session.commit()
+            
+            print("Índices creados exitosamente")
+            print("\nSeries de actividad listas para usar")
+            
+        except Exception as e:
+            print(f"Error durante la migración: {e}")
+            db.session.rollback()
+            raise
+
+if __name__ == "__main__":
+    migrate_activity()
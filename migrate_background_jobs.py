@@ -0,0 +1,38 @@
+# migrate_background_jobs.py
+from app import app
+from models import db
+from sqlalchemy import text
+
+def migrate_background_jobs():
+    with app.app_context():
+        try:
+            print("Creando tabla de trabajos en segundo plano...")
+
+            # El estado de los trabajos se comparte entre workers a través de la base de datos
+            migration_sql = text('''
+            CREATE TABLE IF NOT EXISTS background_job (
+                id VARCHAR(32) PRIMARY KEY,
+                kind VARCHAR(50) NOT NULL,
+                status VARCHAR(20) NOT NULL DEFAULT 'pendiente',
+                progress TEXT,
+                result TEXT,
+                error TEXT,
+                created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+            );
+            CREATE INDEX IF NOT EXISTS ix_background_job_created_at ON background_job(created_at);
+            ''')
+
+            db.session.execute(migration_sql)
+            db.session.commit()
+
+            print("Migración completada exitosamente")
+            print("\nGET /patients/purge-jobs/<id> responde desde cualquier worker")
+
+        except Exception as e:
+            print(f"Error durante la migración: {e}")
+            db.session.rollback()
+            raise
+
+if __name__ == "__main__":
+    migrate_background_jobs()
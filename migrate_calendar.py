@@ -0,0 +1,36 @@
+# migrate_calendar.py
+from app import app
+from models import db
+from sqlalchemy import text
+
+def migrate_calendar():
+    with app.app_context():
+        try:
+            print("Creando tabla de tokens de calendario...")
+            
+            # Solo se guarda el hash del token; el feed filtra las citas por médico y fecha
+            migration_sql = text('''
+            CREATE TABLE IF NOT EXISTS calendar_feed_token (
+                id SERIAL PRIMARY KEY,
+                doctor_id INTEGER NOT NULL REFERENCES "user"(id) ON DELETE CASCADE,
+                token_hash VARCHAR(64) NOT NULL UNIQUE,
+                created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                last_used_at TIMESTAMP,
+                revoked_at TIMESTAMP
+            );
+            CREATE INDEX IF NOT EXISTS ix_calendar_feed_token_doctor_id ON calendar_feed_token(doctor_id);
+            ''')
+            
+            db.session.execute(migration_sql)
+            db.session.commit()
+            
+            print("Migración completada exitosamente")
+            print("\nCada médico obtiene su URL con POST /appointments/doctor/<id>/calendar-token")
+            
+        except Exception as e:
+            print(f"Error durante la migración: {e}")
+            db.session.rollback()
+            raise
+
+if __name__ == "__main__":
+    migrate_calendar()
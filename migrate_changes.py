@@ -0,0 +1,32 @@
+# migrate_changes.py
+from app import app
+from models import db
+from sqlalchemy import text
+
+def migrate_changes():
+    with app.app_context():
+        try:
+            print("Preparando feed de cambios...")
+            
+            # La tabla deletion_log la crea db.create_all(); aquí solo se agregan
+            # los índices de updated_at en tablas que ya existían
+            migration_sql = text('''
+            CREATE INDEX IF NOT EXISTS ix_patient_updated_at ON patient(updated_at);
+            CREATE INDEX IF NOT EXISTS ix_clinical_record_updated_at ON clinical_record(updated_at);
+            CREATE INDEX IF NOT EXISTS ix_appointment_updated_at ON appointment(updated_at);
+            CREATE INDEX IF NOT EXISTS ix_task_updated_at ON task(updated_at);
+            ''')
+            
+            db.session.execute(migration_sql)
+            db.session.commit()
+            
+            print("Índices de updated_at creados exitosamente")
+            print("\nFeed de cambios listo para usar")
+            
+        except Exception as e:
+            print(f"Error durante la migración: {e}")
+            db.session.rollback()
+            raise
+
+if __name__ == "__main__":
+    migrate_changes()
@@ -0,0 +1,38 @@
+# migrate_patient_cascade.py
+from app import app
+from models import db
+from sqlalchemy import text
+
+def migrate_patient_cascade():
+    with app.app_context():
+        try:
+            print("Configurando eliminación en cascada de pacientes...")
+            
+            # Las fichas y citas se eliminan en la base de datos junto con el paciente,
+            # sin que SQLAlchemy tenga que cargarlas (passive_deletes)
+            migration_sql = text('''
+            ALTER TABLE clinical_record DROP CONSTRAINT IF EXISTS clinical_record_patient_id_fkey;
+            ALTER TABLE clinical_record ADD CONSTRAINT clinical_record_patient_id_fkey
+                FOREIGN KEY (patient_id) REFERENCES patient(id) ON DELETE CASCADE;
+            
+            ALTER TABLE appointment DROP CONSTRAINT IF EXISTS appointment_patient_id_fkey;
+            ALTER TABLE appointment ADD CONSTRAINT appointment_patient_id_fkey
+                FOREIGN KEY (patient_id) REFERENCES patient(id) ON DELETE CASCADE;
+            
+            -- La cascada necesita índice sobre la FK para no recorrer la tabla completa
+            CREATE INDEX IF NOT EXISTS ix_clinical_record_patient_id ON clinical_record(patient_id);
+            ''')
+            
+            db.session.execute(migration_sql)
+            db.session.commit()
+            
+            print("Claves foráneas actualizadas con ON DELETE CASCADE")
+            print("\nEliminación de pacientes lista para usar")
+            
+        except Exception as e:
+            print(f"Error durante la migración: {e}")
+            db.session.rollback()
+            raise
+
+if __name__ == "__main__":
+    migrate_patient_cascade()
@@ -0,0 +1,35 @@
+# migrate_reminders.py
+from app import app
+from models import db
+from sqlalchemy import text
+
+def migrate_reminders():
+    with app.app_context():
+        try:
+            print("Creando tabla de recordatorios enviados...")
+
+            # La clave única evita enviar dos veces un recordatorio (reinicios, ejecuciones con --once)
+            migration_sql = text('''
+            CREATE TABLE IF NOT EXISTS reminder_claim (
+                id SERIAL PRIMARY KEY,
+                appointment_id INTEGER NOT NULL REFERENCES appointment(id) ON DELETE CASCADE,
+                kind VARCHAR(10) NOT NULL,
+                appointment_date TIMESTAMP NOT NULL,
+                claimed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                CONSTRAINT uq_reminder_claim UNIQUE (appointment_id, kind, appointment_date)
+            );
+            CREATE INDEX IF NOT EXISTS ix_reminder_claim_appointment_date ON reminder_claim(appointment_date);
+            ''')
+
+            db.session.execute(migration_sql)
+            db.session.commit()
+
+            print("Migración completada exitosamente")
+
+        except Exception as e:
+            print(f"Error durante la migración: {e}")
+            db.session.rollback()
+            raise
+
+if __name__ == "__main__":
+    migrate_reminders()
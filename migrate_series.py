@@ -0,0 +1,57 @@
+# migrate_series.py
+from app import app
+from models import db
+from sqlalchemy import text
+
+def migrate_series():
+    with app.app_context():
+        try:
+            print("Creando tabla de series de citas recurrentes...")
+            
+            # La serie guarda la regla; appointment solo tiene filas dentro del horizonte de
+            # materialización, vinculadas a su ocurrencia por (series_id, original_date)
+            migration_sql = text('''
+            CREATE TABLE IF NOT EXISTS appointment_series (
+                id SERIAL PRIMARY KEY,
+                patient_id INTEGER NOT NULL REFERENCES patient(id) ON DELETE CASCADE,
+                doctor_name VARCHAR(120) NOT NULL,
+                doctor_email VARCHAR(120) NOT NULL,
+                doctor_role VARCHAR(50) NOT NULL,
+                doctor_id_snapshot INTEGER,
+                rrule VARCHAR(255) NOT NULL,
+                dtstart TIMESTAMP NOT NULL,
+                until TIMESTAMP,
+                exdates TEXT,
+                materialized_until TIMESTAMP NOT NULL,
+                duration_minutes INTEGER DEFAULT 30,
+                appointment_type VARCHAR(100) NOT NULL,
+                reason TEXT NOT NULL,
+                observations TEXT,
+                status VARCHAR(20) NOT NULL DEFAULT 'activa',
+                created_by_name VARCHAR(120) NOT NULL,
+                created_by_role VARCHAR(50) NOT NULL,
+                created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+            );
+            
+            CREATE INDEX IF NOT EXISTS ix_appointment_series_patient_id ON appointment_series(patient_id);
+            CREATE INDEX IF NOT EXISTS ix_appointment_series_doctor_range ON appointment_series(doctor_id_snapshot, dtstart, until);
+            
+            ALTER TABLE appointment ADD COLUMN IF NOT EXISTS series_id INTEGER REFERENCES appointment_series(id) ON DELETE SET NULL;
+            ALTER TABLE appointment ADD COLUMN IF NOT EXISTS original_date TIMESTAMP;
+            CREATE INDEX IF NOT EXISTS ix_appointment_series_original ON appointment(series_id, original_date);
+            ''')
+            
+            db.session.execute(migration_sql)
+            db.session.commit()
+            
+            print("Migración completada exitosamente")
+            print("\nProgramar materialize_series.py una vez al día para avanzar el horizonte de las series")
+            
+        except Exception as e:
+            print(f"Error durante la migración: {e}")
+            db.session.rollback()
+            raise
+
+if __name__ == "__main__":
+    migrate_series()
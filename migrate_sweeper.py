@@ -0,0 +1,29 @@
+# migrate_sweeper.py
+from app import app
+from models import db
+from sqlalchemy import text
+
+def migrate_sweeper():
+    with app.app_context():
+        try:
+            print("Creando índice para el barrido de citas...")
+            
+            # El barrido busca citas por estado y fecha; las consultas de agenda y de
+            # conflictos filtran por los mismos estados activos
+            migration_sql = text('''
+            CREATE INDEX IF NOT EXISTS ix_appointment_status_date ON appointment(status, appointment_date);
+            ''')
+            
+            db.session.execute(migration_sql)
+            db.session.commit()
+            
+            print("Índice creado exitosamente")
+            print("\nEstado 'no_asistio' disponible; programe sweep_appointments.py (p. ej. cada 15 minutos)")
+            
+        except Exception as e:
+            print(f"Error durante la migración: {e}")
+            db.session.rollback()
+            raise
+
+if __name__ == "__main__":
+    migrate_sweeper()
@@ -0,0 +1,50 @@
+# migrate_vitals.py
+from app import app
+from models import db
+from sqlalchemy import text
+
+BACKFILL_BATCH_SIZE = 10000
+
+def migrate_vitals():
+    with app.app_context():
+        try:
+            print("Agregando columnas numéricas de presión arterial...")
+            
+            migration_sql = text('''
+            ALTER TABLE clinical_record ADD COLUMN IF NOT EXISTS systolic_bp INTEGER;
+            ALTER TABLE clinical_record ADD COLUMN IF NOT EXISTS diastolic_bp INTEGER;
+            
+            -- Serie de signos vitales: fichas de un paciente ordenadas por fecha
+            CREATE INDEX IF NOT EXISTS ix_clinical_record_patient_visit_date ON clinical_record(patient_id, visit_date);
+            ''')
+            
+            db.session.execute(migration_sql)
+            db.session.commit()
+            
+            # Poblar las columnas desde el texto "120/80" por rangos de id (transacciones cortas)
+            print("Completando fichas existentes...")
+            backfill_sql = text(r'''
+            UPDATE clinical_record
+            SET systolic_bp = (regexp_match(blood_pressure, '^\s*(\d{2,3})\s*/\s*(\d{2,3})'))[1]::int,
+                diastolic_bp = (regexp_match(blood_pressure, '^\s*(\d{2,3})\s*/\s*(\d{2,3})'))[2]::int
+            WHERE id > :start AND id <= :end
+              AND systolic_bp IS NULL
+              AND blood_pressure ~ '^\s*\d{2,3}\s*/\s*\d{2,3}'
+            ''')
+            
+            max_id = db.session.execute(text('SELECT COALESCE(MAX(id), 0) FROM clinical_record')).scalar()
+            updated = 0
+            for start in range(0, max_id, BACKFILL_BATCH_SIZE):
+                updated += db.session.execute(backfill_sql, {'start': start, 'end': start + BACKFILL_BATCH_SIZE}).rowcount
+                db.session.commit()
+            
+            print(f"Presión arterial completada en {updated} fichas")
+            print("\nSerie de signos vitales lista para usar")
+            
+        except Exception as e:
+            print(f"Error durante la migración: {e}")
+            db.session.rollback()
+            raise
+
+if __name__ == "__main__":
+    migrate_vitals()
@@ -0,0 +1,66 @@
+# migrate_waitlist.py
+from app import app
+from models import db
+from sqlalchemy import text
+
+def migrate_waitlist():
+    with app.app_context():
+        try:
+            print("Creando tablas de lista de espera...")
+            
+            # Las ventanas se indexan como rangos (GiST): al liberarse una hora se buscan
+            # las ventanas que la contienen sin recorrer la lista de espera completa
+            migration_sql = text('''
+            ALTER TABLE "user" ADD COLUMN IF NOT EXISTS specialty VARCHAR(100);
+            
+            CREATE TABLE IF NOT EXISTS waitlist_entry (
+                id SERIAL PRIMARY KEY,
+                patient_id INTEGER NOT NULL REFERENCES patient(id) ON DELETE CASCADE,
+                doctor_id INTEGER,
+                specialty VARCHAR(100),
+                priority INTEGER NOT NULL DEFAULT 0,
+                duration_minutes INTEGER NOT NULL DEFAULT 30,
+                appointment_type VARCHAR(100) NOT NULL,
+                reason TEXT NOT NULL,
+                notes TEXT,
+                status VARCHAR(20) NOT NULL DEFAULT 'activa',
+                offered_doctor_id INTEGER,
+                offered_date TIMESTAMP,
+                offered_duration INTEGER,
+                offer_expires_at TIMESTAMP,
+                appointment_id INTEGER REFERENCES appointment(id) ON DELETE SET NULL,
+                created_by_name VARCHAR(120) NOT NULL,
+                created_by_role VARCHAR(50) NOT NULL,
+                created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+            );
+            CREATE INDEX IF NOT EXISTS ix_waitlist_entry_patient_id ON waitlist_entry(patient_id);
+            CREATE INDEX IF NOT EXISTS ix_waitlist_entry_status_priority ON waitlist_entry(status, priority, created_at);
+            
+            CREATE TABLE IF NOT EXISTS waitlist_window (
+                id SERIAL PRIMARY KEY,
+                entry_id INTEGER NOT NULL REFERENCES waitlist_entry(id) ON DELETE CASCADE,
+                doctor_id INTEGER,
+                specialty VARCHAR(100),
+                window_start TIMESTAMP NOT NULL,
+                window_end TIMESTAMP NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS ix_waitlist_window_entry_id ON waitlist_window(entry_id);
+            CREATE INDEX IF NOT EXISTS ix_waitlist_window_doctor_end ON waitlist_window(doctor_id, window_end);
+            CREATE INDEX IF NOT EXISTS ix_waitlist_window_specialty_end ON waitlist_window(specialty, window_end);
+            CREATE INDEX IF NOT EXISTS ix_waitlist_window_range ON waitlist_window USING gist (tsrange(window_start, window_end));
+            ''')
+            
+            db.session.execute(migration_sql)
+            db.session.commit()
+            
+            print("Migración completada exitosamente")
+            print("\nAsigne la especialidad de cada médico (PUT /users/<id> con 'specialty') para las solicitudes por especialidad")
+            
+        except Exception as e:
+            print(f"Error durante la migración: {e}")
+            db.session.rollback()
+            raise
+
+if __name__ == "__main__":
+    migrate_waitlist()
@@ -0,0 +1,30 @@
+# migrate_worklist.py
+from app import app
+from models import db
+from sqlalchemy import text
+
+def migrate_worklist():
+    with app.app_context():
+        try:
+            print("Creando índices por médico...")
+            
+            # /me/worklist, el feed de calendario y la verificación de conflictos leen
+            # rangos de fechas de un solo médico
+            migration_sql = text('''
+            CREATE INDEX IF NOT EXISTS ix_appointment_doctor_date ON appointment(doctor_id_snapshot, appointment_date);
+            CREATE INDEX IF NOT EXISTS ix_clinical_record_doctor_visit_date ON clinical_record(doctor_id_snapshot, visit_date);
+            ''')
+            
+            db.session.execute(migration_sql)
+            db.session.commit()
+            
+            print("Índices creados exitosamente")
+            print("\nWorklist disponible en GET /me/worklist")
+            
+        except Exception as e:
+            print(f"Error durante la migración: {e}")
+            db.session.rollback()
+            raise
+
+if __name__ == "__main__":
+    migrate_worklist()
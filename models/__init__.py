@@ -5,6 +5,13 @@ from .responsible import Responsible
 from .patient import Patient
 from .clinicalrecord import ClinicalRecord
 from .appointment import Appointment
+from .appointmentseries import AppointmentSeries
+from .deletionlog import DeletionLog
+from .patientrollup import PatientRollup
+from .waitlist import WaitlistEntry, WaitlistWindow
+from .calendarfeedtoken import CalendarFeedToken
+from .backgroundjob import BackgroundJob
+from .reminderclaim import ReminderClaim
 
     # Lista de todos los modelos exportados
-__all__ = ['db', 'User', 'Task', 'Responsible', 'Patient', 'ClinicalRecord', 'Appointment']
\ No newline at end of file
+__all__ = ['db', 'User', 'Task', 'Responsible', 'Patient', 'ClinicalRecord', 'Appointment', 'AppointmentSeries', 'DeletionLog', 'PatientRollup', 'WaitlistEntry', 'WaitlistWindow', 'CalendarFeedToken', 'BackgroundJob', 'ReminderClaim']
\ No newline at end of file
@@ -1,12 +1,20 @@
 from models.db import db
 from datetime import datetime
+from utils.fields import model_fields, serialize_fields
 
 # Todo lo relacionado con Citas ->
 class Appointment(db.Model):
     __tablename__ = 'appointment'
+    __table_args__ = (
+        db.Index('ix_appointment_date_status', 'appointment_date', 'status'),       # Series de citas por estado (solo índice)
+        db.Index('ix_appointment_status_updated_at', 'status', 'updated_at'),      # Serie de cancelaciones
+        db.Index('ix_appointment_status_date', 'status', 'appointment_date'),      # Citas activas vencidas (barrido)
+        db.Index('ix_appointment_series_original', 'series_id', 'original_date'),  # Ocurrencias ya materializadas de una serie
+        db.Index('ix_appointment_doctor_date', 'doctor_id_snapshot', 'appointment_date'),  # Agenda de un médico (worklist, calendario, conflictos)
+    )
     
     id = db.Column(db.Integer, primary_key=True)
-    patient_id = db.Column(db.Integer, db.ForeignKey('patient.id'), nullable=False)
+    patient_id = db.Column(db.Integer, db.ForeignKey('patient.id', ondelete='CASCADE'), nullable=False)
     
     # Información inmutable del médico (igual que en fichas clínicas)
     doctor_name = db.Column(db.String(120), nullable=False)
@@ -21,22 +29,26 @@ class Appointment(db.Model):
     reason = db.Column(db.Text, nullable=False)  # Motivo de la cita
     
     # Estado de la cita
-    status = db.Column(db.String(20), default='pendiente', nullable=False)  # pendiente, confirmada, cancelada, completada
+    status = db.Column(db.String(20), default='pendiente', nullable=False)  # pendiente, confirmada, cancelada, completada, no_asistio
     
     # Información adicional
     observations = db.Column(db.Text)  # Observaciones adicionales
     cancellation_reason = db.Column(db.Text)  # Razón de cancelación si aplica
     
+    # Ocurrencia materializada de una serie recurrente (original_date identifica la ocurrencia aunque se reprograme)
+    series_id = db.Column(db.Integer, db.ForeignKey('appointment_series.id', ondelete='SET NULL'), nullable=True)
+    original_date = db.Column(db.DateTime, nullable=True)
+    
     # Usuario que creó/modificó la cita
     created_by_name = db.Column(db.String(120), nullable=False)
     created_by_role = db.Column(db.String(50), nullable=False)
     
     # Auditoría
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False, index=True)
     
-    # Relación con paciente
-    patient = db.relationship('Patient', backref='appointments')
+    # Relación con paciente (al eliminarlo, la base de datos elimina sus citas: ON DELETE CASCADE)
+    patient = db.relationship('Patient', backref=db.backref('appointments', cascade='all, delete-orphan', passive_deletes=True))
     
     def __repr__(self):
         return f'<Appointment {self.id} - Patient {self.patient_id} - {self.appointment_date}>'
@@ -62,7 +74,9 @@ class Appointment(db.Model):
             appointment_type=appointment_data.get('appointment_type'),
             reason=appointment_data.get('reason'),
             status=appointment_data.get('status', 'pendiente'),
-            observations=appointment_data.get('observations')
+            observations=appointment_data.get('observations'),
+            series_id=appointment_data.get('series_id'),
+            original_date=appointment_data.get('original_date')
         )
     
     def is_conflict_with(self, other_appointment):
@@ -79,7 +93,14 @@ class Appointment(db.Model):
         # Verificar si hay solapamiento
         return (self.appointment_date < other_end and self_end > other_appointment.appointment_date)
     
-    def to_dict(self):
+    # Campos calculados para ?fields= y las columnas que requieren
+    COMPUTED_FIELDS = {'patient_name': ['patient_id']}
+
+    def to_dict(self, fields=None):
+        if fields is not None:                              # Proyección (?fields=...)
+            return serialize_fields(self, fields, {
+                'patient_name': lambda appointment: appointment.patient.full_name if appointment.patient else None
+            })
         return {
             'id': self.id,
             'patient_id': self.patient_id,
@@ -99,6 +120,8 @@ class Appointment(db.Model):
             'status': self.status,
             'observations': self.observations,
             'cancellation_reason': self.cancellation_reason,
+            'series_id': self.series_id,
+            'original_date': self.original_date.isoformat() if self.original_date else None,
             
             # Información del creador
             'created_by_name': self.created_by_name,
@@ -110,4 +133,7 @@ class Appointment(db.Model):
         }
 
 # Importar timedelta para cálculo de conflictos
-from datetime import timedelta
\ No newline at end of file
+from datetime import timedelta
+
+# Campos disponibles para ?fields=
+Appointment.FIELDS = model_fields(Appointment, extra=Appointment.COMPUTED_FIELDS)
@@ -0,0 +1,150 @@
+import json
+from models.db import db
+from datetime import datetime, timedelta
+from utils.recurrence import parse_rrule, occurrences, last_occurrence
+
+# Serie de citas recurrentes: guarda la regla y no las citas. Las ocurrencias se calculan
+# para la ventana consultada y solo se crean filas en appointment dentro del horizonte
+# de materialización (ver utils/series.py).
+class AppointmentSeries(db.Model):
+    __tablename__ = 'appointment_series'
+    __table_args__ = (
+        db.Index('ix_appointment_series_doctor_range', 'doctor_id_snapshot', 'dtstart', 'until'),   # Series de un médico que tocan una ventana
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    patient_id = db.Column(db.Integer, db.ForeignKey('patient.id', ondelete='CASCADE'), nullable=False, index=True)
+
+    # Información inmutable del médico (igual que en citas)
+    doctor_name = db.Column(db.String(120), nullable=False)
+    doctor_email = db.Column(db.String(120), nullable=False)
+    doctor_role = db.Column(db.String(50), nullable=False)
+    doctor_id_snapshot = db.Column(db.Integer, nullable=True)
+
+    # Recurrencia
+    rrule = db.Column(db.String(255), nullable=False)          # FREQ=WEEKLY;BYDAY=MO,TH;COUNT=12
+    dtstart = db.Column(db.DateTime, nullable=False)           # Primera ocurrencia (fecha y hora de todas)
+    until = db.Column(db.DateTime, nullable=True)              # Última ocurrencia posible; NULL = sin fin
+    exdates = db.Column(db.Text)                               # Ocurrencias excluidas (JSON con fechas ISO)
+    materialized_until = db.Column(db.DateTime, nullable=False)  # Ocurrencias anteriores ya tienen su fila en appointment
+
+    # Datos que heredan las ocurrencias
+    duration_minutes = db.Column(db.Integer, default=30)
+    appointment_type = db.Column(db.String(100), nullable=False)
+    reason = db.Column(db.Text, nullable=False)
+    observations = db.Column(db.Text)
+
+    status = db.Column(db.String(20), default='activa', nullable=False)  # activa, finalizada
+
+    # Usuario que creó la serie
+    created_by_name = db.Column(db.String(120), nullable=False)
+    created_by_role = db.Column(db.String(50), nullable=False)
+
+    # Auditoría
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    patient = db.relationship('Patient', backref=db.backref('appointment_series', cascade='all, delete-orphan', passive_deletes=True))
+
+    def __repr__(self):
+        return f'<AppointmentSeries {self.id} - Patient {self.patient_id} - {self.rrule}>'
+
+    @classmethod
+    def create_with_users_info(cls, patient_id, doctor_user, creator_user, series_data):
+        """Crea una serie capturando información inmutable de médico y creador (como las citas)"""
+        series = cls(
+            patient_id=patient_id,
+            doctor_name=doctor_user.full_name,
+            doctor_email=doctor_user.mail,
+            doctor_role=doctor_user.role,
+            doctor_id_snapshot=doctor_user.id,
+            created_by_name=creator_user.full_name,
+            created_by_role=creator_user.role,
+            dtstart=series_data['dtstart'],
+            materialized_until=series_data['dtstart'],
+            duration_minutes=series_data.get('duration_minutes', 30),
+            appointment_type=series_data.get('appointment_type'),
+            reason=series_data.get('reason'),
+            observations=series_data.get('observations'),
+            status='activa'
+        )
+        series.set_rule(series_data['rrule'])
+        return series
+
+    # --- Regla ---
+
+    @property
+    def rule(self):
+        return parse_rrule(self.rrule)
+
+    def set_rule(self, text):
+        """Valida la regla y recalcula until (la columna indexada que acota la serie)"""
+        rule = parse_rrule(text)
+        self.rrule = text.upper()
+        self.until = last_occurrence(rule, self.dtstart, self.excluded_dates()) or rule['until']
+
+    def excluded_dates(self):
+        return [datetime.fromisoformat(value) for value in json.loads(self.exdates or '[]')]
+
+    def exclude(self, occurrence_date):
+        dates = set(self.excluded_dates())
+        dates.add(occurrence_date)
+        self.exdates = json.dumps(sorted(value.isoformat() for value in dates))
+
+    def occurrences(self, start=None, end=None):
+        """Fechas de las ocurrencias en [start, end) (sin las excluidas)"""
+        return occurrences(self.rule, self.dtstart, start, end, self.excluded_dates())
+
+    def is_occurrence(self, occurrence_date):
+        return next(iter(self.occurrences(occurrence_date, occurrence_date + timedelta(seconds=1))), None) == occurrence_date
+
+    # --- Serialización ---
+
+    def virtual_occurrence(self, occurrence_date, patient_name=None):
+        """Ocurrencia aún no materializada, con el mismo formato que Appointment.to_dict"""
+        return {
+            'id': None,
+            'series_id': self.id,
+            'original_date': occurrence_date.isoformat(),
+            'virtual': True,
+            'patient_id': self.patient_id,
+            'patient_name': patient_name,
+            'doctor_name': self.doctor_name,
+            'doctor_email': self.doctor_email,
+            'doctor_role': self.doctor_role,
+            'doctor_id_snapshot': self.doctor_id_snapshot,
+            'appointment_date': occurrence_date.isoformat(),
+            'duration_minutes': self.duration_minutes,
+            'appointment_type': self.appointment_type,
+            'reason': self.reason,
+            'status': 'pendiente',
+            'observations': self.observations,
+            'cancellation_reason': None,
+            'created_by_name': self.created_by_name,
+            'created_by_role': self.created_by_role,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'patient_id': self.patient_id,
+            'patient_name': self.patient.full_name if self.patient else None,
+            'doctor_name': self.doctor_name,
+            'doctor_id_snapshot': self.doctor_id_snapshot,
+            'rrule': self.rrule,
+            'dtstart': self.dtstart.isoformat() if self.dtstart else None,
+            'until': self.until.isoformat() if self.until else None,
+            'exdates': [value.isoformat() for value in self.excluded_dates()],
+            'materialized_until': self.materialized_until.isoformat() if self.materialized_until else None,
+            'duration_minutes': self.duration_minutes,
+            'appointment_type': self.appointment_type,
+            'reason': self.reason,
+            'observations': self.observations,
+            'status': self.status,
+            'created_by_name': self.created_by_name,
+            'created_by_role': self.created_by_role,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
@@ -0,0 +1,40 @@
+from models.db import db
+from datetime import datetime, timedelta
+import json
+
+# Estado de los trabajos en segundo plano (p. ej. eliminación de pacientes por lotes). Vive en la
+# base de datos para que cualquier worker pueda consultarlo; el hilo que ejecuta el trabajo
+# renueva updated_at periódicamente, así un trabajo cuyo proceso murió se detecta como interrumpido.
+class BackgroundJob(db.Model):
+    __tablename__ = 'background_job'
+
+    ACTIVE_STATUSES = ('pendiente', 'en_progreso')
+    STALE_AFTER = timedelta(minutes=5)             # Sin latido durante este tiempo, el trabajo se informa como interrumpido
+
+    id = db.Column(db.String(32), primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    status = db.Column(db.String(20), default='pendiente', nullable=False)  # pendiente, en_progreso, completado, error (interrumpido se calcula al leer)
+    progress = db.Column(db.Text)                  # JSON con los contadores del trabajo
+    result = db.Column(db.Text)                    # JSON con el resultado
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f'<BackgroundJob {self.id} - {self.kind} - {self.status}>'
+
+    def is_stale(self, now=None):
+        now = now or datetime.utcnow()
+        return self.status in self.ACTIVE_STATUSES and self.updated_at < now - self.STALE_AFTER
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'progress': json.loads(self.progress) if self.progress else {},
+            'result': json.loads(self.result) if self.result else None,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
@@ -0,0 +1,64 @@
+from models.db import db
+from datetime import datetime, timedelta
+import hashlib
+import secrets
+
+# Token de suscripción al calendario de un médico. Las aplicaciones de calendario no envían
+# el JWT, así que el feed se autentica con un token en la URL: se guarda solo su hash y se
+# puede revocar en cualquier momento (emitir uno nuevo revoca los anteriores).
+class CalendarFeedToken(db.Model):
+    __tablename__ = 'calendar_feed_token'
+
+    LAST_USED_RESOLUTION = timedelta(hours=1)       # Evita una escritura por cada sondeo del calendario
+
+    id = db.Column(db.Integer, primary_key=True)
+    doctor_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False, index=True)
+    token_hash = db.Column(db.String(64), unique=True, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    last_used_at = db.Column(db.DateTime, nullable=True)
+    revoked_at = db.Column(db.DateTime, nullable=True)
+
+    def __repr__(self):
+        return f'<CalendarFeedToken {self.id} - Doctor {self.doctor_id}>'
+
+    @staticmethod
+    def hash(token):
+        return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+    @classmethod
+    def revoke_all(cls, doctor_id):
+        """Revoca los tokens vigentes del médico; devuelve cuántos"""
+        return cls.query.filter_by(doctor_id=doctor_id, revoked_at=None).update(
+            {'revoked_at': datetime.utcnow()}, synchronize_session=False
+        )
+
+    @classmethod
+    def issue(cls, doctor_id):
+        """Revoca los tokens anteriores y crea uno nuevo; devuelve (registro, token en claro)"""
+        cls.revoke_all(doctor_id)
+        token = secrets.token_urlsafe(32)
+        record = cls(doctor_id=doctor_id, token_hash=cls.hash(token))
+        db.session.add(record)
+        return record, token
+
+    @classmethod
+    def verify(cls, doctor_id, token):
+        """Registro vigente que corresponde al token y al médico, o None"""
+        if not token:
+            return None
+        record = cls.query.filter_by(token_hash=cls.hash(token), doctor_id=doctor_id, revoked_at=None).first()
+        if record is not None:
+            now = datetime.utcnow()
+            if record.last_used_at is None or now - record.last_used_at >= cls.LAST_USED_RESOLUTION:
+                record.last_used_at = now
+                db.session.commit()
+        return record
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'doctor_id': self.doctor_id,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'last_used_at': self.last_used_at.isoformat() if self.last_used_at else None,
+            'revoked_at': self.revoked_at.isoformat() if self.revoked_at else None
+        }
@@ -1,11 +1,18 @@
 from models.db import db
 from datetime import datetime
+from sqlalchemy.orm import validates
+from utils.fields import model_fields, serialize_fields
+from utils.vitals import parse_blood_pressure
 
 class ClinicalRecord(db.Model):
     __tablename__ = 'clinical_record'
+    __table_args__ = (
+        db.Index('ix_clinical_record_patient_visit_date', 'patient_id', 'visit_date'),   # Serie de signos vitales del paciente
+        db.Index('ix_clinical_record_doctor_visit_date', 'doctor_id_snapshot', 'visit_date'),   # Fichas recientes de un médico (worklist)
+    )
     
     id = db.Column(db.Integer, primary_key=True)
-    patient_id = db.Column(db.Integer, db.ForeignKey('patient.id'), nullable=False)
+    patient_id = db.Column(db.Integer, db.ForeignKey('patient.id', ondelete='CASCADE'), nullable=False, index=True)
     
     # INFORMACIÓN INMUTABLE DEL MÉDICO (copiada al crear la ficha)
     doctor_name = db.Column(db.String(120), nullable=False)     # Nombre completo del médico
@@ -28,6 +35,8 @@ class ClinicalRecord(db.Model):
     
     # Signos vitales
     blood_pressure = db.Column(db.String(20))          # Ej: "120/80"
+    systolic_bp = db.Column(db.Integer)                # Presión sistólica (derivada de blood_pressure)
+    diastolic_bp = db.Column(db.Integer)               # Presión diastólica (derivada de blood_pressure)
     heart_rate = db.Column(db.Integer)                 # Latidos por minuto
     temperature = db.Column(db.Float)                  # Temperatura corporal
     weight = db.Column(db.Float)                       # Peso en kg
@@ -38,15 +47,33 @@ class ClinicalRecord(db.Model):
     next_appointment = db.Column(db.DateTime)          # Próxima cita
     
     # Auditoría
-    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False, index=True)
     
     # Relación con paciente (se mantiene solo esta relación)
     patient = db.relationship('Patient', back_populates='clinical_records')
     
+    @validates('blood_pressure')
+    def _parse_blood_pressure(self, key, value):
+        # Se guarda también en columnas numéricas para graficar y agregar sin parsear texto
+        self.systolic_bp, self.diastolic_bp = parse_blood_pressure(value)
+        return value
+
     def __repr__(self):
         return f'<ClinicalRecord {self.id} - Patient {self.patient_id} - Dr. {self.doctor_name}>'
 
+    @staticmethod
+    def doctor_snapshot(doctor_user):
+        """Columnas inmutables del médico que se copian en cada ficha"""
+        return {
+            'doctor_name': doctor_user.full_name,
+            'doctor_email': doctor_user.mail,
+            'doctor_role': doctor_user.role,
+            'doctor_id_snapshot': doctor_user.id,
+            'doctor_license': getattr(doctor_user, 'medical_license', None),
+            'doctor_specialization': getattr(doctor_user, 'specialization', None)
+        }
+
     @classmethod
     def create_with_doctor_info(cls, patient_id, doctor_user, clinical_data):
         """
@@ -55,12 +82,7 @@ class ClinicalRecord(db.Model):
         return cls(
             patient_id=patient_id,
             # Información inmutable del médico
-            doctor_name=doctor_user.full_name,
-            doctor_email=doctor_user.mail,
-            doctor_role=doctor_user.role,
-            doctor_id_snapshot=doctor_user.id,
-            doctor_license=getattr(doctor_user, 'medical_license', None),
-            doctor_specialization=getattr(doctor_user, 'specialization', None),
+            **cls.doctor_snapshot(doctor_user),
             # Datos clínicos
             visit_date=clinical_data.get('visit_date'),
             reason_visit=clinical_data.get('reason_visit'),
@@ -78,7 +100,14 @@ class ClinicalRecord(db.Model):
             next_appointment=clinical_data.get('next_appointment')
         )
 
-    def to_dict(self):
+    # Campos calculados para ?fields= y las columnas que requieren
+    COMPUTED_FIELDS = {'patient_name': ['patient_id']}
+
+    def to_dict(self, fields=None):
+        if fields is not None:                              # Proyección (?fields=...)
+            return serialize_fields(self, fields, {
+                'patient_name': lambda record: record.patient.full_name if record.patient else None
+            })
         return {
             'id': self.id,
             'patient_id': self.patient_id,
@@ -100,6 +129,8 @@ class ClinicalRecord(db.Model):
             'prescriptions': self.prescriptions,
             'notes': self.notes,
             'blood_pressure': self.blood_pressure,
+            'systolic_bp': self.systolic_bp,
+            'diastolic_bp': self.diastolic_bp,
             'heart_rate': self.heart_rate,
             'temperature': self.temperature,
             'weight': self.weight,
@@ -111,4 +142,7 @@ class ClinicalRecord(db.Model):
             
             # Información del paciente
             'patient_name': self.patient.full_name if self.patient else None
-        }
\ No newline at end of file
+        }
+
+# Campos disponibles para ?fields=
+ClinicalRecord.FIELDS = model_fields(ClinicalRecord, extra=ClinicalRecord.COMPUTED_FIELDS)
@@ -0,0 +1,46 @@
+from models.db import db
+from datetime import datetime, timedelta
+from sqlalchemy import insert, select, literal
+
+# Registro de eliminaciones (tombstones) para la sincronización incremental de clientes
+class DeletionLog(db.Model):
+    __tablename__ = 'deletion_log'
+    __table_args__ = (
+        db.Index('ix_deletion_log_entity_deleted_at', 'entity', 'deleted_at'),   # Consulta del feed por entidad
+    )
+    
+    RETENTION_DAYS = 30                                                 # Antigüedad máxima de los tombstones
+    
+    id = db.Column(db.Integer, primary_key=True)
+    entity = db.Column(db.String(30), nullable=False)                   # patient, clinical_record, appointment, task
+    entity_id = db.Column(db.Integer, nullable=False)
+    deleted_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+    
+    def __repr__(self):
+        return f'<DeletionLog {self.entity} {self.entity_id}>'
+    
+    @classmethod
+    def record(cls, entity, *entity_ids):
+        """
+        Agrega tombstones a la sesión actual (se confirman junto con la eliminación)
+        y descarta los que superan el período de retención
+        """
+        now = datetime.utcnow()
+        for entity_id in entity_ids:
+            db.session.add(cls(entity=entity, entity_id=entity_id, deleted_at=now))
+        cls.query.filter(cls.deleted_at < now - timedelta(days=cls.RETENTION_DAYS)).delete(synchronize_session=False)
+    
+    @classmethod
+    def record_query(cls, entity, model, *conditions):
+        """Tombstones para todas las filas que cumplen las condiciones, con un solo INSERT ... SELECT"""
+        db.session.execute(insert(cls).from_select(
+            ['entity', 'entity_id', 'deleted_at'],
+            select(literal(entity), model.id, literal(datetime.utcnow())).where(*conditions)
+        ))
+    
+    def to_dict(self):
+        return {
+            'entity': self.entity,
+            'id': self.entity_id,
+            'deleted_at': self.deleted_at.isoformat() if self.deleted_at else None
+        }
@@ -1,5 +1,6 @@
 from models.db import db        # Importa la instancia de la base de datos SQLAlchemy.
 from datetime import datetime         # Importa la clase datetime para manejar fechas y horas
+from utils.fields import model_fields, serialize_fields
 
 class Patient(db.Model):
     __tablename__ = 'patient'
@@ -17,16 +18,19 @@ class Patient(db.Model):
     blood_type = db.Column(db.String(5))                            # 'A+', 'O-', etc.
     allergies = db.Column(db.Text)                                  # Alergias conocidas
     chronic_diseases = db.Column(db.Text)                           # Enfermedades crónicas
-    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False, index=True)
 
-    # Relación con fichas clínicas
-    clinical_records = db.relationship('ClinicalRecord', back_populates='patient', lazy=True, cascade='all, delete-orphan')
+    # Relación con fichas clínicas (passive_deletes: la base de datos las elimina con ON DELETE CASCADE
+    # sin cargarlas en la sesión)
+    clinical_records = db.relationship('ClinicalRecord', back_populates='patient', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
 
     def __repr__(self):
         return f'<Patient {self.rut} - {self.full_name}>'
 
-    def to_dict(self):
+    def to_dict(self, fields=None):
+        if fields is not None:                              # Proyección (?fields=...)
+            return serialize_fields(self, fields)
         return {                                            # Serializar paciente a diccionario
             'id': self.id,
             'rut': self.rut,
@@ -43,4 +47,7 @@ class Patient(db.Model):
             'chronic_diseases': self.chronic_diseases,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
-        }
\ No newline at end of file
+        }
+
+# Campos disponibles para ?fields=
+Patient.FIELDS = model_fields(Patient)
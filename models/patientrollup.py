@@ -0,0 +1,99 @@
+from models.db import db
+from models.patient import Patient
+from datetime import datetime
+from sqlalchemy import event, func, insert, select, text
+from sqlalchemy.orm import attributes
+from utils.analytics import age_band, age_band_case, month_bucket
+
+UNKNOWN = 'desconocido'             # Valor de las dimensiones sin dato (NULL no sirve en la clave única)
+
+# Cubo precalculado de pacientes: cantidad por (banda etaria, género, grupo sanguíneo, mes de alta)
+class PatientRollup(db.Model):
+    __tablename__ = 'patient_rollup'
+    __table_args__ = (
+        db.UniqueConstraint('age_band', 'gender', 'blood_type', 'created_month', name='uq_patient_rollup_cell'),
+    )
+
+    DIMENSIONS = ('age_band', 'gender', 'blood_type', 'created_month')
+
+    id = db.Column(db.Integer, primary_key=True)
+    age_band = db.Column(db.String(10), nullable=False)
+    gender = db.Column(db.String(20), nullable=False)
+    blood_type = db.Column(db.String(20), nullable=False)
+    created_month = db.Column(db.String(7), nullable=False)            # 'YYYY-MM'
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<PatientRollup {self.age_band}/{self.gender}/{self.blood_type}/{self.created_month}: {self.count}>'
+
+    @staticmethod
+    def cell(birth_date, gender, blood_type, created_at):
+        """Celda del cubo a la que pertenece un paciente"""
+        return (
+            age_band(birth_date) if birth_date else UNKNOWN,
+            gender or UNKNOWN,
+            blood_type or UNKNOWN,
+            (created_at or datetime.utcnow()).strftime('%Y-%m')
+        )
+
+    @classmethod
+    def apply(cls, connection, deltas):
+        """Suma los deltas {celda: +n/-n} con un UPSERT por celda en la conexión (y transacción) indicada"""
+        statement = text(
+            'INSERT INTO patient_rollup (age_band, gender, blood_type, created_month, count) '
+            'VALUES (:age_band, :gender, :blood_type, :created_month, :delta) '
+            'ON CONFLICT (age_band, gender, blood_type, created_month) '
+            'DO UPDATE SET count = patient_rollup.count + excluded.count'
+        )
+        params = [dict(zip(cls.DIMENSIONS, cell), delta=delta) for cell, delta in deltas.items() if delta]
+        if params:
+            connection.execute(statement, params)
+
+    @classmethod
+    def rebuild(cls):
+        """
+        Recalcula el cubo completo con un solo INSERT ... SELECT GROUP BY.
+        Se ejecuta cada noche: las bandas etarias cambian con el paso del tiempo.
+        """
+        band = age_band_case(Patient.birth_date)
+        month = month_bucket(Patient.created_at)
+        blood_type = func.coalesce(func.nullif(Patient.blood_type, ''), UNKNOWN)
+        db.session.execute(cls.__table__.delete())
+        db.session.execute(insert(cls).from_select(
+            ['age_band', 'gender', 'blood_type', 'created_month', 'count'],
+            select(band, Patient.gender, blood_type, month, func.count(Patient.id)).group_by(band, Patient.gender, blood_type, month)
+        ))
+        db.session.commit()
+
+    def to_dict(self):
+        return {
+            'age_band': self.age_band,
+            'gender': self.gender,
+            'blood_type': self.blood_type,
+            'created_month': self.created_month,
+            'count': self.count
+        }
+
+# Mantenimiento incremental: cada alta, cambio o baja de paciente ajusta su celda en la misma transacción
+
+def _cell(patient):
+    return PatientRollup.cell(patient.birth_date, patient.gender, patient.blood_type, patient.created_at)
+
+@event.listens_for(Patient, 'after_insert')
+def _rollup_insert(mapper, connection, patient):
+    PatientRollup.apply(connection, {_cell(patient): 1})
+
+@event.listens_for(Patient, 'after_delete')
+def _rollup_delete(mapper, connection, patient):
+    PatientRollup.apply(connection, {_cell(patient): -1})
+
+@event.listens_for(Patient, 'after_update')
+def _rollup_update(mapper, connection, patient):
+    old = {}
+    for key in ('birth_date', 'gender', 'blood_type', 'created_at'):
+        history = attributes.get_history(patient, key)
+        old[key] = history.deleted[0] if history.deleted else getattr(patient, key)
+    previous = PatientRollup.cell(**old)
+    current = _cell(patient)
+    if previous != current:
+        PatientRollup.apply(connection, {previous: -1, current: 1})
@@ -0,0 +1,56 @@
+from models.db import db
+from datetime import datetime, timedelta
+from sqlalchemy import delete, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+
+# Marca de recordatorio enviado: una fila por (cita, tipo, fecha de la cita). La clave única
+# garantiza que un recordatorio no se envíe dos veces aunque el programador se reinicie o
+# se ejecute desde cron; si la fecha cambia, el recordatorio de la nueva fecha es otro.
+class ReminderClaim(db.Model):
+    __tablename__ = 'reminder_claim'
+    __table_args__ = (
+        db.UniqueConstraint('appointment_id', 'kind', 'appointment_date', name='uq_reminder_claim'),
+    )
+
+    RETENTION = timedelta(days=3)               # Las marcas de citas ya pasadas se descartan
+
+    id = db.Column(db.Integer, primary_key=True)
+    appointment_id = db.Column(db.Integer, db.ForeignKey('appointment.id', ondelete='CASCADE'), nullable=False)
+    kind = db.Column(db.String(10), nullable=False)                 # 24h, 2h
+    appointment_date = db.Column(db.DateTime, nullable=False, index=True)
+    claimed_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f'<ReminderClaim {self.appointment_id} {self.kind} {self.appointment_date}>'
+
+    @classmethod
+    def claim(cls, keys):
+        """
+        Inserta las marcas (id_cita, tipo, fecha) que aún no existen con un solo INSERT ... ON CONFLICT
+        DO NOTHING y devuelve el conjunto de las que quedaron tomadas por esta llamada (sin commit)
+        """
+        if not keys:
+            return set()
+        dialect = postgresql if db.engine.dialect.name == 'postgresql' else sqlite
+        now = datetime.utcnow()
+        stmt = dialect.insert(cls).values([
+            {'appointment_id': appointment_id, 'kind': kind, 'appointment_date': appointment_date, 'claimed_at': now}
+            for appointment_id, kind, appointment_date in keys
+        ]).on_conflict_do_nothing(
+            index_elements=['appointment_id', 'kind', 'appointment_date']
+        ).returning(cls.appointment_id, cls.kind, cls.appointment_date)
+        return {tuple(row) for row in db.session.execute(stmt)}
+
+    @classmethod
+    def release(cls, keys):
+        """Libera marcas de recordatorios que no se pudieron enviar (sin commit)"""
+        if keys:
+            db.session.execute(delete(cls).where(
+                tuple_(cls.appointment_id, cls.kind, cls.appointment_date).in_(list(keys))
+            ))
+
+    @classmethod
+    def purge(cls, now=None):
+        """Descarta las marcas de citas que ya pasaron hace más de RETENTION"""
+        now = now or datetime.now()
+        return db.session.execute(delete(cls).where(cls.appointment_date < now - cls.RETENTION)).rowcount
@@ -7,6 +7,6 @@ class Task(db.Model):                          # Define el modelo Task que repre
     done = db.Column(db.Boolean, default=False)                      # Estado de la tarea (realizada o no), por defecto False
     responsible_id = db.Column(db.Integer, db.ForeignKey('responsible.id'), nullable=False)  # Clave foránea a Responsible, obligatorio
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)             # Fecha de creación, se asigna automáticamente
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)  # Fecha de última actualización, se actualiza automáticamente
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False, index=True)  # Fecha de última actualización, se actualiza automáticamente
     
     responsible = db.relationship('Responsible', backref='tasks')    # Relación muchos a uno; permite acceder al responsable desde la tarea y a todas las tareas desde el responsable
\ No newline at end of file
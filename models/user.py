@@ -8,6 +8,7 @@ class User(db.Model):                   # Define el modelo User que representa l
     password_hash = db.Column(db.String(200), nullable=False)              # Contraseña del usuario, obligatoria. Incluye hash para no guardar plano
     full_name = db.Column(db.String(120), nullable=False)             # Nombre completo del usuario, obligatorio
     role = db.Column(db.String(50), nullable=False, default="usuario")# Rol del usuario
+    specialty = db.Column(db.String(100), nullable=True)              # Especialidad del médico (lista de espera por especialidad)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)  # Fecha de creación, se asigna automáticamente
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)  # Fecha de última actualización, se actualiza automáticamente
     
@@ -0,0 +1,104 @@
+from models.db import db
+from datetime import datetime
+from sqlalchemy import func
+
+# Lista de espera: un paciente espera cupo con un médico (o cualquier médico de una especialidad)
+# dentro de una o más ventanas de tiempo. Cuando se libera una hora se ofrece al mejor candidato.
+class WaitlistEntry(db.Model):
+    __tablename__ = 'waitlist_entry'
+    __table_args__ = (
+        db.Index('ix_waitlist_entry_status_priority', 'status', 'priority', 'created_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    patient_id = db.Column(db.Integer, db.ForeignKey('patient.id', ondelete='CASCADE'), nullable=False, index=True)
+
+    # Preferencia: un médico concreto o cualquiera de la especialidad
+    doctor_id = db.Column(db.Integer, nullable=True)
+    specialty = db.Column(db.String(100), nullable=True)
+
+    # Cita solicitada
+    priority = db.Column(db.Integer, default=0, nullable=False)        # Mayor prioridad primero; a igual prioridad, el más antiguo
+    duration_minutes = db.Column(db.Integer, default=30, nullable=False)
+    appointment_type = db.Column(db.String(100), nullable=False)
+    reason = db.Column(db.Text, nullable=False)
+    notes = db.Column(db.Text)
+
+    status = db.Column(db.String(20), default='activa', nullable=False)  # activa, ofrecida, asignada, retirada
+
+    # Oferta vigente (hora liberada reservada para este paciente hasta offer_expires_at)
+    offered_doctor_id = db.Column(db.Integer, nullable=True)
+    offered_date = db.Column(db.DateTime, nullable=True)
+    offered_duration = db.Column(db.Integer, nullable=True)
+    offer_expires_at = db.Column(db.DateTime, nullable=True)
+    appointment_id = db.Column(db.Integer, db.ForeignKey('appointment.id', ondelete='SET NULL'), nullable=True)
+
+    # Usuario que registró la solicitud
+    created_by_name = db.Column(db.String(120), nullable=False)
+    created_by_role = db.Column(db.String(50), nullable=False)
+
+    # Auditoría
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    patient = db.relationship('Patient', backref=db.backref('waitlist_entries', cascade='all, delete-orphan', passive_deletes=True))
+    windows = db.relationship('WaitlistWindow', backref='entry', cascade='all, delete-orphan', passive_deletes=True,
+                              order_by='WaitlistWindow.window_start')
+
+    def __repr__(self):
+        return f'<WaitlistEntry {self.id} - Patient {self.patient_id} - {self.status}>'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'patient_id': self.patient_id,
+            'patient_name': self.patient.full_name if self.patient else None,
+            'doctor_id': self.doctor_id,
+            'specialty': self.specialty,
+            'priority': self.priority,
+            'duration_minutes': self.duration_minutes,
+            'appointment_type': self.appointment_type,
+            'reason': self.reason,
+            'notes': self.notes,
+            'status': self.status,
+            'windows': [
+                {'start': window.window_start.isoformat(), 'end': window.window_end.isoformat()}
+                for window in self.windows
+            ],
+            'offered_doctor_id': self.offered_doctor_id,
+            'offered_date': self.offered_date.isoformat() if self.offered_date else None,
+            'offered_duration': self.offered_duration,
+            'offer_expires_at': self.offer_expires_at.isoformat() if self.offer_expires_at else None,
+            'appointment_id': self.appointment_id,
+            'created_by_name': self.created_by_name,
+            'created_by_role': self.created_by_role,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+# Ventanas preferidas de cada solicitud. Médico y especialidad se copian de la solicitud
+# para que la búsqueda de candidatos se resuelva solo con esta tabla.
+class WaitlistWindow(db.Model):
+    __tablename__ = 'waitlist_window'
+    __table_args__ = (
+        db.Index('ix_waitlist_window_doctor_end', 'doctor_id', 'window_end'),
+        db.Index('ix_waitlist_window_specialty_end', 'specialty', 'window_end'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    entry_id = db.Column(db.Integer, db.ForeignKey('waitlist_entry.id', ondelete='CASCADE'), nullable=False, index=True)
+    doctor_id = db.Column(db.Integer, nullable=True)
+    specialty = db.Column(db.String(100), nullable=True)
+    window_start = db.Column(db.DateTime, nullable=False)
+    window_end = db.Column(db.DateTime, nullable=False)
+
+    def __repr__(self):
+        return f'<WaitlistWindow {self.entry_id}: {self.window_start} - {self.window_end}>'
+
+# Índice de intervalos (GiST sobre tsrange) en PostgreSQL: "ventanas que contienen la hora liberada"
+# se responde en tiempo logarítmico sin recorrer la lista de espera
+db.Index(
+    'ix_waitlist_window_range',
+    func.tsrange(WaitlistWindow.window_start, WaitlistWindow.window_end),
+    postgresql_using='gist'
+).ddl_if(dialect='postgresql')
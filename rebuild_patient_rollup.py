@@ -0,0 +1,19 @@
+# rebuild_patient_rollup.py
+from app import app
+from models import db, PatientRollup
+
+def rebuild_patient_rollup():
+    """Recalcula el cubo de pacientes (programar cada noche: las bandas etarias avanzan con la fecha)"""
+    with app.app_context():
+        try:
+            print("Recalculando cubo de pacientes...")
+            PatientRollup.rebuild()
+            cells = PatientRollup.query.count()
+            print(f"Cubo recalculado: {cells} celdas")
+        except Exception as e:
+            print(f"Error al recalcular el cubo: {e}")
+            db.session.rollback()
+            raise
+
+if __name__ == "__main__":
+    rebuild_patient_rollup()
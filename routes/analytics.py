@@ -0,0 +1,370 @@
+from flask import Blueprint, request, jsonify
+from datetime import datetime, date, timedelta
+from models import db, Patient, ClinicalRecord, Appointment, PatientRollup
+from flask_jwt_extended import jwt_required
+from sqlalchemy import select, func, case, or_
+from utils.permissions import role_required
+from utils.cache import cache
+from utils.events import broker
+from utils.utilization import utilization_report, week_start
+from utils.analytics import age_band_case, month_bucket, percentiles, BUCKETS, bucket_range, next_bucket, bucket_counts
+
+analytics_bp = Blueprint('analytics', __name__, url_prefix='/analytics')
+
+ANALYTICS_TTL = 24 * 3600           # Los agregados poblacionales se recalculan una vez al día
+HYPERTENSION_SYSTOLIC = 140         # mmHg (umbral de hipertensión en consulta)
+HYPERTENSION_DIASTOLIC = 90
+FEVER_TEMPERATURE = 38.0
+MAX_ACTIVITY_BUCKETS = 1000
+DEFAULT_WEEKLY_HOURS = 40           # Horas disponibles por médico a la semana (no hay agenda de disponibilidad)
+PARALLEL_THRESHOLD = 1000000        # Citas a partir de las cuales el reporte se reparte en procesos (o con ?parallel=true)
+MAX_UTILIZATION_WORKERS = 4
+
+# Series de /analytics/activity: nombre -> (columna temporal, filtros, columna de agrupación)
+ACTIVITY_SERIES = {
+    'new_patients': (Patient.created_at, (), None),
+    'new_clinical_records': (ClinicalRecord.created_at, (), None),
+    'appointments': (Appointment.appointment_date, (), Appointment.status),
+    'cancellations': (Appointment.updated_at, (Appointment.status == 'cancelada',), None)   # Fecha de la cancelación
+}
+
+def _is_hypertensive():
+    """1 si la lectura es hipertensiva, 0 si es normal y NULL si la ficha no tiene presión"""
+    return case(
+        (ClinicalRecord.systolic_bp.is_(None), None),
+        (or_(ClinicalRecord.systolic_bp >= HYPERTENSION_SYSTOLIC, ClinicalRecord.diastolic_bp >= HYPERTENSION_DIASTOLIC), 1),
+        else_=0
+    )
+
+def compute_vitals_summary(filters, bmi_bin):
+    """Agregados de signos vitales de todas las fichas que cumplen los filtros"""
+    # Histograma de IMC en buckets de ancho bmi_bin
+    bucket = func.floor(ClinicalRecord.bmi / bmi_bin)
+    histogram = db.session.execute(
+        select(bucket, func.count()).where(ClinicalRecord.bmi.isnot(None), *filters).group_by(bucket).order_by(bucket)
+    ).all()
+
+    bmi_category = case(
+        (ClinicalRecord.bmi < 18.5, 'bajo_peso'),
+        (ClinicalRecord.bmi < 25, 'normal'),
+        (ClinicalRecord.bmi < 30, 'sobrepeso'),
+        else_='obesidad'
+    )
+    categories = db.session.execute(
+        select(bmi_category, func.count()).where(ClinicalRecord.bmi.isnot(None), *filters).group_by(bmi_category)
+    ).all()
+
+    # Prevalencia de hipertensión: pacientes con alguna lectura hipertensiva / pacientes con lecturas
+    hypertensive = _is_hypertensive()
+    readings, hypertensive_readings, patients_measured, patients_hypertensive = db.session.execute(select(
+        func.count(ClinicalRecord.systolic_bp),
+        func.coalesce(func.sum(hypertensive), 0),
+        func.count(func.distinct(case((ClinicalRecord.systolic_bp.isnot(None), ClinicalRecord.patient_id)))),
+        func.count(func.distinct(case((hypertensive == 1, ClinicalRecord.patient_id))))
+    ).where(*filters)).one()
+
+    # Tendencia mensual de temperatura
+    month = month_bucket(ClinicalRecord.visit_date)
+    temperature_trend = db.session.execute(
+        select(
+            month,
+            func.count(),
+            func.avg(ClinicalRecord.temperature),
+            func.max(ClinicalRecord.temperature),
+            func.sum(case((ClinicalRecord.temperature >= FEVER_TEMPERATURE, 1), else_=0))
+        ).where(ClinicalRecord.temperature.isnot(None), *filters).group_by(month).order_by(month)
+    ).all()
+
+    # Desglose por banda etaria y género (JOIN con paciente, agrupado en la base)
+    band = age_band_case(Patient.birth_date)
+    breakdown = db.session.execute(
+        select(
+            band, Patient.gender,
+            func.count(ClinicalRecord.id),
+            func.count(func.distinct(ClinicalRecord.patient_id)),
+            func.avg(ClinicalRecord.bmi),
+            func.avg(ClinicalRecord.heart_rate),
+            func.avg(hypertensive)
+        ).join(Patient, Patient.id == ClinicalRecord.patient_id).where(*filters).group_by(band, Patient.gender).order_by(band, Patient.gender)
+    ).all()
+
+    def rounded(value, digits=1):
+        return round(float(value), digits) if value is not None else None
+
+    return {
+        'bmi': {
+            'histogram': [{'bin_start': round(float(start) * bmi_bin, 2), 'count': count} for start, count in histogram],
+            'bin_width': bmi_bin,
+            'categories': dict(categories),
+            'percentiles': percentiles(ClinicalRecord.bmi, filters)
+        },
+        'blood_pressure': {
+            'readings': readings,
+            'hypertensive_readings': int(hypertensive_readings),
+            'patients_measured': patients_measured,
+            'patients_hypertensive': patients_hypertensive,
+            'hypertension_prevalence': rounded(patients_hypertensive / patients_measured, 4) if patients_measured else None,
+            'systolic_percentiles': percentiles(ClinicalRecord.systolic_bp, filters),
+            'diastolic_percentiles': percentiles(ClinicalRecord.diastolic_bp, filters)
+        },
+        'temperature': {
+            'monthly': [
+                {'month': month_value, 'count': count, 'avg': rounded(avg, 2), 'max': maximum, 'fever_count': int(fevers)}
+                for month_value, count, avg, maximum, fevers in temperature_trend
+            ],
+            'percentiles': percentiles(ClinicalRecord.temperature, filters)
+        },
+        'breakdown': [
+            {
+                'age_band': age_band, 'gender': gender, 'records': records, 'patients': patients,
+                'avg_bmi': rounded(avg_bmi), 'avg_heart_rate': rounded(avg_heart_rate),
+                'hypertensive_rate': rounded(hypertensive_rate, 4)
+            }
+            for age_band, gender, records, patients, avg_bmi, avg_heart_rate, hypertensive_rate in breakdown
+        ]
+    }
+
+@analytics_bp.route('/vitals', methods=['GET'])
+@jwt_required()
+@role_required('administrador')
+def get_vitals_analytics():
+    """
+    Distribuciones poblacionales de signos vitales (IMC, presión arterial, temperatura)
+    con desglose por banda etaria y género. ?from= y ?to= acotan por fecha de consulta.
+    Se calcula a lo sumo una vez al día por combinación de parámetros.
+    """
+    try:
+        date_from = request.args.get('from')
+        date_to = request.args.get('to')
+        bmi_bin = request.args.get('bmi_bin', 1.0, type=float)
+        if not 0.1 <= bmi_bin <= 10:
+            return jsonify({'error': 'bmi_bin debe estar entre 0.1 y 10'}), 400
+
+        filters = []
+        if date_from:
+            filters.append(ClinicalRecord.visit_date >= datetime.fromisoformat(date_from))
+        if date_to:
+            filters.append(ClinicalRecord.visit_date <= datetime.fromisoformat(date_to))
+
+        today = date.today().isoformat()
+
+        def build():
+            summary = compute_vitals_summary(filters, bmi_bin)
+            summary['generated_at'] = datetime.utcnow().isoformat()
+            return summary
+
+        summary = cache.get_or_set(
+            f'analytics:vitals:{today}:{date_from}:{date_to}:{bmi_bin}', build,
+            ttl=ANALYTICS_TTL, tags=('analytics',)
+        )
+        return jsonify(summary)
+    except ValueError as ve:
+        return jsonify({'error': f'Error en formato de datos: {str(ve)}'}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@analytics_bp.route('/patients', methods=['GET'])
+@jwt_required()
+@role_required('administrador')
+def get_patients_analytics():
+    """
+    Cantidad de pacientes desde el cubo precalculado.
+    ?group_by=age_band,gender define las dimensiones del resultado; cada dimensión acepta
+    además un filtro (?gender=female,male&blood_type=O+) y ?from_month=/?to_month= (YYYY-MM)
+    acotan el mes de alta.
+    """
+    try:
+        group_by = [dimension.strip() for dimension in request.args.get('group_by', 'age_band,gender').split(',') if dimension.strip()]
+        unknown = [dimension for dimension in group_by if dimension not in PatientRollup.DIMENSIONS]
+        if unknown:
+            return jsonify({'error': f'Dimensiones inválidas: {", ".join(unknown)}'}), 400
+        
+        filters = []
+        for dimension in PatientRollup.DIMENSIONS:
+            if request.args.get(dimension):
+                filters.append(getattr(PatientRollup, dimension).in_(request.args[dimension].split(',')))
+        if request.args.get('from_month'):
+            filters.append(PatientRollup.created_month >= request.args['from_month'])
+        if request.args.get('to_month'):
+            filters.append(PatientRollup.created_month <= request.args['to_month'])
+        
+        columns = [getattr(PatientRollup, dimension) for dimension in group_by]
+        total = func.sum(PatientRollup.count)
+        rows = db.session.execute(
+            select(*columns, total).where(*filters).group_by(*columns).having(total > 0).order_by(*columns)
+        ).all()
+        
+        return jsonify({
+            'group_by': group_by,
+            'total': sum(row[-1] for row in rows),
+            'rows': [dict(zip(group_by + ['count'], row)) for row in rows]
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# Series cuyos buckets cerrados cambian con cada tipo de evento: las citas por estado y las
+# cancelaciones con cualquier cambio de cita (incluidos los barridos); las altas solo con bajas.
+# Eliminar un paciente borra sus fichas y citas en cascada (o por lotes) sin emitir sus eventos
+ACTIVITY_INVALIDATION = {
+    'appointment.': ('appointments', 'cancellations'),
+    'patient.deleted': ('new_patients', 'new_clinical_records', 'appointments', 'cancellations'),
+    'clinical_record.deleted': ('new_clinical_records',)
+}
+
+def invalidate_activity(evt):
+    """Invalida los buckets en caché de las series afectadas por el evento"""
+    if evt['type'] == 'appointment.created':
+        return                                  # No se crean citas en el pasado: ningún bucket cerrado cambia
+    for prefix, names in ACTIVITY_INVALIDATION.items():
+        if evt['type'].startswith(prefix):
+            cache.invalidate_tags(*[f'analytics:activity:{name}' for name in names])
+
+broker.add_handler(invalidate_activity)
+
+def activity_series(name, bucket, buckets, now):
+    """
+    Conteos de una serie por bucket. Los buckets cerrados (ya terminados) se guardan en
+    caché uno a uno; solo se consulta el tramo desde el primer bucket sin caché.
+    """
+    column, filters, group = ACTIVITY_SERIES[name]
+    keys = {start: f'analytics:activity:{name}:{bucket}:{start.date().isoformat()}' for start in buckets}
+    closed = {start for start in buckets if next_bucket(start, bucket) <= now}
+    
+    values = {}
+    for start in buckets:
+        if start in closed:
+            cached = cache.get(keys[start])
+            if cached is not None:
+                values[start] = cached
+    
+    pending = [start for start in buckets if start not in values]
+    if pending:
+        fresh = bucket_counts(column, bucket, buckets[buckets.index(pending[0]):], filters, group)
+        for start, value in fresh.items():
+            values[start] = value
+            if start in closed:
+                cache.set(keys[start], value, ttl=ANALYTICS_TTL, tags=('analytics', f'analytics:activity:{name}'))
+    return [values[start] for start in buckets]
+
+@analytics_bp.route('/activity', methods=['GET'])
+@jwt_required()
+@role_required('administrador')
+def get_activity_analytics():
+    """
+    Series de actividad sin huecos: pacientes nuevos, fichas nuevas, citas por estado y
+    cancelaciones, agrupadas por ?bucket=day|week|month entre ?from= y ?to=
+    (por defecto los últimos 30 días). ?series= limita las series calculadas.
+    """
+    try:
+        bucket = request.args.get('bucket', 'day')
+        if bucket not in BUCKETS:
+            return jsonify({'error': f'bucket debe ser uno de: {", ".join(BUCKETS)}'}), 400
+        names = request.args.get('series', ','.join(ACTIVITY_SERIES)).split(',')
+        unknown = [name for name in names if name not in ACTIVITY_SERIES]
+        if unknown:
+            return jsonify({'error': f'Series inválidas: {", ".join(unknown)}'}), 400
+        
+        # created_at se guarda en UTC y appointment_date en hora local: se usa la menor de
+        # ambas para no dar por cerrado un bucket que aún recibe datos
+        now = min(datetime.now(), datetime.utcnow())
+        date_to = datetime.fromisoformat(request.args['to']) if request.args.get('to') else now
+        date_from = datetime.fromisoformat(request.args['from']) if request.args.get('from') else date_to - timedelta(days=30)
+        if date_from > date_to:
+            return jsonify({'error': 'from debe ser anterior a to'}), 400
+        
+        buckets = bucket_range(date_from, date_to, bucket)
+        if len(buckets) > MAX_ACTIVITY_BUCKETS:
+            return jsonify({'error': f'El rango supera {MAX_ACTIVITY_BUCKETS} buckets; use un bucket mayor'}), 400
+        
+        series = {}
+        for name in names:
+            counts = activity_series(name, bucket, buckets, now)
+            if ACTIVITY_SERIES[name][2] is None:
+                series[name] = counts
+            else:
+                groups = sorted({group for value in counts for group in value})
+                series[name] = {group: [value.get(group, 0) for value in counts] for group in groups}
+        
+        return jsonify({
+            'bucket': bucket,
+            'from': date_from.isoformat(),
+            'to': date_to.isoformat(),
+            'labels': [start.date().isoformat() for start in buckets],
+            'series': series
+        })
+    except ValueError as ve:
+        return jsonify({'error': f'Error en formato de datos: {str(ve)}'}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@analytics_bp.route('/utilization', methods=['GET'])
+@jwt_required()
+@role_required('administrador')
+def get_utilization_report():
+    """
+    Ocupación semanal por médico entre ?from= y ?to= (por defecto las últimas 12 semanas):
+    minutos agendados, minutos ocupados (uniendo solapes), huecos entre citas, tasa de
+    cancelación y de inasistencia. ?hours_per_week= define la disponibilidad semanal.
+    """
+    try:
+        date_to = datetime.fromisoformat(request.args['to']) if request.args.get('to') else datetime.now()
+        date_from = datetime.fromisoformat(request.args['from']) if request.args.get('from') else date_to - timedelta(weeks=12)
+        hours_per_week = request.args.get('hours_per_week', DEFAULT_WEEKLY_HOURS, type=float)
+        if date_from > date_to:
+            return jsonify({'error': 'from debe ser anterior a to'}), 400
+        
+        # Una sola consulta con las columnas mínimas, ordenada por médico y hora
+        rows = db.session.execute(
+            select(
+                Appointment.doctor_id_snapshot, Appointment.doctor_name, Appointment.appointment_date,
+                Appointment.duration_minutes, Appointment.status
+            ).where(
+                Appointment.appointment_date >= date_from,
+                Appointment.appointment_date <= date_to,
+                Appointment.doctor_id_snapshot.isnot(None)
+            ).order_by(Appointment.doctor_id_snapshot, Appointment.appointment_date)
+        ).all()
+        
+        # Arreglos por médico: inicio en minutos desde 1970, duración y estado
+        epoch = datetime(1970, 1, 1)
+        doctors = {}
+        for doctor_id, doctor_name, appointment_date, duration, status in rows:
+            doctor = doctors.setdefault(doctor_id, {'name': doctor_name, 'starts': [], 'durations': [], 'statuses': []})
+            doctor['starts'].append(int((appointment_date - epoch).total_seconds()) // 60)
+            doctor['durations'].append(duration)
+            doctor['statuses'].append(status)
+        
+        items = [
+            (doctor_id, data['starts'], data['durations'], data['statuses'], hours_per_week * 60)
+            for doctor_id, data in doctors.items()
+        ]
+        parallel = request.args.get('parallel', '').lower() in ['1', 'true', 'yes'] or len(rows) >= PARALLEL_THRESHOLD
+        workers = min(MAX_UTILIZATION_WORKERS, len(items)) if parallel else 0
+        reports = utilization_report(items, workers)
+        
+        available_minutes = hours_per_week * 60 * len(bucket_range(date_from, date_to, 'week'))
+        result = []
+        for doctor_id, weeks in reports.items():
+            for week in weeks:
+                week['week'] = week_start(week['week']).isoformat()
+            booked = sum(week['booked_minutes'] for week in weeks)
+            result.append({
+                'doctor_id': doctor_id,
+                'doctor_name': doctors[doctor_id]['name'],
+                'booked_minutes': booked,
+                'utilization': round(booked / available_minutes, 4) if available_minutes else None,
+                'weeks': weeks
+            })
+        result.sort(key=lambda doctor: doctor['booked_minutes'], reverse=True)
+        
+        return jsonify({
+            'from': date_from.isoformat(),
+            'to': date_to.isoformat(),
+            'hours_per_week': hours_per_week,
+            'appointments': len(rows),
+            'doctors': result
+        })
+    except ValueError as ve:
+        return jsonify({'error': f'Error en formato de datos: {str(ve)}'}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -0,0 +1,349 @@
+from flask import Blueprint, request, jsonify
+from datetime import datetime, timedelta
+from models import Appointment, AppointmentSeries, Patient, User, db
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from utils.permissions import role_required
+from utils.recurrence import parse_rrule, format_rrule, occurrences
+from utils.waitlist import offer_freed_slot
+from utils.series import (
+    MATERIALIZE_DAYS, ACTIVE_STATUSES, materialize, virtual_occurrences, series_slots, find_conflicts, build_occurrence,
+    conflict_message
+)
+
+appointment_series_bp = Blueprint('appointment_series', __name__, url_prefix='/appointments/series')
+
+MAX_WINDOW_DAYS = 366               # Ventana máxima de /occurrences
+MAX_REPORTED_CONFLICTS = 50
+EDITABLE_FIELDS = ('duration_minutes', 'appointment_type', 'reason', 'observations')
+
+def _horizon(now):
+    return (now + timedelta(days=MATERIALIZE_DAYS)).replace(hour=0, minute=0, second=0, microsecond=0)
+
+def _conflict_response(conflicts):
+    return jsonify({
+        'error': conflict_message(conflicts[0]),
+        'conflict_count': len(conflicts),
+        'conflicts': conflicts[:MAX_REPORTED_CONFLICTS]
+    }), 409
+
+@appointment_series_bp.route('/', methods=['POST'])
+@jwt_required()
+@role_required('administrador', 'medico', 'tecnico', 'administrativo')
+def create_series():
+    """Crear una serie de citas recurrentes (rrule: FREQ=DAILY|WEEKLY|MONTHLY;INTERVAL;BYDAY;COUNT|UNTIL)"""
+    try:
+        data = request.json
+        current_user_id = int(get_jwt_identity())
+
+        # Validaciones básicas
+        for field, message in (
+            ('patient_id', 'El ID del paciente es obligatorio'),
+            ('doctor_id', 'El ID del médico es obligatorio'),
+            ('appointment_date', 'La fecha de la primera cita es obligatoria'),
+            ('rrule', 'La regla de recurrencia es obligatoria'),
+            ('appointment_type', 'El tipo de cita es obligatorio'),
+            ('reason', 'El motivo de la cita es obligatorio')
+        ):
+            if not data.get(field):
+                return jsonify({'error': message}), 400
+
+        if not Patient.query.get(data['patient_id']):
+            return jsonify({'error': 'El paciente especificado no existe'}), 400
+        doctor = User.query.get(data['doctor_id'])
+        if not doctor:
+            return jsonify({'error': 'El médico especificado no existe'}), 400
+        if doctor.role not in ['medico', 'administrador']:
+            return jsonify({'error': 'El usuario seleccionado no es un médico'}), 400
+        creator = User.query.get(current_user_id)
+        if not creator:
+            return jsonify({'error': 'Usuario creador no encontrado'}), 404
+
+        dtstart = datetime.fromisoformat(data['appointment_date'])
+        if dtstart < datetime.now():
+            return jsonify({'error': 'No se pueden crear citas en fechas pasadas'}), 400
+
+        series = AppointmentSeries.create_with_users_info(data['patient_id'], doctor, creator, {
+            'dtstart': dtstart,
+            'rrule': data['rrule'],
+            'duration_minutes': int(data.get('duration_minutes', 30)),
+            'appointment_type': data['appointment_type'],
+            'reason': data['reason'],
+            'observations': data.get('observations')
+        })
+
+        # Toda la serie (o su primer año si no tiene fin) contra la agenda del médico, de una vez
+        conflicts = find_conflicts(doctor.id, series_slots(series))
+        if conflicts:
+            return _conflict_response(conflicts)
+
+        db.session.add(series)
+        db.session.flush()
+        materialized = materialize(series, _horizon(datetime.now()))
+        db.session.commit()
+
+        return jsonify({
+            'message': 'Serie de citas creada exitosamente',
+            'series': series.to_dict(),
+            'materialized': materialized
+        }), 201
+
+    except ValueError as ve:
+        db.session.rollback()
+        return jsonify({'error': f'Error en formato de datos: {str(ve)}'}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@appointment_series_bp.route('/<int:series_id>', methods=['GET'])
+@jwt_required()
+def get_series(series_id):
+    """Obtener una serie"""
+    try:
+        return jsonify(AppointmentSeries.query.get_or_404(series_id).to_dict())
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@appointment_series_bp.route('/<int:series_id>/occurrences', methods=['GET'])
+@jwt_required()
+def get_series_occurrences(series_id):
+    """Ocurrencias de la serie en [from, to): filas materializadas más ocurrencias virtuales (id null)"""
+    try:
+        series = AppointmentSeries.query.get_or_404(series_id)
+        start = datetime.fromisoformat(request.args['from']) if request.args.get('from') else datetime.now()
+        end = datetime.fromisoformat(request.args['to']) if request.args.get('to') else start + timedelta(days=MATERIALIZE_DAYS)
+        if end <= start:
+            return jsonify({'error': 'to debe ser posterior a from'}), 400
+        if end - start > timedelta(days=MAX_WINDOW_DAYS):
+            return jsonify({'error': f'La ventana no puede superar {MAX_WINDOW_DAYS} días'}), 400
+
+        rows = Appointment.query.filter(
+            Appointment.series_id == series.id,
+            Appointment.appointment_date >= start,
+            Appointment.appointment_date < end
+        ).all()
+        items = [appointment.to_dict() for appointment in rows]
+        patient_name = series.patient.full_name if series.patient else None
+        items.extend(series.virtual_occurrence(occurrence_date, patient_name) for _, occurrence_date in virtual_occurrences([series], start, end))
+        items.sort(key=lambda item: item['appointment_date'])
+
+        return jsonify({'series': series.to_dict(), 'occurrences': items})
+    except ValueError as ve:
+        return jsonify({'error': f'Error en formato de datos: {str(ve)}'}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def _occurrence_row(series, original_date):
+    """Fila de la ocurrencia; si aún es virtual la materializa (sin commit)"""
+    appointment = Appointment.query.filter_by(series_id=series.id, original_date=original_date).first()
+    if appointment is None:
+        if not series.is_occurrence(original_date):
+            return None
+        appointment = build_occurrence(series, original_date)
+        db.session.add(appointment)
+    return appointment
+
+def _edit_this(series, original_date, data):
+    """Modifica solo esta ocurrencia (queda como fila propia, vinculada por original_date)"""
+    appointment = _occurrence_row(series, original_date)
+    if appointment is None:
+        return jsonify({'error': 'La fecha no corresponde a una ocurrencia de la serie'}), 404
+    if appointment.status == 'completada':
+        return jsonify({'error': 'No se pueden modificar citas completadas'}), 400
+
+    if 'appointment_date' in data:
+        new_date = datetime.fromisoformat(data['appointment_date'])
+        if new_date < datetime.now():
+            return jsonify({'error': 'No se puede reprogramar a una fecha pasada'}), 400
+        appointment.appointment_date = new_date
+    if 'duration_minutes' in data:
+        appointment.duration_minutes = int(data['duration_minutes'])
+    for field in ('appointment_type', 'reason', 'observations', 'status', 'cancellation_reason'):
+        if field in data:
+            setattr(appointment, field, data[field])
+
+    db.session.flush()
+    if appointment.status in ACTIVE_STATUSES and ('appointment_date' in data or 'duration_minutes' in data):
+        conflicts = find_conflicts(
+            series.doctor_id_snapshot, [(appointment.appointment_date, appointment.duration_minutes)],
+            exclude_appointment_id=appointment.id
+        )
+        if conflicts:
+            db.session.rollback()
+            return _conflict_response(conflicts)
+
+    db.session.commit()
+    return jsonify({'message': 'Cita actualizada exitosamente', 'appointment': appointment.to_dict()})
+
+def _edit_following(series, original_date, data):
+    """
+    Modifica esta ocurrencia y las siguientes: la serie original termina antes de original_date
+    y el resto continúa en una serie nueva con los cambios.
+    """
+    if not series.is_occurrence(original_date):
+        return jsonify({'error': 'La fecha no corresponde a una ocurrencia de la serie'}), 404
+
+    rule = series.rule
+    new_rule = parse_rrule(data['rrule']) if data.get('rrule') else dict(rule)
+    if not data.get('rrule') and rule['count']:
+        # COUNT cuenta desde dtstart (incluidas las excluidas): la nueva serie hereda lo que faltaba
+        previous = sum(1 for _ in occurrences(rule, series.dtstart, None, original_date))
+        new_rule['count'] = rule['count'] - previous
+    new_start = datetime.fromisoformat(data['appointment_date']) if data.get('appointment_date') else original_date
+    if new_start < datetime.now():
+        return jsonify({'error': 'No se puede reprogramar a una fecha pasada'}), 400
+    shift = new_start - original_date
+    if not data.get('rrule') and new_rule['byday']:
+        # Mover la ocurrencia a otro día de la semana mueve también los días de la regla
+        offset = new_start.weekday() - original_date.weekday()
+        new_rule['byday'] = sorted({(day + offset) % 7 for day in new_rule['byday']})
+
+    following = AppointmentSeries(
+        patient_id=series.patient_id,
+        doctor_name=series.doctor_name,
+        doctor_email=series.doctor_email,
+        doctor_role=series.doctor_role,
+        doctor_id_snapshot=series.doctor_id_snapshot,
+        created_by_name=series.created_by_name,
+        created_by_role=series.created_by_role,
+        dtstart=new_start,
+        materialized_until=new_start,
+        status='activa',
+        **{field: data[field] if field in data else getattr(series, field) for field in EDITABLE_FIELDS}
+    )
+    if 'duration_minutes' in data:
+        following.duration_minutes = int(data['duration_minutes'])
+    for excluded in series.excluded_dates():
+        if excluded >= original_date:
+            following.exclude(excluded + shift)
+    # Las ocurrencias ya canceladas, atendidas o con inasistencia se quedan en la serie original
+    # como historial; la nueva serie no debe volver a crearlas como pendientes
+    for (closed_date,) in db.session.query(Appointment.original_date).filter(
+        Appointment.series_id == series.id,
+        Appointment.original_date >= original_date,
+        Appointment.status.notin_(ACTIVE_STATUSES)
+    ):
+        following.exclude(closed_date + shift)
+    following.set_rule(format_rrule(new_rule))
+
+    # La serie original termina justo antes de esta ocurrencia
+    rule.update(count=None, until=original_date - timedelta(seconds=1))
+    series.set_rule(format_rrule(rule))
+    series.materialized_until = min(series.materialized_until, original_date)
+    if series.dtstart >= original_date:
+        series.status = 'finalizada'
+
+    # Las filas activas desde esta ocurrencia se regeneran en la serie nueva
+    for appointment in Appointment.query.filter(
+        Appointment.series_id == series.id,
+        Appointment.original_date >= original_date,
+        Appointment.status.in_(ACTIVE_STATUSES)
+    ).all():
+        db.session.delete(appointment)
+
+    db.session.add(following)
+    db.session.flush()
+    conflicts = find_conflicts(series.doctor_id_snapshot, series_slots(following), exclude_series_id=following.id)
+    if conflicts:
+        db.session.rollback()
+        return _conflict_response(conflicts)
+
+    materialized = materialize(following, _horizon(datetime.now()))
+    db.session.commit()
+    return jsonify({
+        'message': 'Serie actualizada exitosamente',
+        'series': series.to_dict(),
+        'following_series': following.to_dict(),
+        'materialized': materialized
+    })
+
+@appointment_series_bp.route('/<int:series_id>/occurrences/<original_date>', methods=['PUT'])
+@jwt_required()
+@role_required('administrador', 'medico', 'tecnico', 'administrativo')
+def update_occurrence(series_id, original_date):
+    """Modificar una ocurrencia (?scope=this) o esta y las siguientes (?scope=following)"""
+    try:
+        series = AppointmentSeries.query.get_or_404(series_id)
+        data = request.json
+        scope = request.args.get('scope', 'this')
+        original_date = datetime.fromisoformat(original_date)
+
+        if original_date < datetime.now():
+            return jsonify({'error': 'No se pueden modificar ocurrencias pasadas'}), 400
+        if scope == 'this':
+            return _edit_this(series, original_date, data)
+        if scope == 'following':
+            return _edit_following(series, original_date, data)
+        return jsonify({'error': 'scope debe ser this o following'}), 400
+
+    except ValueError as ve:
+        db.session.rollback()
+        return jsonify({'error': f'Error en formato de datos: {str(ve)}'}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@appointment_series_bp.route('/<int:series_id>/occurrences/<original_date>', methods=['DELETE'])
+@jwt_required()
+@role_required('administrador', 'medico', 'tecnico', 'administrativo')
+def cancel_occurrence(series_id, original_date):
+    """Cancelar una sola ocurrencia: si es virtual basta con excluirla de la regla"""
+    try:
+        series = AppointmentSeries.query.get_or_404(series_id)
+        original_date = datetime.fromisoformat(original_date)
+        appointment = Appointment.query.filter_by(series_id=series.id, original_date=original_date).first()
+
+        if appointment is not None:
+            if appointment.status in ['completada', 'cancelada', 'no_asistio']:
+                return jsonify({'error': f'La cita ya está {appointment.status}'}), 400
+            appointment.status = 'cancelada'
+            appointment.cancellation_reason = (request.get_json(silent=True) or {}).get('cancellation_reason', 'Sin especificar')
+            freed = (appointment.appointment_date, appointment.duration_minutes)
+        elif series.is_occurrence(original_date):
+            series.exclude(original_date)
+            freed = (original_date, series.duration_minutes)
+        else:
+            return jsonify({'error': 'La fecha no corresponde a una ocurrencia de la serie'}), 404
+
+        db.session.commit()
+        waitlist_offer = offer_freed_slot(series.doctor_id_snapshot, *freed)
+        return jsonify({'message': 'Ocurrencia cancelada exitosamente', 'series': series.to_dict(), 'waitlist_offer': waitlist_offer})
+    except ValueError as ve:
+        db.session.rollback()
+        return jsonify({'error': f'Error en formato de datos: {str(ve)}'}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@appointment_series_bp.route('/<int:series_id>', methods=['DELETE'])
+@jwt_required()
+@role_required('administrador', 'administrativo')
+def end_series(series_id):
+    """Terminar la serie: no genera más ocurrencias y cancela las citas activas desde ahora (o ?from=)"""
+    try:
+        series = AppointmentSeries.query.get_or_404(series_id)
+        cutoff = datetime.fromisoformat(request.args['from']) if request.args.get('from') else datetime.now()
+
+        rule = series.rule
+        rule.update(count=None, until=cutoff - timedelta(seconds=1))
+        series.set_rule(format_rrule(rule))
+        series.materialized_until = min(series.materialized_until, cutoff)
+        series.status = 'finalizada'
+
+        cancelled = 0
+        for appointment in Appointment.query.filter(
+            Appointment.series_id == series.id,
+            Appointment.appointment_date >= cutoff,
+            Appointment.status.in_(ACTIVE_STATUSES)
+        ).all():
+            appointment.status = 'cancelada'
+            appointment.cancellation_reason = 'Serie finalizada'
+            cancelled += 1
+
+        db.session.commit()
+        return jsonify({'message': 'Serie finalizada exitosamente', 'series': series.to_dict(), 'cancelled': cancelled})
+    except ValueError as ve:
+        db.session.rollback()
+        return jsonify({'error': f'Error en formato de datos: {str(ve)}'}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
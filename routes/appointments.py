@@ -1,18 +1,67 @@
-from flask import Blueprint, request, jsonify
-from datetime import datetime, timedelta
-from models import Appointment, Patient, User, db
+from flask import Blueprint, request, jsonify, Response, stream_with_context, url_for, make_response, current_app
+from datetime import datetime, timedelta, timezone
+from models import Appointment, AppointmentSeries, Patient, User, DeletionLog, CalendarFeedToken, db
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from utils.permissions import role_required
-from sqlalchemy import desc, and_, or_
+from sqlalchemy import desc, and_, or_, func, select
+from sqlalchemy.orm import joinedload
+from utils.http_cache import build_etag, conditional_json, list_version, latest_timestamp, is_not_modified
+from utils.cache import cache
+from utils.fields import parse_fields, projection
+from utils.fastread import read_rows
+from utils.events import broker
+from utils.sweeper import sweep_stale_appointments, last_sweep
+from utils.series import virtual_appointments, find_conflicts, conflict_message
+from utils.waitlist import offer_freed_slot, held_offers
+from utils.icalendar import calendar_header, render_event, CALENDAR_FOOTER
 
 appointments_bp = Blueprint('appointments', __name__, url_prefix='/appointments')
 
+UPCOMING_DAYS = 7
+
+def appointment_projection(fields):
+    """Opciones de carga para ?fields= (patient_name requiere el paciente)"""
+    return projection(Appointment, fields, Appointment.COMPUTED_FIELDS, {
+        'patient_name': joinedload(Appointment.patient).load_only(Patient.full_name, Patient.updated_at)
+    })
+
+# patient_name en la lectura rápida: LEFT JOIN con paciente
+FAST_JOINS = {'patient_name': (Patient.full_name, Patient.__table__, Patient.id == Appointment.patient_id)}
+
+def trim_fields(items, fields):
+    """Aplica ?fields= sobre listas ya serializadas (p. ej. las servidas desde caché)"""
+    if fields is None:
+        return items
+    return [{field: item[field] for field in fields} for item in items]
+
+AGENDA_TTL = 300
+
+# Caché de agenda (/today y /upcoming) por día; se invalida con los eventos de citas
+def invalidate_agenda(evt):
+    """Invalida solo las entradas de agenda cuya ventana contiene la cita modificada"""
+    if evt['type'] in ('patient.updated', 'patient.deleted'):
+        cache.invalidate_tags('agenda')             # patient_name va embebido en cada cita
+        return
+    if not evt['type'].startswith('appointment.'):
+        return
+    for value in (evt.get('appointment_date'), evt.get('previous_date')):
+        if not value:
+            continue
+        day = datetime.fromisoformat(value).date()
+        cache.delete(
+            f'agenda:today:{day}',
+            *[f'agenda:upcoming:{day - timedelta(days=offset)}' for offset in range(UPCOMING_DAYS + 1)]
+        )
+
+broker.add_handler(invalidate_agenda)
+
 @appointments_bp.route('/', methods=['GET'])
 @jwt_required()
 def get_appointments():
     """Obtener todas las citas con filtros opcionales"""
     try:
-        query = Appointment.query
+        fields = parse_fields(Appointment.FIELDS)
+        conditions = []
         
         # Filtros opcionales
         status = request.args.get('status')
@@ -22,18 +71,46 @@ def get_appointments():
         date_to = request.args.get('date_to')
         
         if status:
-            query = query.filter_by(status=status)
+            conditions.append(Appointment.status == status)
         if patient_id:
-            query = query.filter_by(patient_id=int(patient_id))
+            conditions.append(Appointment.patient_id == int(patient_id))
         if doctor_id:
-            query = query.filter_by(doctor_id_snapshot=int(doctor_id))
+            conditions.append(Appointment.doctor_id_snapshot == int(doctor_id))
         if date_from:
-            query = query.filter(Appointment.appointment_date >= datetime.fromisoformat(date_from))
+            conditions.append(Appointment.appointment_date >= datetime.fromisoformat(date_from))
         if date_to:
-            query = query.filter(Appointment.appointment_date <= datetime.fromisoformat(date_to))
+            conditions.append(Appointment.appointment_date <= datetime.fromisoformat(date_to))
+        
+        # ?include_virtual=true agrega las ocurrencias de series aún no materializadas (requiere ventana)
+        include_virtual = request.args.get('include_virtual', '').lower() in ['1', 'true', 'yes'] and status in (None, '', 'pendiente')
+        if include_virtual and not (date_from and date_to):
+            return jsonify({'error': 'include_virtual requiere date_from y date_to'}), 400
+        
+        query = Appointment.query.filter(*conditions)
+        last_modified, count = list_version(query, Appointment)
+        patients_modified = db.session.query(func.max(Patient.updated_at)).scalar()  # patient_name viene del paciente
+        series_version = list_version(AppointmentSeries.query, AppointmentSeries) if include_virtual else None
+        etag = build_etag('appointments', request.query_string.decode(), last_modified, count, patients_modified, series_version)
+        
+        def build():
+            items = read_rows(
+                Appointment, fields or Appointment.FIELDS, conditions,
+                order_by=[Appointment.appointment_date], joined=FAST_JOINS
+            )
+            if include_virtual:
+                end = datetime.fromisoformat(date_to) + timedelta(microseconds=1)      # date_to es inclusivo
+                virtual = virtual_appointments(
+                    datetime.fromisoformat(date_from), end,
+                    doctor_id=int(doctor_id) if doctor_id else None,
+                    patient_id=int(patient_id) if patient_id else None
+                )
+                items.extend(trim_fields(virtual, fields or Appointment.FIELDS))
+                items.sort(key=lambda item: item.get('appointment_date') or '')
+            return items
         
-        appointments = query.order_by(Appointment.appointment_date).all()
-        return jsonify([appointment.to_dict() for appointment in appointments])
+        return conditional_json(build, etag, latest_timestamp(last_modified, patients_modified))
+    except ValueError as ve:
+        return jsonify({'error': f'Error en formato de datos: {str(ve)}'}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -42,8 +119,13 @@ def get_appointments():
 def get_appointment(appointment_id):
     """Obtener una cita específica"""
     try:
-        appointment = Appointment.query.get_or_404(appointment_id)
-        return jsonify(appointment.to_dict())
+        fields = parse_fields(Appointment.FIELDS)
+        appointment = Appointment.query.options(*appointment_projection(fields)).get_or_404(appointment_id)
+        patient_modified = appointment.patient.updated_at if appointment.patient else None
+        etag = build_etag('appointment', appointment.id, appointment.updated_at, patient_modified, fields)
+        return conditional_json(lambda: appointment.to_dict(fields), etag, latest_timestamp(appointment.updated_at, patient_modified))
+    except ValueError as ve:
+        return jsonify({'error': f'Error en formato de datos: {str(ve)}'}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -52,12 +134,18 @@ def get_appointment(appointment_id):
 def get_patient_appointments(patient_id):
     """Obtener citas de un paciente específico"""
     try:
+        fields = parse_fields(Appointment.FIELDS)
         patient = Patient.query.get_or_404(patient_id)
-        appointments = Appointment.query.filter_by(
-            patient_id=patient_id
-        ).order_by(desc(Appointment.appointment_date)).all()
+        query = Appointment.query.filter_by(patient_id=patient_id)
+        last_modified, count = list_version(query, Appointment)
+        etag = build_etag('patient_appointments', patient_id, last_modified, count, patient.updated_at, fields)
         
-        return jsonify([appointment.to_dict() for appointment in appointments])
+        return conditional_json(
+            lambda: [appointment.to_dict(fields) for appointment in query.options(*appointment_projection(fields)).order_by(desc(Appointment.appointment_date)).all()],
+            etag, latest_timestamp(last_modified, patient.updated_at)
+        )
+    except ValueError as ve:
+        return jsonify({'error': f'Error en formato de datos: {str(ve)}'}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -66,17 +154,26 @@ def get_patient_appointments(patient_id):
 def get_today_appointments():
     """Obtener citas del día actual"""
     try:
+        fields = parse_fields(Appointment.FIELDS)
         today_start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
         today_end = today_start + timedelta(days=1)
         
-        appointments = Appointment.query.filter(
-            and_(
-                Appointment.appointment_date >= today_start,
-                Appointment.appointment_date < today_end
-            )
-        ).order_by(Appointment.appointment_date).all()
+        appointments = cache.get_or_set(
+            f'agenda:today:{today_start.date()}',
+            lambda: [appointment.to_dict() for appointment in Appointment.query.options(
+                joinedload(Appointment.patient)                     # Evita una consulta por paciente
+            ).filter(
+                and_(
+                    Appointment.appointment_date >= today_start,
+                    Appointment.appointment_date < today_end
+                )
+            ).order_by(Appointment.appointment_date).all()],
+            ttl=AGENDA_TTL, tags=('agenda',)
+        )
         
-        return jsonify([appointment.to_dict() for appointment in appointments])
+        return jsonify(trim_fields(appointments, fields))
+    except ValueError as ve:
+        return jsonify({'error': f'Error en formato de datos: {str(ve)}'}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -85,18 +182,223 @@ def get_today_appointments():
 def get_upcoming_appointments():
     """Obtener próximas citas (próximos 7 días)"""
     try:
+        fields = parse_fields(Appointment.FIELDS)
         now = datetime.now()
-        week_later = now + timedelta(days=7)
+        week_later = now + timedelta(days=UPCOMING_DAYS)
+        
+        # Se cachea la ventana completa del día [00:00, +8 días) y se recorta según la hora actual
+        day_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        window = cache.get_or_set(
+            f'agenda:upcoming:{day_start.date()}',
+            lambda: [appointment.to_dict() for appointment in Appointment.query.options(
+                joinedload(Appointment.patient)
+            ).filter(
+                and_(
+                    Appointment.appointment_date >= day_start,
+                    Appointment.appointment_date < day_start + timedelta(days=UPCOMING_DAYS + 1),
+                    Appointment.status.in_(['pendiente', 'confirmada'])
+                )
+            ).order_by(Appointment.appointment_date).all()],
+            ttl=AGENDA_TTL, tags=('agenda',)
+        )
         
-        appointments = Appointment.query.filter(
-            and_(
-                Appointment.appointment_date >= now,
-                Appointment.appointment_date <= week_later,
-                Appointment.status.in_(['pendiente', 'confirmada'])
+        appointments = [
+            appointment for appointment in window
+            if now <= datetime.fromisoformat(appointment['appointment_date']) <= week_later
+        ][:10]
+        
+        return jsonify(trim_fields(appointments, fields))
+    except ValueError as ve:
+        return jsonify({'error': f'Error en formato de datos: {str(ve)}'}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@appointments_bp.route('/cache/stats', methods=['GET'])
+@jwt_required()
+@role_required('administrador')
+def get_agenda_cache_stats():
+    """Estadísticas de la caché (aciertos / fallos de este worker)"""
+    try:
+        return jsonify(cache.stats())
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@appointments_bp.route('/sweep', methods=['POST'])
+@jwt_required()
+@role_required('administrador')
+def sweep_appointments():
+    """Cierra las citas activas vencidas (?dry_run=true solo cuenta; ?max_batches= acota el trabajo)"""
+    try:
+        dry_run = request.args.get('dry_run', '').lower() in ['1', 'true', 'yes']
+        max_batches = request.args.get('max_batches', type=int)
+        return jsonify(sweep_stale_appointments(dry_run=dry_run, max_batches=max_batches))
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@appointments_bp.route('/sweep', methods=['GET'])
+@jwt_required()
+@role_required('administrador')
+def get_last_sweep():
+    """Métricas del último barrido de citas"""
+    try:
+        metrics = last_sweep()
+        if not metrics:
+            return jsonify({'error': 'Aún no se ha ejecutado ningún barrido'}), 404
+        return jsonify(metrics)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# --- Feed iCalendar por médico ---
+
+CALENDAR_PAST_DAYS = 30
+CALENDAR_FUTURE_DAYS = 180
+CALENDAR_EVENT_TTL = 7 * 24 * 3600  # Los bloques se versionan por updated_at: nunca hay que invalidarlos
+CALENDAR_CHUNK = 500                # Citas por lectura de BD y por consulta a la caché
+
+def _render_events(events):
+    """Bloques VEVENT del lote: los que no cambiaron salen de la caché, solo se renderizan los nuevos"""
+    cached = cache.get_many([event['key'] for event in events])
+    rendered = {}
+    blocks = []
+    for event in events:
+        block = cached.get(event['key'])
+        if block is None:
+            block = rendered[event['key']] = render_event(
+                event['uid'], event['start'], event['duration'], event['summary'],
+                event['description'], event['status'], event['stamp']
             )
-        ).order_by(Appointment.appointment_date).limit(10).all()
+        blocks.append(block)
+    cache.set_many(rendered, ttl=CALENDAR_EVENT_TTL)
+    return ''.join(blocks)
+
+def _occurrence_uid(series_id, original_date):
+    """UID estable de una ocurrencia de serie: no cambia al materializarse"""
+    return f'series-{series_id}-{original_date.strftime("%Y%m%dT%H%M%S")}@elias'
+
+def _row_event(row):
+    return {
+        'key': f'ics:appointment:{row.id}:{row.updated_at.isoformat()}:{row.patient_updated_at.isoformat() if row.patient_updated_at else ""}',
+        'uid': _occurrence_uid(row.series_id, row.original_date) if row.series_id and row.original_date else f'appointment-{row.id}@elias',
+        'start': row.appointment_date,
+        'duration': row.duration_minutes,
+        'summary': f'{row.appointment_type}: {row.full_name or ""}',
+        'description': '\n'.join(value for value in (row.reason, row.observations) if value),
+        'status': row.status,
+        'stamp': row.updated_at
+    }
+
+def _virtual_event(item):
+    original_date = datetime.fromisoformat(item['original_date'])
+    return {
+        'key': f'ics:series:{item["series_id"]}:{item["original_date"]}:{item["updated_at"]}',
+        'uid': _occurrence_uid(item['series_id'], original_date),
+        'start': original_date,
+        'duration': item['duration_minutes'],
+        'summary': f'{item["appointment_type"]}: {item["patient_name"] or ""}',
+        'description': '\n'.join(value for value in (item['reason'], item['observations']) if value),
+        'status': item['status'],
+        'stamp': datetime.fromisoformat(item['updated_at'])
+    }
+
+def _can_manage_calendar(doctor_id):
+    current_user = User.query.get(int(get_jwt_identity()))
+    return current_user is not None and (current_user.role == 'administrador' or current_user.id == doctor_id)
+
+@appointments_bp.route('/doctor/<int:doctor_id>/calendar-token', methods=['POST'])
+@jwt_required()
+def create_calendar_token(doctor_id):
+    """Emite el token de suscripción al calendario (revoca los anteriores) - el propio médico o un administrador"""
+    try:
+        if not _can_manage_calendar(doctor_id):
+            return jsonify({'error': 'Solo puedes gestionar tu propio calendario'}), 403
+        doctor = User.query.get_or_404(doctor_id)
+        if doctor.role not in ['medico', 'administrador']:
+            return jsonify({'error': 'El usuario seleccionado no es un médico'}), 400
         
-        return jsonify([appointment.to_dict() for appointment in appointments])
+        record, token = CalendarFeedToken.issue(doctor.id)
+        db.session.commit()
+        
+        return jsonify({
+            'message': 'Token de calendario creado; guárdelo, no se volverá a mostrar',
+            'token': token,
+            'url': url_for('appointments.get_doctor_calendar', doctor_id=doctor.id, token=token, _external=True),
+            'feed': record.to_dict()
+        }), 201
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@appointments_bp.route('/doctor/<int:doctor_id>/calendar-token', methods=['DELETE'])
+@jwt_required()
+def revoke_calendar_token(doctor_id):
+    """Revoca los tokens de calendario del médico"""
+    try:
+        if not _can_manage_calendar(doctor_id):
+            return jsonify({'error': 'Solo puedes gestionar tu propio calendario'}), 403
+        revoked = CalendarFeedToken.revoke_all(doctor_id)
+        db.session.commit()
+        return jsonify({'message': 'Tokens de calendario revocados', 'revoked': revoked})
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@appointments_bp.route('/doctor/<int:doctor_id>/calendar.ics', methods=['GET'])
+def get_doctor_calendar(doctor_id):
+    """Agenda del médico en formato iCalendar (autenticada con ?token= del feed, no con JWT)"""
+    try:
+        if CalendarFeedToken.verify(doctor_id, request.args.get('token')) is None:
+            return jsonify({'error': 'Token de calendario inválido o revocado'}), 401
+        doctor = User.query.get_or_404(doctor_id)
+        
+        today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        start = today - timedelta(days=CALENDAR_PAST_DAYS)
+        end = today + timedelta(days=CALENDAR_FUTURE_DAYS)
+        conditions = [
+            Appointment.doctor_id_snapshot == doctor_id,
+            Appointment.appointment_date >= start,
+            Appointment.appointment_date < end
+        ]
+        
+        # Versión del feed: última modificación de las citas del médico en la ventana (y de sus series)
+        last_modified, count = list_version(Appointment.query.filter(*conditions), Appointment)
+        patients_modified = db.session.query(func.max(Patient.updated_at)).scalar()  # El nombre del paciente va en SUMMARY
+        series_version = list_version(AppointmentSeries.query.filter_by(doctor_id_snapshot=doctor_id), AppointmentSeries)
+        etag = build_etag('calendar', doctor_id, start.date(), last_modified, count, patients_modified, series_version)
+        
+        if is_not_modified(etag, last_modified):
+            response = make_response('', 304)
+        else:
+            name = f'Agenda {doctor.full_name}'
+            calendar_timezone = current_app.config.get('CALENDAR_TIMEZONE')          # p. ej. America/Santiago
+            virtual = [_virtual_event(item) for item in virtual_appointments(start, end, doctor_id=doctor_id)]
+            
+            def generate():
+                yield calendar_header(name, calendar_timezone)
+                result = db.session.execute(
+                    select(
+                        Appointment.id, Appointment.appointment_date, Appointment.duration_minutes,
+                        Appointment.appointment_type, Appointment.reason, Appointment.observations,
+                        Appointment.status, Appointment.updated_at, Appointment.series_id, Appointment.original_date,
+                        Patient.full_name, Patient.updated_at.label('patient_updated_at')
+                    ).outerjoin(Patient, Patient.id == Appointment.patient_id)
+                    .where(*conditions).order_by(Appointment.appointment_date)
+                    .execution_options(yield_per=CALENDAR_CHUNK)
+                )
+                for rows in result.partitions():
+                    yield _render_events([_row_event(row) for row in rows])
+                for i in range(0, len(virtual), CALENDAR_CHUNK):
+                    yield _render_events(virtual[i:i + CALENDAR_CHUNK])
+                yield CALENDAR_FOOTER
+            
+            response = Response(stream_with_context(generate()), mimetype='text/calendar')
+            response.headers['Content-Disposition'] = f'inline; filename="agenda-{doctor_id}.ics"'
+        
+        response.set_etag(etag)
+        if last_modified:
+            response.last_modified = last_modified.replace(tzinfo=timezone.utc)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -146,38 +448,39 @@ def create_appointment():
             return jsonify({'error': 'No se pueden crear citas en fechas pasadas'}), 400
         
         # Verificar conflictos de horario para el médico
-        duration = data.get('duration_minutes', 30)
+        duration = int(data.get('duration_minutes', 30))
         appointment_end = appointment_datetime + timedelta(minutes=duration)
         
-        conflicting_appointments = Appointment.query.filter(
+        # Candidatas: citas activas del médico que comienzan antes del término de la nueva
+        # (ninguna cita dura más de un día); el solapamiento exacto se verifica con is_conflict_with
+        candidate = Appointment(
+            doctor_id_snapshot=doctor.id,
+            appointment_date=appointment_datetime,
+            duration_minutes=duration
+        )
+        existing_appointments = Appointment.query.filter(
             and_(
                 Appointment.doctor_id_snapshot == doctor.id,
                 Appointment.status.in_(['pendiente', 'confirmada']),
-                or_(
-                    # La nueva cita comienza durante una cita existente
-                    and_(
-                        Appointment.appointment_date <= appointment_datetime,
-                        Appointment.appointment_date + timedelta(minutes=Appointment.duration_minutes) > appointment_datetime
-                    ),
-                    # La nueva cita termina durante una cita existente
-                    and_(
-                        Appointment.appointment_date < appointment_end,
-                        Appointment.appointment_date + timedelta(minutes=Appointment.duration_minutes) >= appointment_end
-                    ),
-                    # La nueva cita envuelve completamente una cita existente
-                    and_(
-                        Appointment.appointment_date >= appointment_datetime,
-                        Appointment.appointment_date + timedelta(minutes=Appointment.duration_minutes) <= appointment_end
-                    )
-                )
+                Appointment.appointment_date < appointment_end,
+                Appointment.appointment_date > appointment_datetime - timedelta(days=1)
             )
-        ).first()
+        ).all()
+        conflicting_appointments = next(
+            (existing for existing in existing_appointments if candidate.is_conflict_with(existing)),
+            None
+        )
         
         if conflicting_appointments:
             return jsonify({
                 'error': f'El médico ya tiene una cita programada a las {conflicting_appointments.appointment_date.strftime("%H:%M")}'
             }), 409
         
+        # Ocurrencias de series del médico que aún no tienen fila y horas reservadas por la lista de espera
+        series_conflicts = find_conflicts(doctor.id, [(appointment_datetime, duration)], include_rows=False)
+        if series_conflicts:
+            return jsonify({'error': conflict_message(series_conflicts[0])}), 409
+        
         # Preparar datos de la cita
         appointment_data = {
             'appointment_date': appointment_datetime,
@@ -233,6 +536,17 @@ def update_appointment(appointment_id):
         
         if 'duration_minutes' in data:
             appointment.duration_minutes = int(data['duration_minutes'])
+
+        # Una hora ofrecida a la lista de espera queda reservada hasta que la oferta vence
+        if appointment.status in ['pendiente', 'confirmada'] and ('appointment_date' in data or 'duration_minutes' in data):
+            offers = held_offers(
+                appointment.doctor_id_snapshot, appointment.appointment_date,
+                appointment.appointment_date + timedelta(minutes=appointment.duration_minutes or 0)
+            )
+            if offers:
+                db.session.rollback()
+                return jsonify({'error': conflict_message({'waitlist_id': offers[0].id, 'conflicts_with': offers[0].offered_date.isoformat()})}), 409
+
         if 'appointment_type' in data:
             appointment.appointment_type = data['appointment_type']
         if 'reason' in data:
@@ -265,9 +579,15 @@ def delete_appointment(appointment_id):
     """Eliminar cita - Solo administrador y administrativo"""
     try:
         appointment = Appointment.query.get_or_404(appointment_id)
+        freed = (appointment.doctor_id_snapshot, appointment.appointment_date, appointment.duration_minutes) \
+            if appointment.status in ['pendiente', 'confirmada'] else None
+        DeletionLog.record('appointment', appointment.id)
         db.session.delete(appointment)
         db.session.commit()
-        return jsonify({'message': 'Cita eliminada exitosamente'})
+        
+        # La hora liberada se ofrece al primer candidato de la lista de espera
+        waitlist_offer = offer_freed_slot(*freed) if freed else None
+        return jsonify({'message': 'Cita eliminada exitosamente', 'waitlist_offer': waitlist_offer})
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -281,7 +601,7 @@ def cancel_appointment(appointment_id):
         appointment = Appointment.query.get_or_404(appointment_id)
         data = request.json
         
-        if appointment.status in ['completada', 'cancelada']:
+        if appointment.status in ['completada', 'cancelada', 'no_asistio']:
             return jsonify({'error': f'La cita ya está {appointment.status}'}), 400
         
         appointment.status = 'cancelada'
@@ -289,9 +609,13 @@ def cancel_appointment(appointment_id):
         
         db.session.commit()
         
+        # La hora liberada se ofrece al primer candidato de la lista de espera
+        waitlist_offer = offer_freed_slot(appointment.doctor_id_snapshot, appointment.appointment_date, appointment.duration_minutes)
+        
         return jsonify({
             'message': 'Cita cancelada exitosamente',
-            'appointment': appointment.to_dict()
+            'appointment': appointment.to_dict(),
+            'waitlist_offer': waitlist_offer
         })
     except Exception as e:
         db.session.rollback()
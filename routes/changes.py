@@ -0,0 +1,136 @@
+from flask import Blueprint, request, jsonify
+from datetime import datetime, timedelta
+from models import Patient, ClinicalRecord, Appointment, Task, DeletionLog
+from flask_jwt_extended import jwt_required
+from routes.tasks import serialize_task
+from sqlalchemy import tuple_
+import base64
+import json
+
+changes_bp = Blueprint('changes', __name__, url_prefix='/changes')
+
+# Entidades sincronizables: modelo y serializador
+SYNC_ENTITIES = {
+    'patient': (Patient, lambda patient: patient.to_dict()),
+    'clinical_record': (ClinicalRecord, lambda record: record.to_dict()),
+    'appointment': (Appointment, lambda appointment: appointment.to_dict()),
+    'task': (Task, serialize_task)
+}
+
+DEFAULT_LIMIT = 500
+MAX_LIMIT = 2000
+SAFETY_WINDOW = timedelta(seconds=5)        # Margen para transacciones que confirman tarde con updated_at anterior
+
+def parse_token(token):
+    """
+    El token guarda un cursor (fecha UTC, id) por flujo: filas de cada entidad y sus tombstones
+    ('<entidad>:deleted'). Los tokens antiguos (solo la fecha ISO) siguen aceptándose.
+    """
+    try:
+        return {}, datetime.fromisoformat(token)
+    except ValueError:
+        pass
+    try:
+        raw = json.loads(base64.urlsafe_b64decode(token.encode('ascii')))
+        cursors = {stream: (datetime.fromisoformat(ts), int(row_id)) for stream, (ts, row_id) in raw.items()}
+    except Exception:
+        raise ValueError('token inválido')
+    if not cursors:
+        raise ValueError('token inválido')
+    return cursors, min(ts for ts, _ in cursors.values())
+
+def build_token(cursors):
+    raw = {stream: [ts.isoformat(), row_id] for stream, (ts, row_id) in cursors.items()}
+    return base64.urlsafe_b64encode(json.dumps(raw, separators=(',', ':')).encode('ascii')).decode('ascii')
+
+def read_stream(query, ts_column, id_column, cursor, limit):
+    """
+    Filas posteriores al cursor en orden (fecha, id). La comparación por tupla garantiza avance
+    aunque más de 'limit' filas compartan la misma fecha (importaciones, barridos por lotes);
+    la condición simple sobre la fecha permite usar el índice de la columna.
+    """
+    ts, row_id = cursor
+    return query.filter(
+        ts_column >= ts, tuple_(ts_column, id_column) > tuple_(ts, row_id)
+    ).order_by(ts_column, id_column).limit(limit + 1).all()
+
+@changes_bp.route('/', methods=['GET'])
+@jwt_required()
+def get_changes():
+    """
+    Obtener filas modificadas y tombstones de eliminación desde un token.
+    Sin 'since' no se devuelven filas, solo el token inicial (el cliente hace la carga completa).
+    """
+    try:
+        started_at = datetime.utcnow()
+
+        entities = request.args.get('entities')
+        entities = [e.strip() for e in entities.split(',') if e.strip()] if entities else list(SYNC_ENTITIES)
+        unknown = [e for e in entities if e not in SYNC_ENTITIES]
+        if unknown:
+            return jsonify({'error': f'Entidades inválidas: {", ".join(unknown)}'}), 400
+
+        limit = min(int(request.args.get('limit', DEFAULT_LIMIT)), MAX_LIMIT)
+        if limit < 1:
+            raise ValueError('limit debe ser mayor que 0')
+
+        # Sin cursor previo, cada flujo vuelve a leer la ventana de seguridad
+        restart = (started_at - SAFETY_WINDOW, 0)
+
+        since = request.args.get('since')
+        if not since:
+            cursors = {}
+            for entity in entities:
+                cursors[entity] = cursors[f'{entity}:deleted'] = restart
+            return jsonify({'next_token': build_token(cursors), 'changes': {}, 'deleted': {}, 'has_more': False})
+        cursors, since = parse_token(since)
+
+        # Los tombstones antiguos se descartan: el cliente debe recargar todo
+        if since < started_at - timedelta(days=DeletionLog.RETENTION_DAYS):
+            return jsonify({'error': 'Token expirado, se requiere sincronización completa', 'full_resync_required': True}), 410
+
+        changes = {}
+        deleted = {}
+        has_more = False
+        next_cursors = dict(cursors)
+
+        for entity in entities:
+            model, serialize = SYNC_ENTITIES[entity]
+
+            # Se pide una fila extra para detectar truncamiento. Si se trunca, el cursor queda en la
+            # última fila enviada; si no, retrocede a la ventana de seguridad (nunca antes del recibido)
+            cursor = cursors.get(entity, (since, 0))
+            rows = read_stream(model.query, model.updated_at, model.id, cursor, limit)
+            if len(rows) > limit:
+                rows = rows[:limit]
+                has_more = True
+                next_cursors[entity] = (rows[-1].updated_at, rows[-1].id)
+            else:
+                next_cursors[entity] = max(restart, cursor)
+            changes[entity] = [serialize(row) for row in rows]
+
+            stream = f'{entity}:deleted'
+            cursor = cursors.get(stream, (since, 0))
+            tombstones = read_stream(
+                DeletionLog.query.filter(DeletionLog.entity == entity),
+                DeletionLog.deleted_at, DeletionLog.id, cursor, limit
+            )
+            if len(tombstones) > limit:
+                tombstones = tombstones[:limit]
+                has_more = True
+                next_cursors[stream] = (tombstones[-1].deleted_at, tombstones[-1].id)
+            else:
+                next_cursors[stream] = max(restart, cursor)
+            deleted[entity] = [tombstone.entity_id for tombstone in tombstones]
+
+        return jsonify({
+            'since': since.isoformat(),
+            'next_token': build_token(next_cursors),
+            'changes': changes,
+            'deleted': deleted,
+            'has_more': has_more
+        })
+    except ValueError as ve:
+        return jsonify({'error': f'Error en formato de datos: {str(ve)}'}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -1,19 +1,66 @@
 from flask import Blueprint, request, jsonify
 from datetime import datetime
-from models import ClinicalRecord, Patient, User, db
+from models import ClinicalRecord, Patient, User, DeletionLog, db
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from utils.permissions import role_required
-from sqlalchemy import desc
+from sqlalchemy import desc, func
+from sqlalchemy.orm import joinedload
+from utils.batch import parse_ids, fetch_batch
+from utils.fields import parse_fields, projection
+from utils.fastread import read_rows
+from utils.http_cache import build_etag, conditional_json, list_version, latest_timestamp
+from utils.patient_import import iter_rows
+from utils.record_import import import_records
+import io
 
 clinical_records_bp = Blueprint('clinical_records', __name__, url_prefix='/clinical-records')
 
+# patient_name en la lectura rápida: LEFT JOIN con paciente
+FAST_JOINS = {'patient_name': (Patient.full_name, Patient.__table__, Patient.id == ClinicalRecord.patient_id)}
+
+def record_projection(fields):
+    """Opciones de carga para ?fields= (patient_name requiere el paciente)"""
+    return projection(ClinicalRecord, fields, ClinicalRecord.COMPUTED_FIELDS, {
+        'patient_name': joinedload(ClinicalRecord.patient).load_only(Patient.full_name, Patient.updated_at)
+    })
+
 @clinical_records_bp.route('/', methods=['GET'])
 @jwt_required()
 def get_clinical_records():
     """Obtener todas las fichas clínicas"""
     try:
-        records = ClinicalRecord.query.order_by(desc(ClinicalRecord.created_at)).all()
-        return jsonify([record.to_dict() for record in records])
+        fields = parse_fields(ClinicalRecord.FIELDS)
+        query = ClinicalRecord.query
+        last_modified, count = list_version(query, ClinicalRecord)
+        patients_modified = db.session.query(func.max(Patient.updated_at)).scalar()  # patient_name viene del paciente
+        etag = build_etag('clinical_records', last_modified, count, patients_modified, fields)
+        
+        return conditional_json(
+            lambda: read_rows(
+                ClinicalRecord, fields or ClinicalRecord.FIELDS,
+                order_by=[desc(ClinicalRecord.created_at)], joined=FAST_JOINS
+            ),
+            etag, latest_timestamp(last_modified, patients_modified)
+        )
+    except ValueError as ve:
+        return jsonify({'error': f'Error en formato de datos: {str(ve)}'}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@clinical_records_bp.route('/batch', methods=['GET'])
+@jwt_required()
+def get_clinical_records_batch():
+    """Obtener varias fichas clínicas por id (?ids=1,2,3) con una sola consulta"""
+    try:
+        fields = parse_fields(ClinicalRecord.FIELDS)
+        options = record_projection(fields) if fields else [joinedload(ClinicalRecord.patient)]  # patient_name sin una consulta por ficha
+        records, missing = fetch_batch(ClinicalRecord, parse_ids(request.args.get('ids')), *options)
+        return jsonify({
+            'items': [record.to_dict(fields) for record in records],
+            'missing': missing
+        })
+    except ValueError as ve:
+        return jsonify({'error': f'Error en formato de datos: {str(ve)}'}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -22,8 +69,13 @@ def get_clinical_records():
 def get_clinical_record(record_id):
     """Obtener una ficha clínica específica"""
     try:
-        record = ClinicalRecord.query.get_or_404(record_id)
-        return jsonify(record.to_dict())
+        fields = parse_fields(ClinicalRecord.FIELDS)
+        record = ClinicalRecord.query.options(*record_projection(fields)).get_or_404(record_id)
+        patient_modified = record.patient.updated_at if record.patient else None
+        etag = build_etag('clinical_record', record.id, record.updated_at, patient_modified, fields)
+        return conditional_json(lambda: record.to_dict(fields), etag, latest_timestamp(record.updated_at, patient_modified))
+    except ValueError as ve:
+        return jsonify({'error': f'Error en formato de datos: {str(ve)}'}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -35,11 +87,17 @@ def get_patient_records(patient_id):
         # Verificar que el paciente existe
         patient = Patient.query.get_or_404(patient_id)
         
-        records = ClinicalRecord.query.filter_by(
-            patient_id=patient_id
-        ).order_by(desc(ClinicalRecord.created_at)).all()
+        fields = parse_fields(ClinicalRecord.FIELDS)
+        query = ClinicalRecord.query.filter_by(patient_id=patient_id)
+        last_modified, count = list_version(query, ClinicalRecord)
+        etag = build_etag('patient_records', patient_id, last_modified, count, patient.updated_at, fields)
         
-        return jsonify([record.to_dict() for record in records])
+        return conditional_json(
+            lambda: [record.to_dict(fields) for record in query.options(*record_projection(fields)).order_by(desc(ClinicalRecord.created_at)).all()],
+            etag, latest_timestamp(last_modified, patient.updated_at)
+        )
+    except ValueError as ve:
+        return jsonify({'error': f'Error en formato de datos: {str(ve)}'}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -195,6 +253,7 @@ def delete_clinical_record(record_id):
     """Eliminar ficha clínica - Solo administrador"""
     try:
         record = ClinicalRecord.query.get_or_404(record_id)
+        DeletionLog.record('clinical_record', record.id)
         db.session.delete(record)
         db.session.commit()
         return jsonify({'message': 'Ficha clínica eliminada exitosamente'})
@@ -223,4 +282,23 @@ def get_patient_stats(patient_id):
             'last_doctor': last_visit.doctor_name if last_visit else None
         })
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
\ No newline at end of file
+        return jsonify({'error': str(e)}), 500
+
+@clinical_records_bp.route('/import', methods=['POST'])
+@jwt_required()
+@role_required('administrador')
+def import_clinical_records():
+    """
+    Ingesta masiva de fichas históricas. El cuerpo es NDJSON (una ficha por línea con
+    patient_rut y doctor_email). Si la carga se interrumpe, se reenvía el mismo cuerpo
+    con ?resume_from=<checkpoint> para continuar tras el último lote confirmado.
+    """
+    committed = {}
+    try:
+        resume_from = request.args.get('resume_from', 0, type=int)
+        stream = io.TextIOWrapper(request.stream, encoding='utf-8-sig')
+        report = import_records(iter_rows(stream, 'ndjson'), resume_from=resume_from, progress=committed.update)
+        return jsonify(report)
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e), 'checkpoint': committed.get('checkpoint', request.args.get('resume_from', 0, type=int))}), 500
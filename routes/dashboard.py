@@ -3,11 +3,13 @@ from models import db, Patient, ClinicalRecord, User
 from flask_jwt_extended import jwt_required
 from sqlalchemy import func, desc
 from datetime import datetime, timedelta
+from utils.singleflight import coalesce
 
 dashboard_bp = Blueprint('dashboard', __name__, url_prefix='/dashboard')
 
 @dashboard_bp.route('/stats', methods=['GET'])
 @jwt_required()
+@coalesce(cross_worker=True)                # Las terminales que abren a la vez comparten un solo cálculo
 def get_stats():
     try:
         # Estadísticas generales
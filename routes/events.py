@@ -0,0 +1,40 @@
+from flask import Blueprint, request, Response, stream_with_context
+from flask_jwt_extended import jwt_required
+from utils.events import broker
+import json
+import queue
+
+events_bp = Blueprint('events', __name__, url_prefix='/events')
+
+KEEPALIVE_SECONDS = 15
+TOPICS = {'appointments', 'dashboard', 'patients', 'clinical_records'}
+
+def format_sse(evt):
+    return f"event: {evt['type']}\ndata: {json.dumps(evt)}\n\n"
+
+@events_bp.route('/stream', methods=['GET'])
+@jwt_required(locations=['headers', 'query_string'])        # EventSource no permite headers: se acepta ?jwt=<token>
+def stream_events():
+    """Feed Server-Sent Events con cambios de agenda y contadores del dashboard"""
+    topics = request.args.get('topics')
+    topics = {t.strip() for t in topics.split(',')} & TOPICS if topics else {'appointments', 'dashboard'}
+    subscriber = broker.subscribe()
+
+    def generate():
+        try:
+            yield f'retry: 5000\n\n'
+            while True:
+                try:
+                    evt = subscriber.get(timeout=KEEPALIVE_SECONDS)
+                except queue.Empty:
+                    yield ': keepalive\n\n'             # Mantiene viva la conexión a través de proxies
+                    continue
+                if evt.get('topic') in topics:
+                    yield format_sse(evt)
+        finally:
+            broker.unsubscribe(subscriber)
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'                       # Evita el buffering de nginx
+    })
@@ -0,0 +1,112 @@
+from flask import Blueprint, request, jsonify
+from datetime import datetime, timedelta
+from models import Appointment, ClinicalRecord, Patient, db
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from utils.permissions import role_required
+from sqlalchemy import select, func, desc
+from utils.fastread import read_rows
+from utils.http_cache import build_etag, conditional_json, latest_timestamp
+
+me_bp = Blueprint('me', __name__, url_prefix='/me')
+
+UPCOMING_DAYS = 7
+PENDING_DAYS = 14                   # Citas atendidas sin ficha que siguen apareciendo como pendientes
+RECENT_RECORDS = 20
+MAX_ITEMS = 100
+
+APPOINTMENT_FIELDS = ['id', 'patient_id', 'patient_name', 'appointment_date', 'duration_minutes', 'appointment_type', 'reason', 'status', 'series_id']
+RECORD_FIELDS = ['id', 'patient_id', 'patient_name', 'visit_date', 'reason_visit', 'diagnosis', 'updated_at']
+
+APPOINTMENT_JOINS = {'patient_name': (Patient.full_name, Patient.__table__, Patient.id == Appointment.patient_id)}
+RECORD_JOINS = {'patient_name': (Patient.full_name, Patient.__table__, Patient.id == ClinicalRecord.patient_id)}
+
+def _has_record():
+    """Existe una ficha del mismo médico para el paciente de la cita, con fecha de visita el mismo día"""
+    return select(ClinicalRecord.id).where(
+        ClinicalRecord.doctor_id_snapshot == Appointment.doctor_id_snapshot,
+        ClinicalRecord.patient_id == Appointment.patient_id,
+        func.date(ClinicalRecord.visit_date) == func.date(Appointment.appointment_date)
+    ).exists()
+
+def build_worklist(doctor_id, now, upcoming_limit, records_limit):
+    """
+    Tres lecturas por rangos de los índices (médico, fecha): la agenda de hoy a +7 días
+    (se separa en hoy / próximas en memoria), las últimas fichas y las citas atendidas sin ficha.
+    """
+    today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    tomorrow = today_start + timedelta(days=1)
+
+    agenda = read_rows(
+        Appointment, APPOINTMENT_FIELDS,
+        [
+            Appointment.doctor_id_snapshot == doctor_id,
+            Appointment.appointment_date >= today_start,
+            Appointment.appointment_date < tomorrow + timedelta(days=UPCOMING_DAYS)
+        ],
+        order_by=[Appointment.appointment_date], joined=APPOINTMENT_JOINS
+    )
+    today_key = tomorrow.isoformat()
+    today = [item for item in agenda if item['appointment_date'] < today_key]
+    upcoming = [
+        item for item in agenda
+        if item['appointment_date'] >= today_key and item['status'] in ('pendiente', 'confirmada')
+    ][:upcoming_limit]
+
+    recent_records = read_rows(
+        ClinicalRecord, RECORD_FIELDS,
+        [ClinicalRecord.doctor_id_snapshot == doctor_id],
+        order_by=[desc(ClinicalRecord.visit_date)], joined=RECORD_JOINS, limit=records_limit
+    )
+
+    pending_records = read_rows(
+        Appointment, APPOINTMENT_FIELDS,
+        [
+            Appointment.doctor_id_snapshot == doctor_id,
+            Appointment.appointment_date >= today_start - timedelta(days=PENDING_DAYS),
+            Appointment.appointment_date < now,
+            Appointment.status.in_(['confirmada', 'completada']),
+            ~_has_record()
+        ],
+        order_by=[Appointment.appointment_date], joined=APPOINTMENT_JOINS, limit=MAX_ITEMS
+    )
+
+    return {
+        'date': today_start.date().isoformat(),
+        'today': today,
+        'upcoming': upcoming,
+        'recent_records': recent_records,
+        'pending_records': pending_records
+    }
+
+@me_bp.route('/worklist', methods=['GET'])
+@jwt_required()
+@role_required('medico', 'administrador')
+def get_worklist():
+    """Trabajo del médico autenticado: citas de hoy y próximas, fichas recientes y fichas por escribir"""
+    try:
+        doctor_id = int(get_jwt_identity())
+        upcoming_limit = min(request.args.get('upcoming_limit', 20, type=int), MAX_ITEMS)
+        records_limit = min(request.args.get('records_limit', RECENT_RECORDS, type=int), MAX_ITEMS)
+        now = datetime.now()
+
+        # Versión: últimas modificaciones de las citas y fichas del médico (agregados sobre los mismos índices)
+        appointments_modified, appointment_count = db.session.query(
+            func.max(Appointment.updated_at), func.count(Appointment.id)
+        ).filter(Appointment.doctor_id_snapshot == doctor_id).first()
+        records_modified, record_count = db.session.query(
+            func.max(ClinicalRecord.updated_at), func.count(ClinicalRecord.id)
+        ).filter(ClinicalRecord.doctor_id_snapshot == doctor_id).first()
+        patients_modified = db.session.query(func.max(Patient.updated_at)).scalar()  # patient_name viene del paciente
+        etag = build_etag(
+            'worklist', doctor_id, now.date(), now.hour, upcoming_limit, records_limit,
+            appointments_modified, appointment_count, records_modified, record_count, patients_modified
+        )
+
+        return conditional_json(
+            lambda: build_worklist(doctor_id, now, upcoming_limit, records_limit),
+            etag, latest_timestamp(appointments_modified, records_modified, patients_modified)
+        )
+    except ValueError as ve:
+        return jsonify({'error': f'Error en formato de datos: {str(ve)}'}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -1,17 +1,82 @@
 from flask import Blueprint, request, jsonify
-from datetime import datetime
-from models import Patient, db
+from datetime import datetime, timezone
+from models import Patient, ClinicalRecord, Appointment, DeletionLog, db
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from utils.permissions import role_required
+from utils.http_cache import build_etag, conditional_json, list_version
+from sqlalchemy import desc, func, select
+from sqlalchemy.orm import load_only
+from utils.batch import parse_ids, fetch_batch
+from utils.fields import parse_fields, projection
+from utils.fastread import read_rows
+from utils.background import start_job, get_job
+from utils.patient_import import iter_rows, import_patients
+from utils.vitals import lttb
+import io
+import os
 
 patients_bp = Blueprint('patients', __name__, url_prefix='/patients')
 
+PURGE_BATCH_SIZE = 1000             # Filas por transacción en la eliminación asíncrona
+ASYNC_PURGE_THRESHOLD = 5000        # Historiales más grandes se eliminan siempre en segundo plano
+MAX_VITALS_POINTS = 5000            # Tope de ?max_points= por serie
+VITAL_SERIES = ('weight', 'bmi', 'heart_rate', 'temperature')
+
+def purge_patient(patient_id, progress):
+    """
+    Elimina el historial del paciente en lotes (cada lote es una transacción corta)
+    y finalmente al paciente
+    """
+    deleted = {'clinical_records': 0, 'appointments': 0}
+    for entity, key, model in (('clinical_record', 'clinical_records', ClinicalRecord), ('appointment', 'appointments', Appointment)):
+        while True:
+            ids = [row.id for row in db.session.query(model.id).filter(model.patient_id == patient_id).limit(PURGE_BATCH_SIZE)]
+            if not ids:
+                break
+            DeletionLog.record(entity, *ids)
+            model.query.filter(model.id.in_(ids)).delete(synchronize_session=False)
+            db.session.commit()
+            deleted[key] += len(ids)
+            progress(**deleted)
+    
+    patient = Patient.query.get(patient_id)
+    if patient:
+        DeletionLog.record('patient', patient.id)
+        db.session.delete(patient)
+        db.session.commit()
+    return deleted
+
 @patients_bp.route('/', methods=['GET'])
 @jwt_required()
 def get_patients():
     try:
-        patients = Patient.query.all()
-        return jsonify([patient.to_dict() for patient in patients])
+        fields = parse_fields(Patient.FIELDS)
+        query = Patient.query
+        last_modified, count = list_version(query, Patient)
+        etag = build_etag('patients', last_modified, count, fields)
+        
+        return conditional_json(
+            lambda: read_rows(Patient, fields or Patient.FIELDS),        # Lectura rápida sin objetos ORM
+            etag, last_modified
+        )
+    except ValueError as ve:
+        return jsonify({'error': f'Error en formato de datos: {str(ve)}'}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@patients_bp.route('/batch', methods=['GET'])
+@jwt_required()
+def get_patients_batch():
+    """Obtener varios pacientes por id (?ids=1,2,3) con una sola consulta"""
+    try:
+        fields = parse_fields(Patient.FIELDS)
+        patients, missing = fetch_batch(Patient, parse_ids(request.args.get('ids')), *projection(Patient, fields))
+        return jsonify({
+            'items': [patient.to_dict(fields) for patient in patients],
+            'missing': missing
+        })
+    except ValueError as ve:
+        return jsonify({'error': f'Error en formato de datos: {str(ve)}'}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -19,14 +84,163 @@ def get_patients():
 @jwt_required()
 def get_patient(patient_id):
     try:
+        fields = parse_fields(Patient.FIELDS)
+        patient = Patient.query.options(*projection(Patient, fields)).get_or_404(patient_id)
+        etag = build_etag('patient', patient.id, patient.updated_at, fields)
+        return conditional_json(lambda: patient.to_dict(fields), etag, patient.updated_at)
+    except ValueError as ve:
+        return jsonify({'error': f'Error en formato de datos: {str(ve)}'}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@patients_bp.route('/<int:patient_id>/overview', methods=['GET'])
+@jwt_required()
+def get_patient_overview(patient_id):
+    """Vista completa del paciente (ficha, últimas atenciones, citas y estadísticas) en una sola petición"""
+    try:
+        records_limit = min(int(request.args.get('records_limit', 5)), 50)
+        appointments_limit = min(int(request.args.get('appointments_limit', 5)), 50)
+        now = datetime.now()
+        
         patient = Patient.query.get_or_404(patient_id)
-        return jsonify(patient.to_dict())
+        
+        # Últimas fichas: solo las columnas del resumen (sin textos largos como tratamiento o notas)
+        records = ClinicalRecord.query.options(load_only(
+            ClinicalRecord.id, ClinicalRecord.visit_date, ClinicalRecord.reason_visit,
+            ClinicalRecord.diagnosis, ClinicalRecord.doctor_name, ClinicalRecord.doctor_specialization,
+            ClinicalRecord.blood_pressure, ClinicalRecord.heart_rate, ClinicalRecord.temperature,
+            ClinicalRecord.weight, ClinicalRecord.bmi
+        )).filter_by(patient_id=patient_id).order_by(desc(ClinicalRecord.visit_date)).limit(records_limit).all()
+        
+        # Estadísticas en un solo agregado
+        total_records, last_visit = db.session.query(
+            func.count(ClinicalRecord.id),
+            func.max(ClinicalRecord.visit_date)
+        ).filter(ClinicalRecord.patient_id == patient_id).one()
+        
+        appointment_columns = load_only(
+            Appointment.id, Appointment.appointment_date, Appointment.duration_minutes,
+            Appointment.appointment_type, Appointment.status, Appointment.doctor_name,
+            Appointment.doctor_id_snapshot
+        )
+        upcoming = Appointment.query.options(appointment_columns).filter(
+            Appointment.patient_id == patient_id,
+            Appointment.appointment_date >= now,
+            Appointment.status.in_(['pendiente', 'confirmada'])
+        ).order_by(Appointment.appointment_date).limit(appointments_limit).all()
+        
+        recent = Appointment.query.options(appointment_columns).filter(
+            Appointment.patient_id == patient_id,
+            Appointment.appointment_date < now
+        ).order_by(desc(Appointment.appointment_date)).limit(appointments_limit).all()
+        
+        def serialize_record(record):
+            return {
+                'id': record.id,
+                'visit_date': record.visit_date.isoformat() if record.visit_date else None,
+                'reason_visit': record.reason_visit,
+                'diagnosis': record.diagnosis,
+                'doctor_name': record.doctor_name,
+                'doctor_specialization': record.doctor_specialization,
+                'blood_pressure': record.blood_pressure,
+                'heart_rate': record.heart_rate,
+                'temperature': record.temperature,
+                'weight': record.weight,
+                'bmi': record.bmi
+            }
+        
+        def serialize_appointment(appointment):
+            return {
+                'id': appointment.id,
+                'appointment_date': appointment.appointment_date.isoformat() if appointment.appointment_date else None,
+                'duration_minutes': appointment.duration_minutes,
+                'appointment_type': appointment.appointment_type,
+                'status': appointment.status,
+                'doctor_name': appointment.doctor_name,
+                'doctor_id_snapshot': appointment.doctor_id_snapshot
+            }
+        
+        last_record = records[0] if records else None
+        return jsonify({
+            'patient': patient.to_dict(),
+            'recent_records': [serialize_record(record) for record in records],
+            'upcoming_appointments': [serialize_appointment(appointment) for appointment in upcoming],
+            'recent_appointments': [serialize_appointment(appointment) for appointment in recent],
+            'stats': {
+                'total_records': total_records,
+                'last_visit': last_visit.isoformat() if last_visit else None,
+                'last_diagnosis': last_record.diagnosis if last_record else None,
+                'last_doctor': last_record.doctor_name if last_record else None
+            }
+        })
+    except ValueError as ve:
+        return jsonify({'error': f'Error en formato de datos: {str(ve)}'}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@patients_bp.route('/<int:patient_id>/vitals', methods=['GET'])
+@jwt_required()
+def get_patient_vitals(patient_id):
+    """
+    Series de signos vitales del paciente en formato columnar:
+    {'series': {'weight': {'t': [...], 'v': [...]}, ..., 'blood_pressure': {'t': [...], 'systolic': [...], 'diastolic': [...]}}}
+    t son segundos Unix. ?from= y ?to= acotan por fecha de consulta y ?max_points=
+    reduce cada serie con LTTB conservando su forma.
+    """
+    try:
+        filters = [ClinicalRecord.patient_id == patient_id]
+        if request.args.get('from'):
+            filters.append(ClinicalRecord.visit_date >= datetime.fromisoformat(request.args['from']))
+        if request.args.get('to'):
+            filters.append(ClinicalRecord.visit_date <= datetime.fromisoformat(request.args['to']))
+        max_points = request.args.get('max_points', type=int)
+        if max_points is not None and not 3 <= max_points <= MAX_VITALS_POINTS:
+            return jsonify({'error': f'max_points debe estar entre 3 y {MAX_VITALS_POINTS}'}), 400
+        
+        if not db.session.query(Patient.id).filter_by(id=patient_id).first():
+            return jsonify({'error': 'Paciente no encontrado'}), 404
+        
+        last_modified, count = list_version(ClinicalRecord.query.filter(*filters), ClinicalRecord)
+        etag = build_etag('vitals', patient_id, last_modified, count, request.query_string)
+        
+        def build_payload():
+            # Solo las columnas de signos vitales, como tuplas (sin objetos ORM)
+            rows = db.session.execute(select(
+                ClinicalRecord.visit_date, ClinicalRecord.weight, ClinicalRecord.bmi, ClinicalRecord.heart_rate,
+                ClinicalRecord.temperature, ClinicalRecord.systolic_bp, ClinicalRecord.diastolic_bp
+            ).where(*filters).order_by(ClinicalRecord.visit_date)).all()
+            timestamps = [int(row[0].replace(tzinfo=timezone.utc).timestamp()) for row in rows]
+            
+            def series(*indexes):
+                # Puntos donde el signo está presente; LTTB sobre la primera columna
+                points = [i for i, row in enumerate(rows) if row[indexes[0]] is not None]
+                t = [timestamps[i] for i in points]
+                columns = [[rows[i][index] for i in points] for index in indexes]
+                if max_points:
+                    keep = lttb(t, columns[0], max_points)
+                    t = [t[i] for i in keep]
+                    columns = [[column[i] for i in keep] for column in columns]
+                return t, columns
+            
+            result = {}
+            for offset, name in enumerate(VITAL_SERIES, start=1):
+                t, (values,) = series(offset)
+                result[name] = {'t': t, 'v': values}
+            t, (systolic, diastolic) = series(5, 6)
+            result['blood_pressure'] = {'t': t, 'systolic': systolic, 'diastolic': diastolic}
+            
+            return {'patient_id': patient_id, 'count': len(rows), 'series': result}
+        
+        return conditional_json(build_payload, etag, last_modified)
+    except ValueError as ve:
+        return jsonify({'error': f'Error en formato de datos: {str(ve)}'}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @patients_bp.route('/', methods=['POST'])
 @jwt_required()
 @role_required('administrador', 'medico', 'tecnico')  # Roles de los user -> administrador, medico, tecnico y administrativo
+def create_patient():
     try:
         data = request.json
         
@@ -127,9 +341,62 @@ def update_patient(patient_id):
 def delete_patient(patient_id):
     try:
         patient = Patient.query.get_or_404(patient_id)
+        
+        # Historiales muy grandes (o si se pide ?async=true) se eliminan en segundo plano por lotes
+        records_count = db.session.query(func.count(ClinicalRecord.id)).filter(ClinicalRecord.patient_id == patient_id).scalar()
+        if request.args.get('async', '').lower() in ['1', 'true', 'yes'] or records_count > ASYNC_PURGE_THRESHOLD:
+            job_id = start_job('patient_purge', purge_patient, patient_id)
+            return jsonify({'message': 'Eliminación del paciente en curso', 'job_id': job_id}), 202
+        
+        # Tombstones para el feed de cambios (set-based, sin cargar el historial)
+        DeletionLog.record('patient', patient.id)
+        DeletionLog.record_query('clinical_record', ClinicalRecord, ClinicalRecord.patient_id == patient_id)
+        DeletionLog.record_query('appointment', Appointment, Appointment.patient_id == patient_id)
+        
+        # Fichas y citas se eliminan en la base de datos (ON DELETE CASCADE + passive_deletes)
         db.session.delete(patient)
         db.session.commit()
         return jsonify({'message': 'Paciente eliminado exitosamente'})
     except Exception as e:
         db.session.rollback()
-        return jsonify({'error': str(e)}), 500
\ No newline at end of file
+        return jsonify({'error': str(e)}), 500
+
+@patients_bp.route('/purge-jobs/<job_id>', methods=['GET'])
+@jwt_required()
+@role_required('administrador')
+def get_purge_job(job_id):
+    """Estado de una eliminación asíncrona de paciente"""
+    try:
+        job = get_job(job_id)
+        if not job:
+            return jsonify({'error': 'Trabajo no encontrado'}), 404
+        return jsonify(job)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@patients_bp.route('/import', methods=['POST'])
+@jwt_required()
+@role_required('administrador')
+def import_patients_file():
+    """
+    Carga masiva de pacientes desde un archivo CSV o NDJSON (campo 'file').
+    El formato se toma de ?format= o de la extensión del archivo.
+    """
+    try:
+        upload = request.files.get('file')
+        if not upload:
+            return jsonify({'error': 'Debe adjuntar un archivo en el campo file'}), 400
+        
+        fmt = request.args.get('format') or os.path.splitext(upload.filename or '')[1].lstrip('.').lower()
+        if fmt == 'jsonl':
+            fmt = 'ndjson'
+        if fmt not in ['csv', 'ndjson']:
+            return jsonify({'error': 'Formato no soportado, use csv o ndjson'}), 400
+        
+        # Se procesa en streaming: el archivo nunca se carga completo en memoria
+        stream = io.TextIOWrapper(upload.stream, encoding='utf-8-sig', newline='')
+        report = import_patients(iter_rows(stream, fmt))
+        return jsonify(report)
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
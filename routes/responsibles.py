@@ -4,12 +4,20 @@ from models.db import db
 from models.task import Task
 from flask_jwt_extended import jwt_required
 from utils.permissions import role_required     # Importa los roles y permisos del personal
+from utils.batch import parse_ids, fetch_batch  # Consultas por lotes de ids
+from utils.fields import model_fields, parse_fields, projection, serialize_fields  # Proyección ?fields=
 
 # SOLO UNA definición del Blueprint
 responsibles_bp = Blueprint('responsibles', __name__, url_prefix='/responsibles')
 
-def serialize_responsible(r):
+# Campos disponibles para ?fields=
+RESPONSIBLE_FIELDS = model_fields(Responsible)
+TASK_FIELDS = model_fields(Task)
+
+def serialize_responsible(r, fields=None):
     """Función helper para serializar responsables"""
+    if fields is not None:
+        return serialize_fields(r, fields)
     return {
         'id': r.id,
         'user_id': r.user_id,
@@ -18,8 +26,10 @@ def serialize_responsible(r):
         'updated_at': r.updated_at.isoformat() if r.updated_at else None,
     }
 
-def serialize_task(t):
+def serialize_task(t, fields=None):
     """Función helper para serializar tareas"""
+    if fields is not None:
+        return serialize_fields(t, fields)
     return {
         'id': t.id,
         'title': t.title,
@@ -34,8 +44,27 @@ def serialize_task(t):
 @jwt_required()
 def get_responsibles():
     try:
-        responsibles = Responsible.query.all()
-        return jsonify([serialize_responsible(r) for r in responsibles])
+        fields = parse_fields(RESPONSIBLE_FIELDS)
+        responsibles = Responsible.query.options(*projection(Responsible, fields)).all()
+        return jsonify([serialize_responsible(r, fields) for r in responsibles])
+    except ValueError as ve:
+        return jsonify({'error': f'Error en formato de datos: {str(ve)}'}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# Endpoint 1b: Obtener varios responsables por id (?ids=1,2,3) con una sola consulta
+@responsibles_bp.route('/batch', methods=['GET'])
+@jwt_required()
+def get_responsibles_batch():
+    try:
+        fields = parse_fields(RESPONSIBLE_FIELDS)
+        responsibles, missing = fetch_batch(Responsible, parse_ids(request.args.get('ids')), *projection(Responsible, fields))
+        return jsonify({
+            'items': [serialize_responsible(r, fields) for r in responsibles],
+            'missing': missing
+        })
+    except ValueError as ve:
+        return jsonify({'error': f'Error en formato de datos: {str(ve)}'}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -44,8 +73,11 @@ def get_responsibles():
 @jwt_required()
 def get_responsible(responsible_id):
     try:
-        responsible = Responsible.query.get_or_404(responsible_id)
-        return jsonify(serialize_responsible(responsible))          # Devuelve el responsable
+        fields = parse_fields(RESPONSIBLE_FIELDS)
+        responsible = Responsible.query.options(*projection(Responsible, fields)).get_or_404(responsible_id)
+        return jsonify(serialize_responsible(responsible, fields))  # Devuelve el responsable
+    except ValueError as ve:
+        return jsonify({'error': f'Error en formato de datos: {str(ve)}'}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -58,7 +90,8 @@ def get_responsible_tasks(responsible_id):
         Responsible.query.get_or_404(responsible_id)
         
         # Construir query base
-        query = Task.query.filter_by(responsible_id=responsible_id)
+        fields = parse_fields(TASK_FIELDS)
+        query = Task.query.options(*projection(Task, fields)).filter_by(responsible_id=responsible_id)
         
         # Aplicar filtro si existe
         done_param = request.args.get('done')
@@ -72,8 +105,10 @@ def get_responsible_tasks(responsible_id):
                 return jsonify({"error": "Parámetro done inválido. Use true/false."}), 400
         
         tasks = query.all()
-        return jsonify([serialize_task(t) for t in tasks])
+        return jsonify([serialize_task(t, fields) for t in tasks])
         
+    except ValueError as ve:
+        return jsonify({'error': f'Error en formato de datos: {str(ve)}'}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -2,13 +2,21 @@ from flask import Blueprint, request, jsonify
 from models.task import Task
 from models.db import db
 from models.responsible import Responsible                      # Para validar que el responsable existe
+from models.deletionlog import DeletionLog                      # Tombstones para el feed de cambios
 from flask_jwt_extended import jwt_required, get_jwt_identity   # Para proteger los endpoints
 from utils.permissions import role_required                     # Importa role requerido para permisos del admin
+from utils.fields import model_fields, parse_fields, projection, serialize_fields  # Proyección ?fields=
+from utils.fastread import read_rows                             # Lectura rápida para el listado
 
 tasks_bp = Blueprint('tasks', __name__, url_prefix='/tasks')
 
+# Campos disponibles para ?fields=
+TASK_FIELDS = model_fields(Task)
+
 # Función helper para serializar tareas
-def serialize_task(task):
+def serialize_task(task, fields=None):
+    if fields is not None:
+        return serialize_fields(task, fields)
     return {
         "id": task.id,
         "title": task.title,
@@ -23,8 +31,10 @@ def serialize_task(task):
 @jwt_required()                           # Protegido con JWT
 def get_tasks():
     try:
-        tasks = Task.query.all()
-        return jsonify([serialize_task(task) for task in tasks])
+        fields = parse_fields(TASK_FIELDS)
+        return jsonify(read_rows(Task, fields or TASK_FIELDS))
+    except ValueError as ve:
+        return jsonify({"error": f"Error en formato de datos: {str(ve)}"}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -33,8 +43,11 @@ def get_tasks():
 @jwt_required()                           # Protegido con JWT
 def get_task(task_id):
     try:
-        task = Task.query.get_or_404(task_id)
-        return jsonify(serialize_task(task))
+        fields = parse_fields(TASK_FIELDS)
+        task = Task.query.options(*projection(Task, fields)).get_or_404(task_id)
+        return jsonify(serialize_task(task, fields))
+    except ValueError as ve:
+        return jsonify({"error": f"Error en formato de datos: {str(ve)}"}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -109,6 +122,7 @@ def update_task(task_id):
 def delete_task(task_id):
     try:
         task = Task.query.get_or_404(task_id)
+        DeletionLog.record('task', task.id)
         db.session.delete(task)
         db.session.commit()
         return jsonify({"message": "Tarea eliminada exitosamente"})
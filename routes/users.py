@@ -5,15 +5,24 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 from datetime import datetime
 from utils.permissions import role_required
 from sqlalchemy import func
+from utils.singleflight import coalesce
+from utils.batch import parse_ids, fetch_batch
+from utils.fields import model_fields, parse_fields, projection, serialize_fields
 
 users_bp = Blueprint('users', __name__, url_prefix='/users')
 
-def serialize_user(user):
+# Campos disponibles para ?fields= (nunca el hash de la contraseña)
+USER_FIELDS = model_fields(User, exclude=('password_hash',))
+
+def serialize_user(user, fields=None):
+    if fields is not None:
+        return serialize_fields(user, fields)
     return {
         'id': user.id,
         'mail': user.mail,
         'full_name': user.full_name,
         'role': user.role,
+        'specialty': user.specialty,
         'created_at': user.created_at.isoformat() if user.created_at else None,
         'updated_at': user.updated_at.isoformat() if user.updated_at else None
     }
@@ -24,8 +33,35 @@ def serialize_user(user):
 def get_users():
     """Obtener todos los usuarios - Solo administrador"""
     try:
-        users = User.query.order_by(User.created_at.desc()).all()
-        return jsonify([serialize_user(user) for user in users])
+        fields = parse_fields(USER_FIELDS)
+        users = User.query.options(*projection(User, fields)).order_by(User.created_at.desc()).all()
+        return jsonify([serialize_user(user, fields) for user in users])
+    except ValueError as ve:
+        return jsonify({'error': f'Error en formato de datos: {str(ve)}'}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@users_bp.route('/batch', methods=['GET'])
+@jwt_required()
+def get_users_batch():
+    """Obtener varios usuarios por id (?ids=1,2,3) con una sola consulta"""
+    try:
+        ids = parse_ids(request.args.get('ids'))
+        current_user_id = int(get_jwt_identity())
+        current_user = User.query.get(current_user_id)
+        
+        # Mismas reglas que el detalle: solo administrador o el mismo usuario
+        if current_user.role != 'administrador' and any(user_id != current_user_id for user_id in ids):
+            return jsonify({'error': 'No tienes permiso para ver este usuario'}), 403
+        
+        fields = parse_fields(USER_FIELDS)
+        users, missing = fetch_batch(User, ids, *projection(User, fields))
+        return jsonify({
+            'items': [serialize_user(user, fields) for user in users],
+            'missing': missing
+        })
+    except ValueError as ve:
+        return jsonify({'error': f'Error en formato de datos: {str(ve)}'}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -41,14 +77,18 @@ def get_user(user_id):
         if current_user.role != 'administrador' and current_user_id != user_id:
             return jsonify({'error': 'No tienes permiso para ver este usuario'}), 403
         
-        user = User.query.get_or_404(user_id)
-        return jsonify(serialize_user(user))
+        fields = parse_fields(USER_FIELDS)
+        user = User.query.options(*projection(User, fields)).get_or_404(user_id)
+        return jsonify(serialize_user(user, fields))
+    except ValueError as ve:
+        return jsonify({'error': f'Error en formato de datos: {str(ve)}'}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @users_bp.route('/stats', methods=['GET'])
 @jwt_required()
 @role_required('administrador')
+@coalesce(cross_worker=True)
 def get_users_stats():
     """Obtener estadísticas de usuarios"""
     try:
@@ -113,7 +153,8 @@ def create_user():
         user = User(
             mail=data['mail'],
             full_name=data['full_name'],
-            role=data['role']
+            role=data['role'],
+            specialty=data.get('specialty')
         )
         user.set_password(data['password'])
         
@@ -159,6 +200,8 @@ def update_user(user_id):
             user.full_name = data['full_name']
         if 'role' in data and current_user.role == 'administrador':
             user.role = data['role']
+        if 'specialty' in data:
+            user.specialty = data['specialty']
         if 'password' in data:
             if len(data['password']) < 6:
                 return jsonify({'error': 'La contraseña debe tener al menos 6 caracteres'}), 400
@@ -0,0 +1,185 @@
+from flask import Blueprint, request, jsonify
+from datetime import datetime, timedelta
+from models import Appointment, Patient, User, WaitlistEntry, WaitlistWindow, db
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from utils.permissions import role_required
+from utils.series import find_conflicts
+from utils.waitlist import offer_freed_slot, release_offer
+
+waitlist_bp = Blueprint('waitlist', __name__, url_prefix='/waitlist')
+
+MAX_WINDOWS = 20
+
+@waitlist_bp.route('/', methods=['GET'])
+@jwt_required()
+def get_waitlist():
+    """Solicitudes de la lista de espera (filtros: status, doctor_id, patient_id, specialty)"""
+    try:
+        query = WaitlistEntry.query
+        status = request.args.get('status')
+        if status:
+            query = query.filter(WaitlistEntry.status == status)
+        if request.args.get('doctor_id'):
+            query = query.filter(WaitlistEntry.doctor_id == int(request.args['doctor_id']))
+        if request.args.get('patient_id'):
+            query = query.filter(WaitlistEntry.patient_id == int(request.args['patient_id']))
+        if request.args.get('specialty'):
+            query = query.filter(WaitlistEntry.specialty == request.args['specialty'])
+
+        entries = query.order_by(WaitlistEntry.priority.desc(), WaitlistEntry.created_at).all()
+        return jsonify([entry.to_dict() for entry in entries])
+    except ValueError as ve:
+        return jsonify({'error': f'Error en formato de datos: {str(ve)}'}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@waitlist_bp.route('/', methods=['POST'])
+@jwt_required()
+@role_required('administrador', 'medico', 'tecnico', 'administrativo')
+def create_waitlist_entry():
+    """Agregar un paciente a la lista de espera con sus ventanas preferidas"""
+    try:
+        data = request.json
+        current_user_id = int(get_jwt_identity())
+
+        if not data.get('patient_id'):
+            return jsonify({'error': 'El ID del paciente es obligatorio'}), 400
+        if not data.get('doctor_id') and not data.get('specialty'):
+            return jsonify({'error': 'Debe indicar un médico o una especialidad'}), 400
+        if not data.get('appointment_type'):
+            return jsonify({'error': 'El tipo de cita es obligatorio'}), 400
+        if not data.get('reason'):
+            return jsonify({'error': 'El motivo de la cita es obligatorio'}), 400
+        windows = data.get('windows') or []
+        if not windows:
+            return jsonify({'error': 'Debe indicar al menos una ventana de tiempo'}), 400
+        if len(windows) > MAX_WINDOWS:
+            return jsonify({'error': f'Máximo {MAX_WINDOWS} ventanas por solicitud'}), 400
+
+        if not Patient.query.get(data['patient_id']):
+            return jsonify({'error': 'El paciente especificado no existe'}), 400
+        doctor_id = int(data['doctor_id']) if data.get('doctor_id') else None
+        specialty = data.get('specialty')
+        if doctor_id is not None:
+            doctor = User.query.get(doctor_id)
+            if not doctor or doctor.role not in ['medico', 'administrador']:
+                return jsonify({'error': 'El médico especificado no existe'}), 400
+            specialty = specialty or doctor.specialty
+        creator = User.query.get(current_user_id)
+        if not creator:
+            return jsonify({'error': 'Usuario creador no encontrado'}), 404
+
+        entry = WaitlistEntry(
+            patient_id=data['patient_id'],
+            doctor_id=doctor_id,
+            specialty=specialty,
+            priority=int(data.get('priority', 0)),
+            duration_minutes=int(data.get('duration_minutes', 30)),
+            appointment_type=data['appointment_type'],
+            reason=data['reason'],
+            notes=data.get('notes'),
+            status='activa',
+            created_by_name=creator.full_name,
+            created_by_role=creator.role
+        )
+        for window in windows:
+            window_start = datetime.fromisoformat(window['start'])
+            window_end = datetime.fromisoformat(window['end'])
+            if window_end - window_start < timedelta(minutes=entry.duration_minutes):
+                return jsonify({'error': 'Cada ventana debe ser al menos tan larga como la cita'}), 400
+            entry.windows.append(WaitlistWindow(
+                doctor_id=doctor_id, specialty=specialty, window_start=window_start, window_end=window_end
+            ))
+
+        db.session.add(entry)
+        db.session.commit()
+        return jsonify({'message': 'Paciente agregado a la lista de espera', 'entry': entry.to_dict()}), 201
+
+    except (ValueError, KeyError) as ve:
+        db.session.rollback()
+        return jsonify({'error': f'Error en formato de datos: {str(ve)}'}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@waitlist_bp.route('/<int:entry_id>/accept', methods=['POST'])
+@jwt_required()
+@role_required('administrador', 'medico', 'tecnico', 'administrativo')
+def accept_offer(entry_id):
+    """Aceptar la hora ofrecida: crea la cita y cierra la solicitud"""
+    try:
+        entry = WaitlistEntry.query.get_or_404(entry_id)
+        if entry.status != 'ofrecida':
+            return jsonify({'error': 'La solicitud no tiene una oferta vigente'}), 400
+        if entry.offer_expires_at < datetime.now():
+            return jsonify({'error': 'La oferta expiró'}), 410
+
+        doctor = User.query.get(entry.offered_doctor_id)
+        creator = User.query.get(int(get_jwt_identity()))
+        if not doctor or not creator:
+            return jsonify({'error': 'Usuario no encontrado'}), 404
+
+        # La hora pudo tomarse por otra vía mientras la oferta estaba pendiente
+        if find_conflicts(doctor.id, [(entry.offered_date, entry.offered_duration)], exclude_offer_id=entry.id):
+            return jsonify({'error': 'La hora ofrecida ya no está disponible'}), 409
+
+        appointment = Appointment.create_with_users_info(entry.patient_id, doctor, creator, {
+            'appointment_date': entry.offered_date,
+            'duration_minutes': entry.offered_duration,
+            'appointment_type': entry.appointment_type,
+            'reason': entry.reason,
+            'observations': entry.notes
+        })
+        db.session.add(appointment)
+        db.session.flush()
+        entry.status = 'asignada'
+        entry.appointment_id = appointment.id
+        db.session.commit()
+
+        return jsonify({
+            'message': 'Cita creada desde la lista de espera',
+            'entry': entry.to_dict(),
+            'appointment': appointment.to_dict()
+        }), 201
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@waitlist_bp.route('/<int:entry_id>/decline', methods=['POST'])
+@jwt_required()
+@role_required('administrador', 'medico', 'tecnico', 'administrativo')
+def decline_offer(entry_id):
+    """Rechazar la hora ofrecida: la solicitud sigue en espera y la hora pasa al siguiente candidato"""
+    try:
+        entry = WaitlistEntry.query.get_or_404(entry_id)
+        if entry.status != 'ofrecida':
+            return jsonify({'error': 'La solicitud no tiene una oferta vigente'}), 400
+
+        slot = release_offer(entry)
+        db.session.commit()
+
+        next_offer = offer_freed_slot(*slot, exclude_ids=[entry.id])
+        return jsonify({'message': 'Oferta rechazada', 'entry': entry.to_dict(), 'next_offer': next_offer})
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@waitlist_bp.route('/<int:entry_id>', methods=['DELETE'])
+@jwt_required()
+@role_required('administrador', 'medico', 'tecnico', 'administrativo')
+def withdraw_waitlist_entry(entry_id):
+    """Retirar una solicitud de la lista de espera (si tenía una oferta, la hora pasa al siguiente)"""
+    try:
+        entry = WaitlistEntry.query.get_or_404(entry_id)
+        if entry.status in ['asignada', 'retirada']:
+            return jsonify({'error': f'La solicitud ya está {entry.status}'}), 400
+
+        slot = (entry.offered_doctor_id, entry.offered_date, entry.offered_duration) if entry.status == 'ofrecida' else None
+        entry.status = 'retirada'
+        db.session.commit()
+
+        next_offer = offer_freed_slot(*slot, exclude_ids=[entry.id]) if slot else None
+        return jsonify({'message': 'Solicitud retirada de la lista de espera', 'next_offer': next_offer})
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
@@ -0,0 +1,30 @@
+# run_reminders.py
+import argparse
+import logging
+from app import app
+from utils.events import broker
+from utils.notifiers import build_notifier
+from utils.reminders import ReminderScheduler
+
+def main():
+    parser = argparse.ArgumentParser(description='Programador de recordatorios de citas (24 h y 2 h antes)')
+    parser.add_argument('--once', action='store_true', help='Enviar lo vencido y terminar (para cron o pruebas)')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+    notifier = build_notifier(app.config)
+    scheduler = ReminderScheduler(app, notifier)
+
+    if args.once:
+        sent = scheduler.run_once()
+        print(f"Recordatorios enviados: {sent}")
+        return
+
+    # Altas, cambios y cancelaciones de citas llegan por el broker (LISTEN/NOTIFY en PostgreSQL)
+    broker.add_handler(scheduler.handle_event)
+    broker.listen()
+    print("Programador de recordatorios iniciado")
+    scheduler.run_forever()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+# sweep_appointments.py
+import argparse
+import time
+from app import app
+from utils.sweeper import sweep_stale_appointments, SWEEP_BATCH_SIZE
+
+def main():
+    parser = argparse.ArgumentParser(description='Cierra citas pendientes/confirmadas cuya hora ya pasó')
+    parser.add_argument('--dry-run', action='store_true', help='Solo contar las citas que cambiarían')
+    parser.add_argument('--batch-size', type=int, default=SWEEP_BATCH_SIZE, help='Citas por UPDATE')
+    parser.add_argument('--max-batches', type=int, help='Máximo de lotes por ejecución')
+    parser.add_argument('--every', type=int, help='Repetir cada N minutos (sin esta opción se ejecuta una vez)')
+    args = parser.parse_args()
+
+    while True:
+        with app.app_context():
+            metrics = sweep_stale_appointments(args.dry_run, args.batch_size, args.max_batches)
+        prefix = "[simulación] " if args.dry_run else ""
+        for transition, count in metrics['transitions'].items():
+            print(f"{prefix}{transition}: {count} citas")
+        if 'reoffered' in metrics:
+            print(f"Ofertas de lista de espera vencidas: {metrics['expired_offers']} (reofrecidas: {metrics['reoffered']})")
+        print(f"Lotes: {metrics['batches']} | activas restantes: {metrics['active_remaining']} | {metrics['elapsed_ms']} ms")
+        if not args.every:
+            break
+        time.sleep(args.every * 60)
+
+if __name__ == "__main__":
+    main()
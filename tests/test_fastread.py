@@ -0,0 +1,125 @@
+import unittest
+from datetime import date, datetime
+from flask import Flask
+from sqlalchemy import desc
+from models import db, User, Responsible, Task, Patient, ClinicalRecord, Appointment
+from utils.fastread import read_rows
+from routes.tasks import serialize_task, TASK_FIELDS
+from routes.clinicalrecords import FAST_JOINS as RECORD_JOINS
+from routes.appointments import FAST_JOINS as APPOINTMENT_JOINS
+
+# La lectura rápida debe devolver exactamente lo mismo que los to_dict / serialize_task del ORM,
+# incluidos los campos que vienen de un JOIN (patient_name) y las fechas nulas.
+
+DOCTOR = {'doctor_name': 'Dra. Soto', 'doctor_email': 'soto@clinica.cl', 'doctor_role': 'medico', 'doctor_id_snapshot': 1}
+
+class FastReadTest(unittest.TestCase):
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+        db.init_app(self.app)
+        self.context = self.app.app_context()
+        self.context.push()
+        db.create_all()
+        self.seed()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.context.pop()
+
+    def seed(self):
+        user = User(mail='soto@clinica.cl', full_name='Dra. Soto', role='medico')
+        user.set_password('secreto1')
+        db.session.add(user)
+        db.session.flush()
+        responsible = Responsible(user_id=user.id, area='Enfermería')
+        db.session.add(responsible)
+        db.session.flush()
+        db.session.add_all([
+            Task(title='Revisar stock', done=False, responsible_id=responsible.id),
+            Task(title='Llamar a paciente', done=True, responsible_id=responsible.id)
+        ])
+
+        complete = Patient(
+            rut='11111111-1', full_name='Ana Pérez', birth_date=date(1985, 3, 2), gender='female',
+            address='Los Aromos 123', phone='+56911111111', email='ana@correo.cl', blood_type='O+',
+            allergies='Penicilina'
+        )
+        minimal = Patient(rut='22222222-2', full_name='Luis Rojas', birth_date=date(1990, 12, 31), gender='male')
+        db.session.add_all([complete, minimal])
+        db.session.flush()
+
+        db.session.add_all([
+            ClinicalRecord(
+                patient_id=complete.id, visit_date=datetime(2024, 5, 10, 9, 30), reason_visit='Control',
+                diagnosis='Hipertensión', blood_pressure='140/90', systolic_bp=140, diastolic_bp=90,
+                heart_rate=72, temperature=36.5, weight=70.2, height=165.0, bmi=25.8,
+                next_appointment=datetime(2024, 6, 10, 9, 30), **DOCTOR
+            ),
+            ClinicalRecord(                                     # next_appointment y signos vitales nulos
+                patient_id=minimal.id, visit_date=datetime(2024, 5, 11, 15, 0), reason_visit='Dolor',
+                diagnosis='Lumbago', **DOCTOR
+            ),
+            ClinicalRecord(                                     # Paciente inexistente: patient_name nulo en el LEFT JOIN
+                patient_id=9999, visit_date=datetime(2024, 5, 12, 8, 0), reason_visit='Fiebre',
+                diagnosis='Virosis', **DOCTOR
+            )
+        ])
+        db.session.add_all([
+            Appointment(
+                patient_id=complete.id, appointment_date=datetime(2024, 7, 1, 10, 0), duration_minutes=45,
+                appointment_type='control', reason='Seguimiento', status='confirmada', observations='Traer exámenes',
+                created_by_name='Recepción', created_by_role='administrativo', **DOCTOR
+            ),
+            Appointment(                                        # original_date y series_id nulos
+                patient_id=minimal.id, appointment_date=datetime(2024, 7, 2, 11, 0),
+                appointment_type='consulta', reason='Dolor lumbar', status='cancelada', cancellation_reason='Viaje',
+                created_by_name='Recepción', created_by_role='administrativo', **DOCTOR
+            ),
+            Appointment(
+                patient_id=9999, appointment_date=datetime(2024, 7, 3, 12, 0), original_date=datetime(2024, 7, 3, 12, 0),
+                appointment_type='consulta', reason='Fiebre',
+                created_by_name='Recepción', created_by_role='administrativo', **DOCTOR
+            )
+        ])
+        db.session.commit()
+        db.session.expunge_all()
+
+    def test_patients(self):
+        expected = [patient.to_dict() for patient in Patient.query.order_by(Patient.id).all()]
+        self.assertEqual(read_rows(Patient, Patient.FIELDS, order_by=[Patient.id]), expected)
+        self.assertIsNone(expected[1]['address'])
+
+    def test_clinical_records(self):
+        expected = [record.to_dict() for record in ClinicalRecord.query.order_by(desc(ClinicalRecord.created_at), ClinicalRecord.id).all()]
+        rows = read_rows(
+            ClinicalRecord, ClinicalRecord.FIELDS,
+            order_by=[desc(ClinicalRecord.created_at), ClinicalRecord.id], joined=RECORD_JOINS
+        )
+        self.assertEqual(rows, expected)
+        self.assertEqual({row['patient_name'] for row in rows}, {'Ana Pérez', 'Luis Rojas', None})
+        self.assertEqual(sum(row['next_appointment'] is None for row in rows), 2)
+
+    def test_appointments(self):
+        expected = [appointment.to_dict() for appointment in Appointment.query.order_by(Appointment.appointment_date).all()]
+        rows = read_rows(Appointment, Appointment.FIELDS, order_by=[Appointment.appointment_date], joined=APPOINTMENT_JOINS)
+        self.assertEqual(rows, expected)
+        self.assertIsNone(rows[0]['original_date'])
+        self.assertIsNone(rows[2]['patient_name'])
+
+    def test_tasks(self):
+        expected = [serialize_task(task) for task in Task.query.order_by(Task.id).all()]
+        rows = read_rows(Task, TASK_FIELDS, order_by=[Task.id])
+        self.assertEqual(rows, expected)
+        self.assertEqual({row['responsible_id'] for row in rows}, {expected[0]['responsible_id']})
+
+    def test_projection(self):
+        fields = ['id', 'patient_name', 'appointment_date', 'status']
+        expected = [appointment.to_dict(fields) for appointment in Appointment.query.order_by(Appointment.appointment_date).all()]
+        rows = read_rows(Appointment, fields, order_by=[Appointment.appointment_date], joined=APPOINTMENT_JOINS)
+        self.assertEqual(rows, expected)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,145 @@
+from datetime import date, datetime, timedelta
+from sqlalchemy import case, func, select, literal_column
+from models.db import db
+
+# Helpers de agregación compartidos por /analytics: todo lo que se pueda se calcula en SQL;
+# lo que el motor no soporta (percentiles en SQLite) se calcula sobre arreglos de una columna.
+
+AGE_BANDS = ((0, 17, '0-17'), (18, 29, '18-29'), (30, 44, '30-44'), (45, 59, '45-59'), (60, 74, '60-74'), (75, None, '75+'))
+
+def _years_before(today, years):
+    try:
+        return today.replace(year=today.year - years)
+    except ValueError:                              # 29 de febrero
+        return today.replace(year=today.year - years, day=28)
+
+def age_band_case(birth_date, today=None):
+    """
+    CASE que clasifica birth_date en AGE_BANDS comparando con fechas límite
+    (portable: no depende de funciones de fecha del motor)
+    """
+    today = today or date.today()
+    whens = []
+    for _, high, label in AGE_BANDS:
+        if high is not None:
+            # Edad <= high  <=>  nació después de hoy menos (high + 1) años
+            whens.append((birth_date > _years_before(today, high + 1), label))
+    return case(*whens, else_=AGE_BANDS[-1][2])
+
+def age_band(birth_date, today=None):
+    """Banda etaria de una fecha de nacimiento (misma regla que age_band_case)"""
+    today = today or date.today()
+    if isinstance(birth_date, datetime):            # Las rutas asignan datetime a la columna Date
+        birth_date = birth_date.date()
+    for _, high, label in AGE_BANDS:
+        if high is not None and birth_date > _years_before(today, high + 1):
+            return label
+    return AGE_BANDS[-1][2]
+
+def month_bucket(column):
+    """Expresión 'YYYY-MM' de una columna de fecha según el motor"""
+    if db.engine.dialect.name == 'postgresql':
+        return func.to_char(column, 'YYYY-MM')
+    return func.strftime('%Y-%m', column)
+
+def _interpolate(values, q):
+    """Percentil con interpolación lineal sobre valores ordenados (igual que percentile_cont)"""
+    position = (len(values) - 1) * q
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+def percentiles(column, filters=(), qs=(0.05, 0.25, 0.5, 0.75, 0.95)):
+    """
+    Percentiles de una columna numérica: {'p5': ..., 'p50': ...}.
+    En PostgreSQL con percentile_cont en un solo SELECT; en otros motores se lee solo
+    esa columna, ya ordenada por la base, y se interpola.
+    """
+    keys = [f'p{round(q * 100)}' for q in qs]
+    not_null = column.isnot(None)
+    if db.engine.dialect.name == 'postgresql':
+        row = db.session.execute(select(*[
+            func.percentile_cont(q).within_group(column) for q in qs
+        ]).where(not_null, *filters)).one()
+        return {key: round(value, 2) if value is not None else None for key, value in zip(keys, row)}
+
+    values = db.session.execute(select(column).where(not_null, *filters).order_by(column)).scalars().all()
+    if not values:
+        return dict.fromkeys(keys)
+    return {key: round(_interpolate(values, q), 2) for key, q in zip(keys, qs)}
+
+# --- Series temporales con buckets (día, semana ISO, mes) ---
+
+BUCKETS = ('day', 'week', 'month')
+
+def bucket_start(value, bucket):
+    """Inicio del bucket que contiene value (semanas de lunes a domingo, como date_trunc)"""
+    day = datetime(value.year, value.month, value.day)
+    if bucket == 'day':
+        return day
+    if bucket == 'week':
+        return day - timedelta(days=day.weekday())
+    return day.replace(day=1)
+
+def next_bucket(start, bucket):
+    if bucket == 'day':
+        return start + timedelta(days=1)
+    if bucket == 'week':
+        return start + timedelta(weeks=1)
+    return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+def bucket_range(start, end, bucket):
+    """Inicios de todos los buckets que tocan el intervalo [start, end]"""
+    current = bucket_start(start, bucket)
+    buckets = []
+    while current <= end:
+        buckets.append(current)
+        current = next_bucket(current, bucket)
+    return buckets
+
+def _bucket_expression(column, bucket):
+    if db.engine.dialect.name == 'postgresql':
+        return func.date_trunc(literal_column(f"'{bucket}'"), column)     # Literal: GROUP BY debe repetir la misma expresión
+    if bucket == 'day':
+        return func.date(column)
+    if bucket == 'week':
+        return func.date(column, 'weekday 0', '-6 days')   # Lunes de la semana (la semana termina el domingo)
+    return func.strftime('%Y-%m-01', column)
+
+def _as_datetime(value):
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+    return datetime.fromisoformat(value)
+
+def bucket_counts(column, bucket, buckets, filters=(), group=None):
+    """
+    Conteos por bucket para los buckets consecutivos `buckets`, con un solo SELECT.
+    En PostgreSQL la serie se completa en SQL con generate_series (LEFT JOIN de los
+    agregados); en otros motores los buckets vacíos se completan aquí.
+    Devuelve {inicio_bucket: conteo} o, con group, {inicio_bucket: {grupo: conteo}}.
+    """
+    start, end = buckets[0], next_bucket(buckets[-1], bucket)
+    label = _bucket_expression(column, bucket).label('bucket')
+    group_columns = [group.label('grp')] if group is not None else []
+    counts = select(label, *group_columns, func.count().label('n')).where(
+        column >= start, column < end, *filters
+    ).group_by(label, *group_columns).subquery()
+
+    if db.engine.dialect.name == 'postgresql':
+        series = select(func.generate_series(start, buckets[-1], literal_column(f"interval '1 {bucket}'")).label('bucket')).subquery()
+        stmt = select(series.c.bucket, *([counts.c.grp] if group is not None else []), func.coalesce(counts.c.n, 0)).select_from(
+            series.outerjoin(counts, counts.c.bucket == series.c.bucket)
+        ).order_by(series.c.bucket)
+    else:
+        stmt = select(counts)
+
+    result = {bucket_value: ({} if group is not None else 0) for bucket_value in buckets}
+    for row in db.session.execute(stmt):
+        key = _as_datetime(row[0])
+        if group is None:
+            result[key] = row[-1]
+        elif row[1] is not None:
+            result[key][row[1]] = row[-1]
+    return result
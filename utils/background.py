@@ -0,0 +1,85 @@
+import threading
+import uuid
+import json
+import logging
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import insert, update, delete
+from models import db, BackgroundJob
+
+logger = logging.getLogger(__name__)
+
+JOB_RETENTION = timedelta(days=7)   # Los trabajos se conservan una semana desde su última actualización
+HEARTBEAT_SECONDS = 60              # Renovación de updated_at mientras el trabajo corre (menor que STALE_AFTER)
+
+jobs = BackgroundJob.__table__
+
+def _save(job_id, **values):
+    """
+    Actualiza el estado en una conexión propia: no interfiere con la transacción del trabajo
+    ni con la de la petición que lo inició
+    """
+    for key in ('progress', 'result'):
+        if key in values:
+            values[key] = json.dumps(values[key])
+    with db.engine.begin() as connection:
+        connection.execute(update(jobs).where(jobs.c.id == job_id).values(updated_at=datetime.utcnow(), **values))
+
+def start_job(kind, func, *args):
+    """
+    Ejecuta func(*args, progress=...) en un hilo con contexto de aplicación.
+    Devuelve el id del trabajo para consultar su estado con get_job.
+    """
+    app = current_app._get_current_object()
+    job_id = uuid.uuid4().hex
+    now = datetime.utcnow()
+    with db.engine.begin() as connection:
+        # Un trabajo activo sin latido durante toda la retención también quedó abandonado
+        connection.execute(delete(jobs).where(jobs.c.updated_at < now - JOB_RETENTION))
+        connection.execute(insert(jobs).values(
+            id=job_id, kind=kind, status='pendiente', progress='{}', created_at=now, updated_at=now
+        ))
+
+    def progress(**values):
+        _save(job_id, progress=values)
+
+    def heartbeat(stop):
+        with app.app_context():                     # db.engine requiere el contexto de la aplicación
+            while not stop.wait(HEARTBEAT_SECONDS):
+                try:
+                    _save(job_id)
+                except Exception:
+                    logger.exception('No se pudo renovar el trabajo %s', job_id)
+
+    def run():
+        with app.app_context():
+            stop = threading.Event()
+            threading.Thread(target=heartbeat, args=(stop,), name=f'job-{kind}-heartbeat', daemon=True).start()
+            _save(job_id, status='en_progreso')
+            try:
+                result = func(*args, progress=progress)
+                _save(job_id, status='completado', result=result)
+            except Exception as e:
+                logger.exception('Error en trabajo %s', job_id)
+                db.session.rollback()
+                _save(job_id, status='error', error=str(e))
+            finally:
+                stop.set()
+                db.session.remove()
+
+    threading.Thread(target=run, name=f'job-{kind}', daemon=True).start()
+    return job_id
+
+def get_job(job_id):
+    """
+    Estado del trabajo (dict) o None. Si dejó de renovarse se informa como interrumpido sin
+    guardarlo: el hilo podría seguir vivo y terminar después
+    """
+    job = db.session.get(BackgroundJob, job_id)
+    if job is None:
+        return None
+    data = job.to_dict()
+    if job.is_stale():
+        data['status'] = 'interrumpido'
+        data['error'] = 'El trabajo dejó de renovarse: el proceso que lo ejecutaba pudo detenerse'
+    return data
@@ -0,0 +1,24 @@
+MAX_BATCH_IDS = 500
+
+def parse_ids(raw):
+    """
+    Convierte '3,1,3,7' en [3, 1, 7] (sin duplicados, conservando el orden).
+    Lanza ValueError si algún id no es entero o si se excede MAX_BATCH_IDS.
+    """
+    if not raw:
+        raise ValueError('El parámetro ids es obligatorio')
+    ids = list(dict.fromkeys(int(value) for value in raw.split(',') if value.strip()))
+    if len(ids) > MAX_BATCH_IDS:
+        raise ValueError(f'Máximo {MAX_BATCH_IDS} ids por petición')
+    return ids
+
+def fetch_batch(model, ids, *options):
+    """
+    Obtiene varias filas con un solo IN y las devuelve en el orden solicitado,
+    junto con la lista de ids inexistentes
+    """
+    query = model.query.options(*options) if options else model.query
+    rows = {row.id: row for row in query.filter(model.id.in_(ids)).all()}
+    found = [rows[item_id] for item_id in ids if item_id in rows]
+    missing = [item_id for item_id in ids if item_id not in rows]
+    return found, missing
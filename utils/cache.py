@@ -0,0 +1,335 @@
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# --- Backends: almacenan texto con expiración; la lógica de tags y stampede vive en Cache ---
+
+class MemoryBackend:
+    """LRU en memoria con TTL (por proceso)"""
+
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self._data = OrderedDict()                  # key -> (expira_en, valor), en orden de uso
+        self._lock = threading.Lock()
+
+    def _alive(self, key):
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        if entry[0] is not None and entry[0] < time.monotonic():
+            del self._data[key]
+            return None
+        return entry
+
+    def get(self, key):
+        with self._lock:
+            entry = self._alive(key)
+            if entry is None:
+                return None
+            self._data.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl if ttl else None, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)      # Descarta la entrada menos usada
+
+    def get_many(self, keys):
+        return [self.get(key) for key in keys]
+
+    def set_many(self, mapping, ttl=None):
+        for key, value in mapping.items():
+            self.set(key, value, ttl)
+
+    def add(self, key, value, ttl=None):
+        """Guarda solo si la clave no existe; devuelve True si se guardó"""
+        with self._lock:
+            if self._alive(key) is not None:
+                return False
+            self._data[key] = (time.monotonic() + ttl if ttl else None, value)
+            return True
+
+    def incr(self, key):
+        with self._lock:
+            entry = self._alive(key)
+            value = int(entry[1]) + 1 if entry else 1
+            self._data[key] = (entry[0] if entry else None, str(value))
+            return value
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self, prefix):
+        with self._lock:
+            for key in [k for k in self._data if k.startswith(prefix)]:
+                del self._data[key]
+
+class SQLiteBackend:
+    """Archivo SQLite compartido por todos los workers de un mismo host"""
+
+    PURGE_PROBABILITY = 0.001                       # Fracción de escrituras que limpian entradas expiradas
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():      # Las conexiones no se comparten tras un fork
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key):
+        row = self._conn().execute(
+            'SELECT value FROM cache WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)',
+            (key, time.time())
+        ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key, value, ttl=None):
+        conn = self._conn()
+        conn.execute(
+            'INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)',
+            (key, value, time.time() + ttl if ttl else None)
+        )
+        if random.random() < self.PURGE_PROBABILITY:
+            conn.execute('DELETE FROM cache WHERE expires_at < ?', (time.time(),))
+
+    def get_many(self, keys):
+        found = {}
+        for i in range(0, len(keys), 500):                  # Límite de parámetros por sentencia
+            chunk = keys[i:i + 500]
+            found.update(self._conn().execute(
+                f'SELECT key, value FROM cache WHERE key IN ({",".join("?" * len(chunk))}) AND (expires_at IS NULL OR expires_at > ?)',
+                (*chunk, time.time())
+            ).fetchall())
+        return [found.get(key) for key in keys]
+
+    def set_many(self, mapping, ttl=None):
+        expires_at = time.time() + ttl if ttl else None
+        self._conn().executemany(
+            'INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)',
+            [(key, value, expires_at) for key, value in mapping.items()]
+        )
+
+    def add(self, key, value, ttl=None):
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute('DELETE FROM cache WHERE key = ? AND expires_at < ?', (key, time.time()))
+            cursor = conn.execute(
+                'INSERT OR IGNORE INTO cache (key, value, expires_at) VALUES (?, ?, ?)',
+                (key, value, time.time() + ttl if ttl else None)
+            )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return cursor.rowcount == 1
+
+    def incr(self, key):
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute(
+                "INSERT INTO cache (key, value, expires_at) VALUES (?, '1', NULL) "
+                "ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1",
+                (key,)
+            )
+            value = conn.execute('SELECT value FROM cache WHERE key = ?', (key,)).fetchone()[0]
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return int(value)
+
+    def delete(self, *keys):
+        if keys:
+            self._conn().executemany('DELETE FROM cache WHERE key = ?', [(key,) for key in keys])
+
+    def clear(self, prefix):
+        self._conn().execute('DELETE FROM cache WHERE substr(key, 1, ?) = ?', (len(prefix), prefix))
+
+class RedisBackend:
+    """Cualquier servidor que hable el protocolo de Redis (Redis, Valkey, KeyDB, fakeredis)"""
+
+    def __init__(self, url):
+        import redis                                # Dependencia opcional: solo si CACHE_BACKEND=redis
+        self.client = redis.Redis.from_url(url, decode_responses=True)
+
+    def get(self, key):
+        return self.client.get(key)
+
+    def set(self, key, value, ttl=None):
+        self.client.set(key, value, px=int(ttl * 1000) if ttl else None)
+
+    def get_many(self, keys):
+        return self.client.mget(keys) if keys else []
+
+    def set_many(self, mapping, ttl=None):
+        pipeline = self.client.pipeline(transaction=False)
+        for key, value in mapping.items():
+            pipeline.set(key, value, px=int(ttl * 1000) if ttl else None)
+        pipeline.execute()
+
+    def add(self, key, value, ttl=None):
+        return bool(self.client.set(key, value, px=int(ttl * 1000) if ttl else None, nx=True))
+
+    def incr(self, key):
+        return self.client.incr(key)
+
+    def delete(self, *keys):
+        if keys:
+            self.client.delete(*keys)
+
+    def clear(self, prefix):
+        keys = list(self.client.scan_iter(match=f'{prefix}*', count=500))
+        for i in range(0, len(keys), 500):
+            self.client.delete(*keys[i:i + 500])
+
+# --- Fachada usada por los blueprints ---
+
+class Cache:
+    """
+    Caché con backend intercambiable (memory | sqlite | redis), invalidación por tags
+    y protección contra estampidas en get_or_set.
+    Los valores deben ser serializables a JSON.
+    """
+
+    LOCK_TIMEOUT = 10                               # Segundos máximos esperando a otro proceso que calcula el valor
+    LOCK_POLL = 0.05
+
+    def __init__(self, backend=None, namespace='elias', default_ttl=300):
+        self.backend = backend or MemoryBackend()
+        self.namespace = namespace
+        self.default_ttl = default_ttl
+        self.hits = 0
+        self.misses = 0
+
+    def init_app(self, app):
+        kind = app.config.get('CACHE_BACKEND', 'memory')
+        if kind == 'sqlite':
+            self.backend = SQLiteBackend(app.config.get('CACHE_URL') or '/tmp/elias-cache.sqlite3')
+        elif kind == 'redis':
+            self.backend = RedisBackend(app.config.get('CACHE_URL') or 'redis://localhost:6379/0')
+        elif kind == 'memory':
+            self.backend = MemoryBackend()
+        else:
+            raise ValueError(f'CACHE_BACKEND inválido: {kind}')
+        self.default_ttl = app.config.get('CACHE_DEFAULT_TTL', self.default_ttl)
+        app.extensions['cache'] = self
+
+    def _key(self, key):
+        return f'{self.namespace}:{key}'
+
+    def _tag_key(self, tag):
+        return f'{self.namespace}:tag:{tag}'
+
+    def _tag_versions(self, tags):
+        return {tag: str(self.backend.get(self._tag_key(tag)) or 0) for tag in tags}
+
+    def _lookup(self, key):
+        raw = self.backend.get(self._key(key))
+        if raw is None:
+            return None
+        entry = json.loads(raw)
+        if self._tag_versions(entry['tags']) != entry['tags']:
+            return None
+        return entry['value']
+
+    def get(self, key):
+        """Devuelve el valor vigente o None (expirado, inexistente o con un tag invalidado)"""
+        value = self._lookup(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, key, value, ttl=None, tags=()):
+        self._store(key, value, ttl, self._tag_versions(tags))
+
+    def _store(self, key, value, ttl, versions):
+        entry = {'value': value, 'tags': versions}
+        self.backend.set(self._key(key), json.dumps(entry), ttl or self.default_ttl)
+
+    def get_many(self, keys):
+        """{clave: valor} de las claves vigentes, con un solo viaje al backend (entradas sin tags)"""
+        result = {}
+        for key, raw in zip(keys, self.backend.get_many([self._key(key) for key in keys])):
+            entry = json.loads(raw) if raw is not None else None
+            if entry is None or (entry['tags'] and self._tag_versions(entry['tags']) != entry['tags']):
+                self.misses += 1
+                continue
+            self.hits += 1
+            result[key] = entry['value']
+        return result
+
+    def set_many(self, mapping, ttl=None):
+        """Guarda varias entradas sin tags de una vez"""
+        if mapping:
+            self.backend.set_many(
+                {self._key(key): json.dumps({'value': value, 'tags': {}}) for key, value in mapping.items()},
+                ttl or self.default_ttl
+            )
+
+    def add(self, key, value, ttl=None):
+        """Guarda solo si la clave no existe (atómico en el backend); devuelve True si se guardó"""
+        return self.backend.add(self._key(key), json.dumps({'value': value, 'tags': {}}), ttl or self.default_ttl)
+
+    def delete(self, *keys):
+        self.backend.delete(*[self._key(key) for key in keys])
+
+    def invalidate_tags(self, *tags):
+        """Invalida de una vez todas las entradas asociadas a los tags"""
+        for tag in tags:
+            self.backend.incr(self._tag_key(tag))
+
+    def clear(self):
+        self.backend.clear(self._key(''))
+
+    def get_or_set(self, key, factory, ttl=None, tags=()):
+        """
+        Devuelve el valor cacheado o lo calcula con factory(). Solo un proceso calcula
+        a la vez cada clave; el resto espera el resultado (hasta LOCK_TIMEOUT).
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        lock_key = self._key(f'lock:{key}')
+        if not self.backend.add(lock_key, '1', self.LOCK_TIMEOUT):
+            deadline = time.monotonic() + self.LOCK_TIMEOUT
+            while time.monotonic() < deadline:
+                time.sleep(self.LOCK_POLL)
+                value = self._lookup(key)
+                if value is not None:
+                    return value
+            return factory()                        # El otro proceso no terminó: se calcula sin cachear
+
+        try:
+            # Versiones tomadas antes de calcular: si un tag se invalida durante factory(),
+            # la entrada queda con la versión anterior y la próxima lectura la descarta
+            versions = self._tag_versions(tags)
+            value = factory()
+            self._store(key, value, ttl, versions)
+            return value
+        finally:
+            self.backend.delete(lock_key)
+
+    def stats(self):
+        return {'backend': type(self.backend).__name__, 'hits': self.hits, 'misses': self.misses}
+
+cache = Cache()
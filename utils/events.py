@@ -0,0 +1,205 @@
+import json
+import os
+import queue
+import select
+import threading
+import logging
+from datetime import datetime
+from sqlalchemy import event, inspect, text
+from sqlalchemy.orm import Session
+from models.db import db
+from models.appointment import Appointment
+from models.patient import Patient
+from models.clinicalrecord import ClinicalRecord
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = 'elias_events'            # Canal de LISTEN/NOTIFY compartido por todos los workers
+SUBSCRIBER_QUEUE_SIZE = 100         # Eventos pendientes por suscriptor antes de descartarlo
+
+def _iso(value):
+    return value.isoformat() if value else None
+
+def _previous(obj, attr):
+    """Valor anterior de un atributo modificado en el flush (None si no cambió)"""
+    history = inspect(obj).attrs[attr].history
+    return history.deleted[0] if history.deleted else None
+
+def _appointment_event(appointment, action):
+    if action == 'updated' and appointment.status == 'cancelada' and _previous(appointment, 'status') not in (None, 'cancelada'):
+        action = 'cancelled'
+    return {
+        'type': f'appointment.{action}',
+        'topic': 'appointments',
+        'id': appointment.id,
+        'patient_id': appointment.patient_id,
+        'doctor_id': appointment.doctor_id_snapshot,
+        'appointment_date': _iso(appointment.appointment_date),
+        'previous_date': _iso(_previous(appointment, 'appointment_date')) if action != 'created' else None,
+        'duration_minutes': appointment.duration_minutes,
+        'status': appointment.status,
+        'appointment_type': appointment.appointment_type
+    }
+
+def _counter_event(obj, action, total_key, today_key):
+    """Eventos de dashboard: solo altas y bajas cambian los contadores"""
+    if action == 'updated':
+        return None
+    sign = 1 if action == 'created' else -1
+    deltas = {total_key: sign}
+    if obj.created_at and obj.created_at.date() == datetime.now().date():
+        deltas[today_key] = sign
+    return {'type': 'dashboard.counters', 'topic': 'dashboard', 'deltas': deltas}
+
+def _patient_events(patient, action):
+    events = [{'type': f'patient.{action}', 'topic': 'patients', 'id': patient.id}]
+    counters = _counter_event(patient, action, 'total_patients', 'new_patients')
+    return events + ([counters] if counters else [])
+
+def _record_events(record, action):
+    events = [{'type': f'clinical_record.{action}', 'topic': 'clinical_records', 'id': record.id, 'patient_id': record.patient_id}]
+    counters = _counter_event(record, action, 'total_clinical_records', 'new_records')
+    return events + ([counters] if counters else [])
+
+EVENT_BUILDERS = {
+    Appointment: lambda obj, action: [_appointment_event(obj, action)],
+    Patient: _patient_events,
+    ClinicalRecord: _record_events
+}
+
+class EventBroker:
+    """
+    Difunde eventos de dominio después de cada commit.
+    Con PostgreSQL usa LISTEN/NOTIFY para que todos los workers reciban los eventos;
+    con otros motores la difusión es local al proceso.
+    """
+
+    def __init__(self):
+        self.app = None
+        self._subscribers = set()
+        self._handlers = []
+        self._lock = threading.Lock()
+        self._listener_pid = None
+        self._use_notify = False
+
+    def init_app(self, app):
+        self.app = app
+        self._use_notify = app.config['SQLALCHEMY_DATABASE_URI'].startswith('postgres')
+        app.before_request(self._ensure_listener)
+        app.extensions['event_broker'] = self
+
+    # --- Suscripción ---
+
+    def subscribe(self):
+        """Registra un suscriptor (p. ej. una conexión SSE) y devuelve su cola"""
+        self._ensure_listener()
+        subscriber = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        with self._lock:
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def listen(self):
+        """Inicia la escucha entre workers fuera de una petición (p. ej. en procesos de fondo)"""
+        self._ensure_listener()
+
+    def add_handler(self, handler):
+        """Registra una función que se ejecuta en cada worker por cada evento recibido"""
+        self._handlers.append(handler)
+
+    # --- Publicación ---
+
+    def publish(self, events):
+        if not events:
+            return
+        if not self._use_notify:
+            for evt in events:
+                self._dispatch(evt)
+            return
+        try:
+            with db.engine.connect() as connection:
+                for evt in events:
+                    connection.execute(text('SELECT pg_notify(:channel, :payload)'), {
+                        'channel': CHANNEL,
+                        'payload': json.dumps(evt)
+                    })
+                connection.commit()
+        except Exception:
+            logger.exception('No se pudieron publicar eventos')
+
+    def _dispatch(self, evt):
+        for handler in self._handlers:
+            try:
+                handler(evt)
+            except Exception:
+                logger.exception('Error en handler de eventos')
+
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait(evt)
+            except queue.Full:
+                self.unsubscribe(subscriber)        # Cliente demasiado lento: se desconecta y debe reconectar
+
+    # --- Escucha entre workers (PostgreSQL) ---
+
+    def _ensure_listener(self):
+        if not self._use_notify or self._listener_pid == os.getpid():
+            return
+        with self._lock:
+            if self._listener_pid == os.getpid():   # Tras un fork el hilo no existe en el proceso hijo
+                return
+            self._listener_pid = os.getpid()
+        threading.Thread(target=self._listen, name='event-listener', daemon=True).start()
+
+    def _listen(self):
+        while True:
+            try:
+                with self.app.app_context():
+                    connection = db.engine.raw_connection()
+                connection.detach()                     # Conexión dedicada: no vuelve al pool en modo autocommit
+                try:
+                    raw = connection.driver_connection
+                    raw.autocommit = True
+                    with raw.cursor() as cursor:
+                        cursor.execute(f'LISTEN {CHANNEL};')
+                    while True:
+                        if select.select([raw], [], [], 30) == ([], [], []):
+                            continue
+                        raw.poll()
+                        while raw.notifies:
+                            notify = raw.notifies.pop(0)
+                            self._dispatch(json.loads(notify.payload))
+                finally:
+                    connection.close()
+            except Exception:
+                logger.exception('Conexión LISTEN perdida, reintentando')
+                threading.Event().wait(5)
+
+broker = EventBroker()
+
+# --- Hooks de sesión: se acumulan eventos en el flush y se publican tras el commit ---
+
+@event.listens_for(Session, 'after_flush')
+def _collect_events(session, flush_context):
+    pending = session.info.setdefault('pending_events', [])
+    for objects, action in ((session.new, 'created'), (session.dirty, 'updated'), (session.deleted, 'deleted')):
+        for obj in objects:
+            builder = EVENT_BUILDERS.get(type(obj))
+            if builder is None:
+                continue
+            if action == 'updated' and not session.is_modified(obj, include_collections=False):
+                continue
+            pending.extend(builder(obj, action))
+
+@event.listens_for(Session, 'after_commit')
+def _publish_events(session):
+    broker.publish(session.info.pop('pending_events', []))
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_events(session):
+    session.info.pop('pending_events', None)
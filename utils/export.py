@@ -0,0 +1,141 @@
+import hashlib
+import hmac
+import json
+import os
+from datetime import datetime, timedelta
+from sqlalchemy import select, Integer, Float, Boolean, Date, DateTime
+from models import db, Patient, ClinicalRecord, Appointment, Task, DeletionLog
+
+# Exportación columnar para análisis: cada tabla se lee con un cursor del lado del servidor
+# y se escribe por bloques a Parquet (o Arrow IPC), sin cargar la tabla completa en memoria.
+
+CHUNK_SIZE = 50000                  # Filas por bloque (= por row group en Parquet)
+SAFETY_WINDOW = timedelta(seconds=5)  # Margen para transacciones que aún no confirman con un updated_at anterior
+WATERMARK_FILE = '_watermarks.json'
+
+# tabla -> (modelo, columna de marca de agua)
+EXPORT_TABLES = {
+    'patient': (Patient, Patient.updated_at),
+    'clinical_record': (ClinicalRecord, ClinicalRecord.updated_at),
+    'appointment': (Appointment, Appointment.updated_at),
+    'task': (Task, Task.updated_at),
+    'deletion_log': (DeletionLog, DeletionLog.deleted_at)       # Para aplicar eliminaciones en exportaciones incrementales
+}
+
+# Con seudonimización, RUT y nombres se reemplazan por un HMAC estable (permite cruzar tablas
+# y exportaciones sin revelar la identidad) y los datos de contacto no se exportan
+PSEUDONYMIZED_COLUMNS = {'patient': ('rut', 'full_name', 'emergency_contact')}
+DROPPED_COLUMNS = {'patient': ('address', 'phone', 'email', 'emergency_phone')}
+
+def _arrow():
+    try:
+        import pyarrow                              # Dependencia opcional: solo para exportar
+    except ImportError:
+        raise RuntimeError('La exportación requiere pyarrow (pip install pyarrow)')
+    return pyarrow
+
+def pseudonymize(value, key):
+    if value is None:
+        return None
+    return hmac.new(key, str(value).encode('utf-8'), hashlib.sha256).hexdigest()
+
+def _arrow_type(pa, column, pseudonymized):
+    if pseudonymized:
+        return pa.string()
+    if isinstance(column.type, Boolean):
+        return pa.bool_()
+    if isinstance(column.type, Integer):
+        return pa.int64()
+    if isinstance(column.type, Float):
+        return pa.float64()
+    if isinstance(column.type, DateTime):
+        return pa.timestamp('us')
+    if isinstance(column.type, Date):
+        return pa.date32()
+    return pa.string()
+
+def load_watermarks(directory):
+    path = os.path.join(directory, WATERMARK_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as f:
+        return {table: datetime.fromisoformat(value) for table, value in json.load(f).items()}
+
+def save_watermarks(directory, watermarks):
+    path = os.path.join(directory, WATERMARK_FILE)
+    with open(f'{path}.tmp', 'w', encoding='utf-8') as f:
+        json.dump({table: value.isoformat() for table, value in watermarks.items()}, f, indent=2)
+    os.replace(f'{path}.tmp', path)
+
+def export_table(table, path, since=None, until=None, fmt='parquet', chunk_size=CHUNK_SIZE, pseudonym_key=None):
+    """
+    Escribe las filas de `table` con marca de agua en (since, until] en `path`.
+    Devuelve la cantidad de filas exportadas.
+    """
+    pa = _arrow()
+    model, watermark = EXPORT_TABLES[table]
+    hashed = set(PSEUDONYMIZED_COLUMNS.get(table, ())) if pseudonym_key else set()
+    dropped = set(DROPPED_COLUMNS.get(table, ())) if pseudonym_key else set()
+
+    columns = [column for column in model.__table__.columns if column.key not in dropped]
+    schema = pa.schema([pa.field(column.key, _arrow_type(pa, column, column.key in hashed)) for column in columns])
+    hashed_indexes = [index for index, column in enumerate(columns) if column.key in hashed]
+
+    stmt = select(*columns).order_by(watermark, model.id)
+    if since is not None:
+        stmt = stmt.where(watermark > since)
+    if until is not None:
+        stmt = stmt.where(watermark <= until)
+
+    if fmt == 'parquet':
+        import pyarrow.parquet as pq
+        writer = pq.ParquetWriter(path, schema, compression='zstd')
+    elif fmt == 'arrow':
+        writer = pa.ipc.new_file(path, schema)
+    else:
+        raise ValueError(f'Formato no soportado: {fmt}')
+
+    total = 0
+    try:
+        # stream_results usa un cursor con nombre en PostgreSQL; yield_per acota las filas en memoria
+        result = db.session.execute(stmt.execution_options(stream_results=True, yield_per=chunk_size))
+        for partition in result.partitions():
+            values = list(zip(*partition))          # Filas -> columnas
+            for index in hashed_indexes:
+                values[index] = [pseudonymize(value, pseudonym_key) for value in values[index]]
+            writer.write_batch(pa.RecordBatch.from_arrays(
+                [pa.array(column_values, type=field.type) for column_values, field in zip(values, schema)],
+                schema=schema
+            ))
+            total += len(partition)
+    finally:
+        writer.close()
+    return total
+
+def export_tables(directory, tables=None, incremental=False, fmt='parquet', chunk_size=CHUNK_SIZE, pseudonym_key=None, progress=None):
+    """
+    Exporta las tablas a `directory` (un archivo por tabla y ejecución).
+    En modo incremental solo se exportan las filas modificadas desde la última marca de agua;
+    la marca se actualiza únicamente cuando el archivo de la tabla quedó escrito completo.
+    """
+    os.makedirs(directory, exist_ok=True)
+    watermarks = load_watermarks(directory)
+    until = datetime.utcnow() - SAFETY_WINDOW
+    stamp = until.strftime('%Y%m%dT%H%M%S')
+    extension = 'parquet' if fmt == 'parquet' else 'arrow'
+
+    summary = {}
+    for table in tables or EXPORT_TABLES:
+        since = watermarks.get(table) if incremental else None
+        kind = 'incremental' if since else 'full'
+        path = os.path.join(directory, f'{table}-{kind}-{stamp}.{extension}')
+
+        rows = export_table(table, f'{path}.tmp', since, until, fmt, chunk_size, pseudonym_key)
+        os.replace(f'{path}.tmp', path)
+        watermarks[table] = until
+        save_watermarks(directory, watermarks)
+
+        summary[table] = {'rows': rows, 'file': path, 'since': since.isoformat() if since else None}
+        if progress:
+            progress(table, summary[table])
+    return summary
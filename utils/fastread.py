@@ -0,0 +1,49 @@
+from sqlalchemy import select, Date, DateTime
+from models.db import db
+
+# Lectura rápida para listados de solo lectura: SELECT de Core (sin identity map ni
+# instrumentación del ORM) que devuelve tuplas y las serializa directamente a dicts
+# con el mismo formato que los to_dict de los modelos.
+
+def _is_temporal(column):
+    return isinstance(column.type, (Date, DateTime))
+
+def read_rows(model, fields, filters=(), order_by=(), joined=None, limit=None):
+    """
+    Ejecuta un SELECT con solo las columnas de `fields` y devuelve una lista de dicts.
+    joined define campos que vienen de otra tabla: {'patient_name': (Patient.full_name, Patient, condición_join)}
+    """
+    table = model.__table__
+    columns = []
+    joins = []
+    for field in fields:
+        if joined and field in joined:
+            column, target, onclause = joined[field]
+            columns.append(column.label(field))
+            joins.append((target, onclause))
+        else:
+            columns.append(table.c[field])
+
+    source = table
+    for target, onclause in joins:
+        source = source.outerjoin(target, onclause)
+
+    stmt = select(*columns).select_from(source).where(*filters).order_by(*order_by)
+    if limit is not None:
+        stmt = stmt.limit(limit)
+
+    names = tuple(fields)
+    temporal = [index for index, column in enumerate(columns) if _is_temporal(column)]
+    rows = db.session.execute(stmt).tuples()
+
+    if not temporal:
+        return [dict(zip(names, row)) for row in rows]
+
+    result = []
+    for row in rows:
+        values = list(row)
+        for index in temporal:
+            value = values[index]
+            values[index] = value.isoformat() if value is not None else None
+        result.append(dict(zip(names, values)))
+    return result
@@ -0,0 +1,50 @@
+from flask import request
+from datetime import date, datetime
+from sqlalchemy.orm import load_only
+
+def model_fields(model, exclude=(), extra=()):
+    """Campos serializables de un modelo: sus columnas (menos las excluidas) más campos calculados"""
+    return [column.key for column in model.__table__.columns if column.key not in exclude] + list(extra)
+
+def parse_fields(allowed):
+    """
+    Lee ?fields=id,full_name,rut. Devuelve None si no se pidió proyección.
+    Lanza ValueError si se piden campos desconocidos.
+    """
+    raw = request.args.get('fields')
+    if not raw:
+        return None
+    fields = list(dict.fromkeys(field.strip() for field in raw.split(',') if field.strip()))
+    unknown = [field for field in fields if field not in allowed]
+    if unknown:
+        raise ValueError(f'Campos inválidos: {", ".join(unknown)}')
+    return fields
+
+def projection(model, fields, computed=None, loaders=None):
+    """
+    Opciones de carga para que el SELECT traiga solo las columnas de los campos pedidos
+    (lista vacía si no hay proyección).
+    computed indica las columnas que necesita cada campo calculado (p. ej. patient_name -> patient_id)
+    y loaders la carga de relaciones que requiere (p. ej. joinedload del paciente).
+    id y updated_at se cargan siempre (identidad y ETag).
+    """
+    if fields is None:
+        return []
+    columns = {'id', 'updated_at'}
+    for field in fields:
+        columns.update((computed or {}).get(field, [field]))
+    table_columns = model.__table__.columns
+    options = [load_only(*[getattr(model, column) for column in columns if column in table_columns])]
+    options += [loader for field, loader in (loaders or {}).items() if field in fields]
+    return options
+
+def serialize_fields(obj, fields, computed=None):
+    """Serializa solo los campos pedidos; fechas en ISO como en los to_dict completos"""
+    data = {}
+    for field in fields:
+        if computed and field in computed:
+            data[field] = computed[field](obj)
+            continue
+        value = getattr(obj, field)
+        data[field] = value.isoformat() if isinstance(value, (date, datetime)) else value
+    return data
@@ -0,0 +1,49 @@
+from flask import request, jsonify, make_response
+from sqlalchemy import func
+from datetime import timezone
+import hashlib
+
+def build_etag(*parts):
+    """Genera un ETag estable a partir de las partes que identifican la versión de un recurso"""
+    raw = '|'.join('' if part is None else str(part) for part in parts)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+def latest_timestamp(*timestamps):
+    """Devuelve la fecha más reciente ignorando valores nulos"""
+    values = [ts for ts in timestamps if ts is not None]
+    return max(values) if values else None
+
+def list_version(query, model):
+    """
+    Obtiene (max(updated_at), cantidad) bajo los filtros activos de la query
+    con un solo agregado, sin cargar filas
+    """
+    return query.with_entities(
+        func.max(model.updated_at),
+        func.count(model.id)
+    ).order_by(None).first()
+
+def is_not_modified(etag, last_modified):
+    """Verifica If-None-Match / If-Modified-Since contra la versión actual"""
+    if request.if_none_match:
+        return request.if_none_match.contains(etag)     # If-None-Match tiene prioridad (RFC 7232)
+    if request.if_modified_since and last_modified:
+        current = last_modified.replace(microsecond=0, tzinfo=timezone.utc)
+        return current <= request.if_modified_since
+    return False
+
+def conditional_json(build_payload, etag, last_modified=None):
+    """
+    Responde 304 si el cliente ya tiene la versión vigente; en caso contrario
+    construye el payload (solo entonces) y lo envía con ETag y Last-Modified
+    """
+    if is_not_modified(etag, last_modified):
+        response = make_response('', 304)
+    else:
+        response = jsonify(build_payload())
+
+    response.set_etag(etag)
+    if last_modified:
+        response.last_modified = last_modified.replace(tzinfo=timezone.utc)
+    response.headers['Cache-Control'] = 'no-cache'      # Permite caché en el cliente, pero siempre revalidando
+    return response
@@ -0,0 +1,68 @@
+from datetime import timedelta
+
+# Generación de iCalendar (RFC 5545) sin dependencias: cada cita se renderiza como un bloque
+# VEVENT independiente, de modo que los bloques se pueden cachear y concatenar en streaming.
+# Las fechas de las citas son hora local de la clínica y se emiten como hora "flotante".
+
+PRODID = '-//Elias//Agenda medica//ES'
+EVENT_STATUS = {'pendiente': 'TENTATIVE', 'confirmada': 'CONFIRMED', 'cancelada': 'CANCELLED'}
+
+def escape_text(value):
+    return (value or '').replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,').replace('\r\n', '\\n').replace('\n', '\\n')
+
+def fold(line):
+    """Corta líneas de más de 75 octetos (continuación con CRLF + espacio) sin partir caracteres UTF-8"""
+    encoded = line.encode('utf-8')
+    if len(encoded) <= 75:
+        return line + '\r\n'
+    parts = []
+    current = ''
+    size = 0
+    limit = 75
+    for char in line:
+        char_size = len(char.encode('utf-8'))
+        if size + char_size > limit:
+            parts.append(current)
+            current, size, limit = '', 0, 74            # Las continuaciones empiezan con un espacio
+        current += char
+        size += char_size
+    parts.append(current)
+    return '\r\n '.join(parts) + '\r\n'
+
+def _local(value):
+    return value.strftime('%Y%m%dT%H%M%S')
+
+def _utc(value):
+    return value.strftime('%Y%m%dT%H%M%SZ')
+
+def calendar_header(name, timezone=None):
+    lines = [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        f'PRODID:{PRODID}',
+        'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH',
+        f'X-WR-CALNAME:{escape_text(name)}'
+    ]
+    if timezone:
+        lines.append(f'X-WR-TIMEZONE:{timezone}')
+    return ''.join(fold(line) for line in lines)
+
+CALENDAR_FOOTER = 'END:VCALENDAR\r\n'
+
+def render_event(uid, start, duration_minutes, summary, description, status, stamp):
+    """Bloque VEVENT completo (stamp: updated_at en UTC, también usado como LAST-MODIFIED)"""
+    lines = [
+        'BEGIN:VEVENT',
+        f'UID:{uid}',
+        f'DTSTAMP:{_utc(stamp)}',
+        f'LAST-MODIFIED:{_utc(stamp)}',
+        f'DTSTART:{_local(start)}',
+        f'DTEND:{_local(start + timedelta(minutes=duration_minutes or 0))}',
+        f'SUMMARY:{escape_text(summary)}',
+        f'STATUS:{EVENT_STATUS.get(status, "CONFIRMED")}'
+    ]
+    if description:
+        lines.append(f'DESCRIPTION:{escape_text(description)}')
+    lines.append('END:VEVENT')
+    return ''.join(fold(line) for line in lines)
@@ -0,0 +1,103 @@
+import json
+import logging
+import smtplib
+import urllib.request
+from email.message import EmailMessage
+
+logger = logging.getLogger(__name__)
+
+# Destinos de los recordatorios (y de las ofertas de lista de espera, kind='waitlist_offer').
+# Todos reciben lotes (lista de dicts) y lanzan una excepción si el envío falla, para que
+# el programador reintente el lote.
+
+class LogNotifier:
+    """Escribe cada recordatorio como una línea JSON (archivo local o log): para pruebas"""
+
+    def __init__(self, path=None):
+        self.path = path
+
+    def send_batch(self, reminders):
+        if not self.path:
+            for reminder in reminders:
+                logger.info('Recordatorio: %s', json.dumps(reminder, ensure_ascii=False))
+            return
+        with open(self.path, 'a', encoding='utf-8') as f:
+            for reminder in reminders:
+                f.write(json.dumps(reminder, ensure_ascii=False) + '\n')
+
+class SMTPNotifier:
+    """Envía un correo por recordatorio reutilizando una sola conexión SMTP por lote"""
+
+    def __init__(self, host, port=587, username=None, password=None, sender=None, use_tls=True):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.sender = sender or username
+        self.use_tls = use_tls
+
+    def _message(self, reminder):
+        message = EmailMessage()
+        message['From'] = self.sender
+        message['To'] = reminder['patient_email']
+        if reminder.get('kind') == 'waitlist_offer':
+            message['Subject'] = f"Hora disponible: {reminder['appointment_date'][:16].replace('T', ' ')}"
+            message.set_content(
+                f"Hola {reminder['patient_name']},\n\n"
+                f"Se liberó una hora de {reminder['appointment_type']} con {reminder['doctor_name']} "
+                f"el {reminder['appointment_date'][:10]} a las {reminder['appointment_date'][11:16]}. "
+                f"La reservamos para usted hasta las {reminder['offer_expires_at'][11:16]}; contáctenos para confirmarla.\n"
+            )
+            return message
+        message['Subject'] = f"Recordatorio de cita: {reminder['appointment_date'][:16].replace('T', ' ')}"
+        message.set_content(
+            f"Hola {reminder['patient_name']},\n\n"
+            f"Le recordamos su cita de {reminder['appointment_type']} con {reminder['doctor_name']} "
+            f"el {reminder['appointment_date'][:10]} a las {reminder['appointment_date'][11:16]}.\n"
+        )
+        return message
+
+    def send_batch(self, reminders):
+        recipients = [reminder for reminder in reminders if reminder.get('patient_email')]
+        if not recipients:
+            return
+        with smtplib.SMTP(self.host, self.port, timeout=30) as smtp:
+            if self.use_tls:
+                smtp.starttls()
+            if self.username:
+                smtp.login(self.username, self.password)
+            for reminder in recipients:
+                smtp.send_message(self._message(reminder))
+
+class WebhookNotifier:
+    """Publica el lote completo como JSON en una URL (p. ej. un servicio de SMS o WhatsApp)"""
+
+    def __init__(self, url, token=None, timeout=10):
+        self.url = url
+        self.token = token
+        self.timeout = timeout
+
+    def send_batch(self, reminders):
+        headers = {'Content-Type': 'application/json'}
+        if self.token:
+            headers['Authorization'] = f'Bearer {self.token}'
+        request = urllib.request.Request(
+            self.url, data=json.dumps({'reminders': reminders}).encode('utf-8'), headers=headers, method='POST'
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            if response.status >= 300:
+                raise RuntimeError(f'El webhook respondió {response.status}')
+
+def build_notifier(config):
+    """Crea el notificador según REMINDER_NOTIFIER (log | smtp | webhook)"""
+    kind = config.get('REMINDER_NOTIFIER', 'log')
+    if kind == 'log':
+        return LogNotifier(config.get('REMINDER_LOG_PATH'))
+    if kind == 'smtp':
+        return SMTPNotifier(
+            config['SMTP_HOST'], int(config.get('SMTP_PORT') or 587),
+            config.get('SMTP_USERNAME'), config.get('SMTP_PASSWORD'), config.get('SMTP_SENDER')
+        )
+    if kind == 'webhook':
+        return WebhookNotifier(config['REMINDER_WEBHOOK_URL'], config.get('REMINDER_WEBHOOK_TOKEN'))
+    raise ValueError(f'REMINDER_NOTIFIER inválido: {kind}')
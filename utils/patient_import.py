@@ -0,0 +1,159 @@
+import csv
+import json
+from collections import Counter
+from datetime import datetime
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from models import db, Patient, PatientRollup
+from utils.rut import normalize_rut
+
+CHUNK_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000          # El reporte detalla como máximo esta cantidad de filas con error
+
+DATE_FORMATS = ('%Y-%m-%d', '%d-%m-%Y', '%d/%m/%Y')
+GENDERS = {
+    'male': 'male', 'm': 'male', 'masculino': 'male', 'hombre': 'male',
+    'female': 'female', 'f': 'female', 'femenino': 'female', 'mujer': 'female',
+    'other': 'other', 'otro': 'other'
+}
+OPTIONAL_FIELDS = ('address', 'phone', 'email', 'emergency_contact', 'emergency_phone',
+                   'blood_type', 'allergies', 'chronic_diseases')
+
+def iter_rows(stream, fmt):
+    """Recorre un archivo de texto CSV (con encabezados) o NDJSON, fila a fila: (número de línea, dict)"""
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+    elif fmt == 'ndjson':
+        for line_number, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError as e:
+                yield line_number, {'__error__': f'JSON inválido: {e.msg}'}
+                continue
+            if not isinstance(row, dict):
+                yield line_number, {'__error__': 'Cada línea debe ser un objeto JSON'}
+                continue
+            yield line_number, row
+    else:
+        raise ValueError(f'Formato no soportado: {fmt}')
+
+def parse_date(value):
+    value = str(value or '').strip()
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, date_format).date()
+        except ValueError:
+            continue
+    raise ValueError(f'Fecha de nacimiento inválida: {value}')
+
+def normalize_patient(row):
+    """Valida y normaliza una fila; devuelve el dict de columnas o lanza ValueError"""
+    if not isinstance(row, dict):
+        raise ValueError('La fila debe ser un objeto con los campos del paciente')
+    if '__error__' in row:
+        raise ValueError(row['__error__'])
+    if not str(row.get('full_name') or '').strip():
+        raise ValueError('El nombre completo es obligatorio')
+    gender = GENDERS.get(str(row.get('gender') or '').strip().lower())
+    if not gender:
+        raise ValueError(f'Género inválido: {row.get("gender")}')
+
+    patient = {
+        'rut': normalize_rut(row.get('rut')),
+        'full_name': str(row['full_name']).strip(),
+        'birth_date': parse_date(row.get('birth_date')),
+        'gender': gender
+    }
+    for field in OPTIONAL_FIELDS:
+        value = row.get(field)
+        patient[field] = str(value).strip() or None if value is not None else None
+    return patient
+
+def _new_report():
+    return {'processed': 0, 'inserted': 0, 'duplicates': 0, 'error_count': 0, 'errors': []}
+
+def _merge_report(report, partial):
+    for key in ('processed', 'inserted', 'duplicates'):
+        report[key] += partial[key]
+    for error in partial['errors']:
+        _add_error(report, error['row'], error['rut'], error['error'])
+    report['error_count'] += partial['error_count'] - len(partial['errors'])
+
+def _insert_chunk(chunk):
+    """
+    Deduplica el lote contra la base con un solo IN e inserta el resto con executemany.
+    Devuelve el reporte parcial del lote, que solo se suma al total tras el commit.
+    """
+    report = _new_report()
+    ruts = [patient['rut'] for _, patient in chunk]
+    existing = {rut for (rut,) in db.session.query(Patient.rut).filter(Patient.rut.in_(ruts))}
+
+    now = datetime.utcnow()
+    rows = []
+    for line_number, patient in chunk:
+        if patient['rut'] in existing:
+            report['duplicates'] += 1
+            _add_error(report, line_number, patient['rut'], 'El RUT ya está registrado')
+            continue
+        rows.append({**patient, 'created_at': now, 'updated_at': now})
+
+    if rows:
+        db.session.execute(insert(Patient), rows)
+        # El INSERT masivo no dispara los eventos del mapper: el cubo se ajusta por lote
+        PatientRollup.apply(db.session.connection(), Counter(
+            PatientRollup.cell(row['birth_date'], row['gender'], row['blood_type'], row['created_at']) for row in rows
+        ))
+    db.session.commit()
+    report['inserted'] += len(rows)
+    return report
+
+def _add_error(report, line_number, rut, message):
+    report['error_count'] += 1
+    if len(report['errors']) < MAX_REPORTED_ERRORS:
+        report['errors'].append({'row': line_number, 'rut': rut, 'error': message})
+
+def import_patients(rows, chunk_size=CHUNK_SIZE, progress=None):
+    """
+    Importa pacientes desde un iterable de (número de línea, dict) en lotes.
+    Devuelve un reporte con insertados, duplicados y errores por fila.
+    """
+    report = _new_report()
+    chunk = []
+    seen = set()                                # RUTs ya vistos en el archivo
+
+    def flush():
+        try:
+            partial = _insert_chunk(chunk)
+        except IntegrityError:
+            # Otro proceso insertó alguno de los RUTs entre la consulta y el insert: se reintenta una vez
+            db.session.rollback()
+            partial = _insert_chunk(chunk)
+        _merge_report(report, partial)
+        chunk.clear()
+        if progress:
+            progress(**{key: value for key, value in report.items() if key != 'errors'})
+
+    for line_number, row in rows:
+        report['processed'] += 1
+        try:
+            patient = normalize_patient(row)
+        except ValueError as e:
+            _add_error(report, line_number, row.get('rut') if isinstance(row, dict) else None, str(e))
+            continue
+        if patient['rut'] in seen:
+            report['duplicates'] += 1
+            _add_error(report, line_number, patient['rut'], 'RUT repetido en el archivo')
+            continue
+        seen.add(patient['rut'])
+        chunk.append((line_number, patient))
+        if len(chunk) >= chunk_size:
+            flush()
+
+    if chunk:
+        flush()
+    report['errors'].sort(key=lambda error: error['row'])
+    return report
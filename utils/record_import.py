@@ -0,0 +1,145 @@
+from datetime import datetime
+from sqlalchemy import insert, func
+from models import db, Patient, User, ClinicalRecord
+from utils.rut import normalize_rut
+from utils.vitals import parse_blood_pressure
+
+CHUNK_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000          # El reporte detalla como máximo esta cantidad de filas con error
+
+TEXT_FIELDS = ('symptoms', 'treatment', 'prescriptions', 'blood_pressure')
+
+def compute_bmi(weights, heights):
+    """IMC de un lote completo (peso en kg, altura en cm); None donde falta un dato o la altura es 0"""
+    return [
+        round(weight / ((height / 100) ** 2), 1) if weight and height else None
+        for weight, height in zip(weights, heights)
+    ]
+
+class ReferenceResolver:
+    """
+    Resuelve RUT -> id de paciente y email -> snapshot del médico con una consulta IN por lote.
+    Los resultados (también los inexistentes) quedan en memoria durante toda la importación.
+    """
+
+    def __init__(self):
+        self.patients = {}
+        self.doctors = {}
+
+    def load(self, ruts, emails):
+        missing_ruts = [rut for rut in set(ruts) if rut not in self.patients]
+        if missing_ruts:
+            self.patients.update(dict.fromkeys(missing_ruts))
+            found = db.session.query(Patient.id, Patient.rut).filter(Patient.rut.in_(missing_ruts))
+            self.patients.update({rut: patient_id for patient_id, rut in found})
+
+        missing_emails = [email for email in set(emails) if email not in self.doctors]
+        if missing_emails:
+            self.doctors.update(dict.fromkeys(missing_emails))
+            found = User.query.filter(func.lower(User.mail).in_(missing_emails), User.role.in_(['medico', 'administrador']))
+            self.doctors.update({user.mail.lower(): ClinicalRecord.doctor_snapshot(user) for user in found})
+
+def _optional_number(row, field, cast):
+    value = row.get(field)
+    if value is None or value == '':
+        return None
+    try:
+        return cast(value)
+    except (TypeError, ValueError):
+        raise ValueError(f'Valor inválido para {field}: {value}')
+
+def normalize_record(row):
+    """Valida una fila y devuelve (rut, email, columnas clínicas) o lanza ValueError"""
+    if '__error__' in row:
+        raise ValueError(row['__error__'])
+    for field in ('patient_rut', 'doctor_email', 'visit_date', 'reason_visit', 'diagnosis'):
+        if not row.get(field):
+            raise ValueError(f'El campo {field} es obligatorio')
+
+    try:
+        visit_date = datetime.fromisoformat(str(row['visit_date']))
+        next_appointment = datetime.fromisoformat(str(row['next_appointment'])) if row.get('next_appointment') else None
+    except ValueError:
+        raise ValueError('Fecha con formato inválido (use ISO 8601)')
+
+    record = {
+        'visit_date': visit_date,
+        'reason_visit': row['reason_visit'],
+        'diagnosis': row['diagnosis'],
+        'notes': row.get('notes') or row.get('observations'),
+        'heart_rate': _optional_number(row, 'heart_rate', int),
+        'temperature': _optional_number(row, 'temperature', float),
+        'weight': _optional_number(row, 'weight', float),
+        'height': _optional_number(row, 'height', float),
+        'next_appointment': next_appointment
+    }
+    for field in TEXT_FIELDS:
+        record[field] = row.get(field) or None
+    record['systolic_bp'], record['diastolic_bp'] = parse_blood_pressure(record['blood_pressure'])
+    return normalize_rut(row['patient_rut']), str(row['doctor_email']).strip().lower(), record
+
+def _add_error(report, line_number, message):
+    report['error_count'] += 1
+    if len(report['errors']) < MAX_REPORTED_ERRORS:
+        report['errors'].append({'row': line_number, 'error': message})
+
+def _insert_chunk(chunk, resolver, report):
+    """Resuelve referencias, calcula el IMC del lote e inserta las fichas con un solo executemany"""
+    resolver.load([rut for _, rut, _, _ in chunk], [email for _, _, email, _ in chunk])
+
+    bmis = compute_bmi([record['weight'] for _, _, _, record in chunk], [record['height'] for _, _, _, record in chunk])
+    now = datetime.utcnow()
+    rows = []
+    for (line_number, rut, email, record), bmi in zip(chunk, bmis):
+        patient_id = resolver.patients.get(rut)
+        doctor = resolver.doctors.get(email)
+        if patient_id is None:
+            _add_error(report, line_number, f'No existe un paciente con RUT {rut}')
+            continue
+        if doctor is None:
+            _add_error(report, line_number, f'No existe un médico con email {email}')
+            continue
+        rows.append({**record, **doctor, 'patient_id': patient_id, 'bmi': bmi, 'created_at': now, 'updated_at': now})
+
+    if rows:
+        db.session.execute(insert(ClinicalRecord), rows)
+    db.session.commit()
+    report['inserted'] += len(rows)
+
+def import_records(rows, chunk_size=CHUNK_SIZE, resume_from=0, progress=None):
+    """
+    Ingesta fichas clínicas desde un iterable de (número de línea, dict) en lotes.
+    Las líneas hasta resume_from (inclusive) se saltan: son las de un checkpoint anterior.
+    Tras cada lote confirmado, report['checkpoint'] es la última línea persistida y se
+    notifica a progress(report) para que el llamador la guarde.
+    """
+    report = {'processed': 0, 'inserted': 0, 'error_count': 0, 'errors': [], 'checkpoint': resume_from}
+    resolver = ReferenceResolver()
+    chunk = []
+
+    def flush(last_line):
+        _insert_chunk(chunk, resolver, report)
+        chunk.clear()
+        report['checkpoint'] = last_line
+        if progress:
+            progress(report)
+
+    last_line = resume_from
+    for line_number, row in rows:
+        if line_number <= resume_from:
+            continue
+        last_line = line_number
+        report['processed'] += 1
+        try:
+            rut, email, record = normalize_record(row)
+        except ValueError as e:
+            _add_error(report, line_number, str(e))
+            continue
+        chunk.append((line_number, rut, email, record))
+        if len(chunk) >= chunk_size:
+            flush(line_number)
+
+    if chunk or last_line != report['checkpoint']:
+        flush(last_line)
+    report['errors'].sort(key=lambda error: error['row'])
+    return report
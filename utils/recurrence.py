@@ -0,0 +1,138 @@
+from datetime import datetime, timedelta
+
+# Subconjunto de RRULE (RFC 5545) para series de citas:
+#   FREQ=DAILY|WEEKLY|MONTHLY;INTERVAL=n;BYDAY=MO,WE,FR (solo WEEKLY);COUNT=n;UNTIL=20250630T235959
+# Las ocurrencias se generan de forma perezosa y solo para la ventana consultada.
+
+FREQUENCIES = ('DAILY', 'WEEKLY', 'MONTHLY')
+WEEKDAYS = ('MO', 'TU', 'WE', 'TH', 'FR', 'SA', 'SU')
+
+def _parse_until(value):
+    for date_format in ('%Y%m%dT%H%M%S', '%Y%m%d'):
+        try:
+            return datetime.strptime(value.rstrip('Z'), date_format)
+        except ValueError:
+            continue
+    return datetime.fromisoformat(value)
+
+def parse_rrule(text):
+    """'FREQ=WEEKLY;BYDAY=MO,TH;COUNT=24' -> dict validado. Lanza ValueError si no es soportada."""
+    parts = {}
+    for item in (text or '').upper().replace('RRULE:', '').split(';'):
+        if not item.strip():
+            continue
+        if '=' not in item:
+            raise ValueError(f'Regla de recurrencia inválida: {item}')
+        key, value = item.split('=', 1)
+        parts[key.strip()] = value.strip()
+
+    freq = parts.pop('FREQ', None)
+    if freq not in FREQUENCIES:
+        raise ValueError(f'FREQ debe ser una de: {", ".join(FREQUENCIES)}')
+    rule = {'freq': freq, 'interval': int(parts.pop('INTERVAL', 1)), 'byday': None, 'count': None, 'until': None}
+    if rule['interval'] < 1:
+        raise ValueError('INTERVAL debe ser mayor que 0')
+
+    if 'BYDAY' in parts:
+        if freq != 'WEEKLY':
+            raise ValueError('BYDAY solo se admite con FREQ=WEEKLY')
+        days = parts.pop('BYDAY').split(',')
+        unknown = [day for day in days if day not in WEEKDAYS]
+        if unknown:
+            raise ValueError(f'Días inválidos en BYDAY: {", ".join(unknown)}')
+        rule['byday'] = sorted({WEEKDAYS.index(day) for day in days})
+    if 'COUNT' in parts:
+        rule['count'] = int(parts.pop('COUNT'))
+        if rule['count'] < 1:
+            raise ValueError('COUNT debe ser mayor que 0')
+    if 'UNTIL' in parts:
+        rule['until'] = _parse_until(parts.pop('UNTIL'))
+    if rule['count'] and rule['until']:
+        raise ValueError('COUNT y UNTIL no se pueden usar juntos')
+    if parts:
+        raise ValueError(f'Partes de RRULE no soportadas: {", ".join(parts)}')
+    return rule
+
+def format_rrule(rule):
+    """Inverso de parse_rrule"""
+    parts = [f"FREQ={rule['freq']}"]
+    if rule['interval'] != 1:
+        parts.append(f"INTERVAL={rule['interval']}")
+    if rule['byday']:
+        parts.append('BYDAY=' + ','.join(WEEKDAYS[day] for day in rule['byday']))
+    if rule['count']:
+        parts.append(f"COUNT={rule['count']}")
+    if rule['until']:
+        parts.append(f"UNTIL={rule['until'].strftime('%Y%m%dT%H%M%S')}")
+    return ';'.join(parts)
+
+def _add_months(value, months):
+    """Mismo día en el mes destino, o None si ese mes no lo tiene (31 de abril)"""
+    month_index = value.month - 1 + months
+    try:
+        return value.replace(year=value.year + month_index // 12, month=month_index % 12 + 1)
+    except ValueError:
+        return None
+
+def _periods(rule, dtstart, first_period):
+    """Candidatas en orden desde el período first_period (días, semanas o meses según FREQ)"""
+    period = first_period
+    interval = rule['interval']
+    if rule['freq'] == 'WEEKLY':
+        byday = rule['byday'] or [dtstart.weekday()]
+        week0 = dtstart - timedelta(days=dtstart.weekday())
+    while True:
+        if rule['freq'] == 'DAILY':
+            yield dtstart + timedelta(days=period * interval)
+        elif rule['freq'] == 'WEEKLY':
+            week = week0 + timedelta(weeks=period * interval)
+            for day in byday:
+                candidate = week + timedelta(days=day)
+                if candidate >= dtstart:
+                    yield candidate
+        else:
+            candidate = _add_months(dtstart, period * interval)
+            if candidate is not None:
+                yield candidate
+        period += 1
+
+def _first_period(rule, dtstart, start):
+    """Primer período que puede contener ocurrencias >= start (salto directo, sin recorrer)"""
+    if start is None or start <= dtstart or rule['count']:
+        return 0                                    # Con COUNT hay que contar desde el inicio
+    if rule['freq'] == 'DAILY':
+        return (start - dtstart).days // rule['interval']
+    if rule['freq'] == 'WEEKLY':
+        week0 = dtstart - timedelta(days=dtstart.weekday())
+        return (start - week0).days // (7 * rule['interval'])
+    months = (start.year - dtstart.year) * 12 + start.month - dtstart.month
+    return max(0, months // rule['interval'] - 1)
+
+def occurrences(rule, dtstart, start=None, end=None, exdates=()):
+    """
+    Ocurrencias de la regla en [start, end), en orden. Las fechas de exdates se omiten
+    (pero cuentan para COUNT, como en RFC 5545). Sin end, la regla debe terminar (COUNT/UNTIL).
+    """
+    if end is None and not rule['count'] and not rule['until']:
+        raise ValueError('Una serie sin COUNT ni UNTIL requiere una ventana con fin')
+    excluded = set(exdates)
+    produced = 0
+    for candidate in _periods(rule, dtstart, _first_period(rule, dtstart, start)):
+        if rule['until'] and candidate > rule['until']:
+            return
+        if end is not None and candidate >= end:
+            return
+        produced += 1
+        if rule['count'] and produced > rule['count']:
+            return
+        if (start is None or candidate >= start) and candidate not in excluded:
+            yield candidate
+
+def last_occurrence(rule, dtstart, exdates=()):
+    """Última ocurrencia de una serie finita (None si es infinita o no tiene ocurrencias)"""
+    if not rule['count'] and not rule['until']:
+        return None
+    last = None
+    for last in occurrences(rule, dtstart, exdates=exdates):
+        pass
+    return last
@@ -0,0 +1,212 @@
+import heapq
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import select
+from models import db, Appointment, Patient, ReminderClaim
+
+logger = logging.getLogger(__name__)
+
+# Programador de recordatorios: solo las citas de la próxima ventana viven en un min-heap
+# ordenado por hora de envío. La ventana avanza por tramos y los cambios llegan por eventos,
+# así que la base de datos casi no se consulta.
+
+REMINDER_OFFSETS = {'24h': timedelta(hours=24), '2h': timedelta(hours=2)}
+ACTIVE_STATUSES = ('pendiente', 'confirmada')
+REFILL_INTERVAL = timedelta(minutes=30)     # Cada cuánto se agrega el siguiente tramo de citas a la ventana
+RESYNC_INTERVAL = timedelta(hours=6)        # Recarga completa de la ventana por si se perdió algún evento
+BATCH_WINDOW = timedelta(seconds=30)        # Recordatorios que vencen dentro de este margen salen en el mismo lote
+BATCH_SIZE = 200
+LATE_TOLERANCE = timedelta(hours=1)         # Un recordatorio atrasado (p. ej. tras un reinicio) se envía igual dentro de este margen
+MAX_ATTEMPTS = 3
+RETRY_BACKOFF = 2                           # Segundos antes del primer reintento (se duplica en cada intento)
+FAILED_RETRY = timedelta(minutes=5)         # Un lote que agotó los reintentos vuelve al heap tras este tiempo
+
+class ReminderScheduler:
+    def __init__(self, app, notifier):
+        self.app = app
+        self.notifier = notifier
+        self._heap = []                     # (hora_envío, id_cita, tipo, versión)
+        self._versions = {}                 # id_cita -> versión vigente; entradas antiguas se ignoran al salir
+        self._condition = threading.Condition()
+        self._window_end = None
+        self._last_resync = None
+        self.metrics = {'scheduled': 0, 'sent': 0, 'failed': 0, 'batches': 0, 'skipped': 0}
+
+    # --- Ventana ---
+
+    def _horizon(self, now):
+        return now + max(REMINDER_OFFSETS.values()) + REFILL_INTERVAL
+
+    def _schedule(self, appointment_id, appointment_date, now):
+        """Reemplaza los recordatorios pendientes de la cita (invalida la versión anterior)"""
+        version = self._versions.get(appointment_id, 0) + 1
+        self._versions[appointment_id] = version
+        for kind, offset in REMINDER_OFFSETS.items():
+            fire_at = appointment_date - offset
+            if fire_at >= now - LATE_TOLERANCE and appointment_date > now:
+                heapq.heappush(self._heap, (fire_at, appointment_id, kind, version))
+                self.metrics['scheduled'] += 1
+
+    def _load(self, start, end, now):
+        """Agrega a la ventana las citas activas con fecha en (start, end]: una consulta indexada"""
+        rows = db.session.execute(
+            select(Appointment.id, Appointment.appointment_date).where(
+                Appointment.status.in_(ACTIVE_STATUSES),
+                Appointment.appointment_date > start,
+                Appointment.appointment_date <= end
+            )
+        ).all()
+        with self._condition:
+            for appointment_id, appointment_date in rows:
+                self._schedule(appointment_id, appointment_date, now)
+            self._condition.notify()
+        return len(rows)
+
+    def refill(self, now=None):
+        now = now or datetime.now()
+        if self._last_resync is None or now - self._last_resync >= RESYNC_INTERVAL:
+            with self._condition:
+                self._heap.clear()
+                self._versions.clear()
+            self._window_end = now
+            self._last_resync = now
+            ReminderClaim.purge(now)
+            db.session.commit()
+        horizon = self._horizon(now)
+        if horizon > self._window_end:
+            loaded = self._load(self._window_end, horizon, now)
+            logger.debug('Ventana de recordatorios extendida hasta %s (%s citas)', horizon, loaded)
+            self._window_end = horizon
+
+    # --- Cambios incrementales (handler del broker de eventos) ---
+
+    def handle_event(self, evt):
+        if not evt['type'].startswith('appointment.') or not evt.get('id'):
+            return
+        now = datetime.now()
+        with self._condition:
+            self._versions[evt['id']] = self._versions.get(evt['id'], 0) + 1         # Descarta lo programado
+            if evt['type'] in ('appointment.deleted', 'appointment.cancelled') or evt.get('status') not in ACTIVE_STATUSES:
+                return
+            appointment_date = datetime.fromisoformat(evt['appointment_date'])
+            if self._window_end and now < appointment_date <= self._window_end:
+                self._schedule(evt['id'], appointment_date, now)
+                self._condition.notify()
+
+    # --- Envío ---
+
+    def _pop_due(self, now):
+        """Saca del heap los recordatorios vigentes que vencen antes de now + BATCH_WINDOW"""
+        due = []
+        limit = now + BATCH_WINDOW
+        while self._heap and self._heap[0][0] <= limit and len(due) < BATCH_SIZE:
+            fire_at, appointment_id, kind, version = heapq.heappop(self._heap)
+            if self._versions.get(appointment_id) == version:
+                due.append((appointment_id, kind))
+        return due
+
+    def _build_reminders(self, due):
+        """Datos de contacto de todo el lote con una sola consulta"""
+        rows = db.session.execute(
+            select(
+                Appointment.id, Appointment.appointment_date, Appointment.appointment_type, Appointment.status,
+                Appointment.doctor_name, Patient.full_name, Patient.email, Patient.phone
+            ).join(Patient, Patient.id == Appointment.patient_id).where(Appointment.id.in_({appointment_id for appointment_id, _ in due}))
+        ).all()
+        by_id = {row.id: row for row in rows}
+
+        candidates = []
+        for appointment_id, kind in due:
+            row = by_id.get(appointment_id)
+            if row is None or row.status not in ACTIVE_STATUSES:
+                self.metrics['skipped'] += 1
+                continue
+            candidates.append((appointment_id, kind, row))
+
+        # Marca en la base de datos (clave única): nunca se envía dos veces el mismo recordatorio,
+        # ni entre reinicios ni entre ejecuciones con --once
+        claimed = ReminderClaim.claim([(appointment_id, kind, row.appointment_date) for appointment_id, kind, row in candidates])
+        db.session.commit()
+
+        reminders = []
+        for appointment_id, kind, row in candidates:
+            if (appointment_id, kind, row.appointment_date) not in claimed:
+                self.metrics['skipped'] += 1
+                continue
+            reminders.append({
+                'appointment_id': appointment_id,
+                'kind': kind,
+                'appointment_date': row.appointment_date.isoformat(),
+                'appointment_type': row.appointment_type,
+                'doctor_name': row.doctor_name,
+                'patient_name': row.full_name,
+                'patient_email': row.email,
+                'patient_phone': row.phone
+            })
+        return reminders
+
+    def _send(self, reminders):
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            try:
+                self.notifier.send_batch(reminders)
+                self.metrics['sent'] += len(reminders)
+                self.metrics['batches'] += 1
+                return True
+            except Exception:
+                logger.exception('Error enviando lote de %s recordatorios (intento %s/%s)', len(reminders), attempt, MAX_ATTEMPTS)
+                if attempt < MAX_ATTEMPTS:
+                    time.sleep(RETRY_BACKOFF * 2 ** (attempt - 1))
+        self.metrics['failed'] += len(reminders)
+        return False
+
+    def _release(self, reminders, now):
+        """Un lote que agotó los reintentos libera sus marcas y vuelve al heap para reintentarse más tarde"""
+        ReminderClaim.release([
+            (reminder['appointment_id'], reminder['kind'], datetime.fromisoformat(reminder['appointment_date']))
+            for reminder in reminders
+        ])
+        db.session.commit()
+        with self._condition:
+            for reminder in reminders:
+                version = self._versions.setdefault(reminder['appointment_id'], 1)
+                heapq.heappush(self._heap, (now + FAILED_RETRY, reminder['appointment_id'], reminder['kind'], version))
+
+    def run_once(self, now=None):
+        """Extiende la ventana si corresponde y envía los recordatorios vencidos; devuelve cuántos envió"""
+        now = now or datetime.now()
+        with self.app.app_context():
+            self.refill(now)
+            sent = 0
+            while True:
+                with self._condition:
+                    due = self._pop_due(now)
+                if not due:
+                    break
+                reminders = self._build_reminders(due)
+                if reminders:
+                    if self._send(reminders):
+                        sent += len(reminders)
+                    else:
+                        self._release(reminders, now)
+            db.session.remove()
+        return sent
+
+    def next_wakeup(self, now):
+        """Segundos hasta el próximo recordatorio o el próximo tramo de la ventana"""
+        with self._condition:
+            next_fire = self._heap[0][0] if self._heap else None
+        next_refill = self._window_end - max(REMINDER_OFFSETS.values()) - REFILL_INTERVAL / 2 if self._window_end else now
+        target = min(next_fire, next_refill) if next_fire else next_refill
+        return max(1.0, (target - now).total_seconds())
+
+    def run_forever(self):
+        while True:
+            try:
+                self.run_once()
+            except Exception:
+                logger.exception('Error en el programador de recordatorios')
+            with self._condition:
+                # Un evento que programa algo más próximo despierta el ciclo antes de tiempo
+                self._condition.wait(timeout=min(self.next_wakeup(datetime.now()), REFILL_INTERVAL.total_seconds()))
@@ -0,0 +1,26 @@
+def rut_check_digit(body):
+    """Dígito verificador de un RUT (módulo 11)"""
+    total = 0
+    factor = 2
+    for digit in reversed(body):
+        total += int(digit) * factor
+        factor = 2 if factor == 7 else factor + 1
+    remainder = 11 - (total % 11)
+    return {11: '0', 10: 'K'}.get(remainder, str(remainder))
+
+def normalize_rut(raw):
+    """
+    Normaliza un RUT al formato 12345678-9 (sin puntos, K mayúscula).
+    Lanza ValueError si el formato o el dígito verificador no son válidos.
+    """
+    value = str(raw or '').strip().upper().replace('.', '').replace(' ', '')
+    if '-' in value:
+        body, _, check = value.rpartition('-')
+    else:
+        body, check = value[:-1], value[-1:]
+    if not body.isdigit() or len(body) > 9 or len(check) != 1:
+        raise ValueError(f'RUT con formato inválido: {raw}')
+    body = body.lstrip('0') or '0'
+    if rut_check_digit(body) != check:
+        raise ValueError(f'Dígito verificador inválido: {raw}')
+    return f'{body}-{check}'
@@ -0,0 +1,203 @@
+import bisect
+import logging
+from datetime import datetime, timedelta
+from sqlalchemy import select, or_
+from models import db, Appointment, AppointmentSeries, Patient
+from utils.waitlist import held_offers
+
+logger = logging.getLogger(__name__)
+
+# Series de citas recurrentes: expansión perezosa por ventana, materialización dentro de un
+# horizonte móvil y verificación de conflictos de la serie completa contra la agenda del médico.
+
+MATERIALIZE_DAYS = 28               # Las ocurrencias de las próximas 4 semanas existen como filas en appointment
+CONFLICT_HORIZON_DAYS = 366         # Las series sin fin se verifican contra el primer año
+ACTIVE_STATUSES = ('pendiente', 'confirmada')
+MAX_DURATION = timedelta(days=1)    # Ninguna cita dura más de un día (acota la búsqueda de solapes)
+
+def series_in_window(start, end, doctor_id=None, patient_id=None, exclude_series_id=None):
+    """Series activas con ocurrencias posibles en [start, end): una consulta por el índice (médico, dtstart, until)"""
+    conditions = [
+        AppointmentSeries.status == 'activa',
+        AppointmentSeries.dtstart < end,
+        or_(AppointmentSeries.until.is_(None), AppointmentSeries.until >= start)
+    ]
+    if doctor_id is not None:
+        conditions.append(AppointmentSeries.doctor_id_snapshot == doctor_id)
+    if patient_id is not None:
+        conditions.append(AppointmentSeries.patient_id == patient_id)
+    if exclude_series_id is not None:
+        conditions.append(AppointmentSeries.id != exclude_series_id)
+    return AppointmentSeries.query.filter(*conditions).all()
+
+def _materialized_dates(series_ids, start, end):
+    """{(serie, fecha original)} de las ocurrencias que ya tienen fila en la ventana"""
+    if not series_ids:
+        return set()
+    return set(db.session.execute(
+        select(Appointment.series_id, Appointment.original_date).where(
+            Appointment.series_id.in_(series_ids),
+            Appointment.original_date >= start,
+            Appointment.original_date < end
+        )
+    ).tuples())
+
+def virtual_occurrences(series_list, start, end):
+    """
+    (serie, fecha) de las ocurrencias sin fila en [start, end), en orden de fecha.
+    Antes de materialized_until toda ocurrencia vigente ya tiene su fila (o se eliminó a propósito).
+    """
+    materialized = _materialized_dates([series.id for series in series_list], start, end)
+    result = []
+    for series in series_list:
+        for occurrence_date in series.occurrences(max(start, series.materialized_until), end):
+            if (series.id, occurrence_date) not in materialized:
+                result.append((series, occurrence_date))
+    result.sort(key=lambda item: item[1])
+    return result
+
+def virtual_appointments(start, end, doctor_id=None, patient_id=None):
+    """Ocurrencias virtuales de la ventana serializadas como citas (para agregarlas a los listados)"""
+    occurrences = virtual_occurrences(series_in_window(start, end, doctor_id, patient_id), start, end)
+    patient_ids = {series.patient_id for series, _ in occurrences}
+    names = dict(db.session.execute(
+        select(Patient.id, Patient.full_name).where(Patient.id.in_(patient_ids))
+    ).all()) if patient_ids else {}
+    return [series.virtual_occurrence(occurrence_date, names.get(series.patient_id)) for series, occurrence_date in occurrences]
+
+def _appointment_data(series, occurrence_date):
+    return {
+        'appointment_date': occurrence_date,
+        'duration_minutes': series.duration_minutes,
+        'appointment_type': series.appointment_type,
+        'reason': series.reason,
+        'observations': series.observations,
+        'series_id': series.id,
+        'original_date': occurrence_date
+    }
+
+def build_occurrence(series, occurrence_date):
+    """Fila de appointment para una ocurrencia (sin agregarla a la sesión)"""
+    return Appointment(
+        patient_id=series.patient_id,
+        doctor_name=series.doctor_name,
+        doctor_email=series.doctor_email,
+        doctor_role=series.doctor_role,
+        doctor_id_snapshot=series.doctor_id_snapshot,
+        created_by_name=series.created_by_name,
+        created_by_role=series.created_by_role,
+        status='pendiente',
+        **_appointment_data(series, occurrence_date)
+    )
+
+def materialize(series, horizon):
+    """Crea las filas de las ocurrencias en [materialized_until, horizon) que aún no existen; devuelve cuántas"""
+    if horizon <= series.materialized_until:
+        return 0
+    existing = _materialized_dates([series.id], series.materialized_until, horizon)
+    created = 0
+    for occurrence_date in series.occurrences(series.materialized_until, horizon):
+        if (series.id, occurrence_date) not in existing:
+            db.session.add(build_occurrence(series, occurrence_date))
+            created += 1
+    series.materialized_until = horizon
+    if series.until is not None and series.until < horizon:
+        series.status = 'finalizada'                        # Ya no quedan ocurrencias virtuales
+    return created
+
+def materialize_all(now=None):
+    """Avanza el horizonte de todas las series activas (una transacción por serie); devuelve las métricas"""
+    now = now or datetime.now()
+    horizon = (now + timedelta(days=MATERIALIZE_DAYS)).replace(hour=0, minute=0, second=0, microsecond=0)
+    pending = db.session.execute(
+        select(AppointmentSeries.id).where(
+            AppointmentSeries.status == 'activa',
+            AppointmentSeries.materialized_until < horizon
+        )
+    ).scalars().all()
+
+    metrics = {'series': 0, 'created': 0, 'horizon': horizon.isoformat()}
+    for series_id in pending:
+        try:
+            series = db.session.get(AppointmentSeries, series_id)
+            metrics['created'] += materialize(series, horizon)
+            db.session.commit()
+            metrics['series'] += 1
+        except Exception:
+            db.session.rollback()
+            logger.exception('Error materializando la serie %s', series_id)
+    return metrics
+
+def series_slots(series, start=None, limit_days=CONFLICT_HORIZON_DAYS):
+    """(inicio, duración) de las ocurrencias de la serie desde start, hasta su fin o el horizonte de verificación"""
+    start = start or series.dtstart
+    return [(occurrence_date, series.duration_minutes) for occurrence_date in series.occurrences(start, start + timedelta(days=limit_days))]
+
+def find_conflicts(doctor_id, slots, exclude_series_id=None, exclude_appointment_id=None, include_rows=True,
+                   exclude_offer_id=None):
+    """
+    Verifica de una vez una lista de (inicio, duración) contra la agenda del médico:
+    una consulta para las citas activas de la ventana completa, la expansión de sus otras series,
+    las horas reservadas por ofertas vigentes de la lista de espera y una búsqueda binaria por
+    cada slot. Devuelve los conflictos encontrados.
+    """
+    if not slots:
+        return []
+    slots = sorted(slots)
+    window_start = slots[0][0] - MAX_DURATION
+    window_end = max(slot_start + timedelta(minutes=duration or 0) for slot_start, duration in slots)
+
+    busy = []                       # (inicio, fin, id_cita, id_serie, id_lista_espera)
+    if include_rows:
+        conditions = [
+            Appointment.doctor_id_snapshot == doctor_id,
+            Appointment.status.in_(ACTIVE_STATUSES),
+            Appointment.appointment_date >= window_start,
+            Appointment.appointment_date < window_end
+        ]
+        if exclude_series_id is not None:
+            conditions.append(or_(Appointment.series_id.is_(None), Appointment.series_id != exclude_series_id))
+        if exclude_appointment_id is not None:
+            conditions.append(Appointment.id != exclude_appointment_id)
+        rows = db.session.execute(
+            select(Appointment.id, Appointment.appointment_date, Appointment.duration_minutes, Appointment.series_id).where(*conditions)
+        ).all()
+        busy.extend((row.appointment_date, row.appointment_date + timedelta(minutes=row.duration_minutes or 0), row.id, row.series_id, None) for row in rows)
+
+    other_series = series_in_window(window_start, window_end, doctor_id=doctor_id, exclude_series_id=exclude_series_id)
+    busy.extend(
+        (occurrence_date, occurrence_date + timedelta(minutes=series.duration_minutes or 0), None, series.id, None)
+        for series, occurrence_date in virtual_occurrences(other_series, window_start, window_end)
+    )
+    busy.extend(
+        (entry.offered_date, entry.offered_date + timedelta(minutes=entry.offered_duration or 0), None, None, entry.id)
+        for entry in held_offers(doctor_id, window_start, window_end, exclude_entry_id=exclude_offer_id)
+    )
+    busy.sort(key=lambda item: item[0])
+    busy_starts = [item[0] for item in busy]
+
+    conflicts = []
+    for slot_start, duration in slots:
+        slot_end = slot_start + timedelta(minutes=duration or 0)
+        low = bisect.bisect_left(busy_starts, slot_start - MAX_DURATION)
+        high = bisect.bisect_left(busy_starts, slot_end)
+        for other_start, other_end, appointment_id, series_id, waitlist_id in busy[low:high]:
+            if other_end > slot_start:
+                conflicts.append({
+                    'appointment_date': slot_start.isoformat(),
+                    'conflicts_with': other_start.isoformat(),
+                    'appointment_id': appointment_id,
+                    'series_id': series_id,
+                    'waitlist_id': waitlist_id
+                })
+    return conflicts
+
+def conflict_message(conflict):
+    """Mensaje de error para un conflicto de find_conflicts"""
+    other = datetime.fromisoformat(conflict['conflicts_with'])
+    day, hour = other.strftime('%Y-%m-%d'), other.strftime('%H:%M')
+    if conflict.get('waitlist_id'):
+        return f'La hora del {day} a las {hour} está reservada para una oferta de la lista de espera'
+    if conflict.get('series_id') and not conflict.get('appointment_id'):
+        return f'El médico ya tiene una cita recurrente programada el {day} a las {hour}'
+    return f'El médico ya tiene una cita programada el {day} a las {hour}'
@@ -0,0 +1,68 @@
+from flask import request, make_response
+from functools import wraps
+from utils.cache import cache
+import threading
+
+_inflight = {}                      # key -> _Call en curso en este worker
+_inflight_lock = threading.Lock()
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.snapshot = None
+
+def _snapshot(response):
+    """Copia serializable de una respuesta para compartirla con otras peticiones"""
+    return {
+        'body': response.get_data(as_text=True),
+        'status': response.status_code,
+        'headers': [[name, value] for name, value in response.headers.items() if name.lower() != 'content-length']
+    }
+
+def _restore(snapshot):
+    return make_response(snapshot['body'], snapshot['status'], snapshot['headers'])
+
+def coalesce(key_func=None, cross_worker=False, share_ttl=1, wait_timeout=10):
+    """
+    Decorador para rutas de solo lectura: las peticiones idénticas concurrentes esperan
+    un único cálculo en curso y comparten su respuesta.
+    Uso:
+    @coalesce()
+    @coalesce(cross_worker=True)        # Además coordina entre workers mediante el lock de la caché
+    La clave por defecto es ruta + query string: solo para vistas que no dependen del usuario.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            key = key_func(*args, **kwargs) if key_func else f'{request.path}?{request.query_string.decode()}'
+
+            with _inflight_lock:
+                call = _inflight.get(key)
+                leader = call is None
+                if leader:
+                    call = _Call()
+                    _inflight[key] = call
+
+            if not leader:
+                if call.done.wait(wait_timeout) and call.snapshot is not None:
+                    return _restore(call.snapshot)
+                return func(*args, **kwargs)            # El cálculo en curso falló o tardó demasiado
+
+            try:
+                if cross_worker:
+                    # Un solo worker calcula; el resto espera el resultado en la caché compartida
+                    call.snapshot = cache.get_or_set(
+                        f'singleflight:{key}',
+                        lambda: _snapshot(make_response(func(*args, **kwargs))),
+                        ttl=share_ttl
+                    )
+                else:
+                    call.snapshot = _snapshot(make_response(func(*args, **kwargs)))
+                return _restore(call.snapshot)
+            finally:
+                with _inflight_lock:
+                    _inflight.pop(key, None)
+                call.done.set()
+
+        return wrapper
+    return decorator
@@ -0,0 +1,112 @@
+import logging
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import select, update, func
+from models import db, Appointment, WaitlistEntry
+from utils.cache import cache
+from utils.events import broker
+from utils.series import find_conflicts
+from utils.waitlist import release_offer, offer_freed_slot
+
+logger = logging.getLogger(__name__)
+
+# Citas activas cuya hora ya pasó: las confirmadas se dan por completadas y las que nunca
+# se confirmaron quedan como inasistencia
+SWEEP_TRANSITIONS = (('confirmada', 'completada'), ('pendiente', 'no_asistio'))
+SWEEP_GRACE = timedelta(hours=12)   # Margen para que recepción registre la atención manualmente
+SWEEP_BATCH_SIZE = 500              # Filas por UPDATE (cada lote es una transacción corta)
+LAST_RUN_KEY = 'sweeper:last_run'
+LAST_RUN_TTL = 7 * 24 * 3600
+REOFFER_BATCH_SIZE = 100            # Ofertas vencidas de la lista de espera reasignadas por barrido
+
+def sweep_stale_appointments(dry_run=False, batch_size=SWEEP_BATCH_SIZE, max_batches=None, now=None):
+    """
+    Cambia el estado de las citas activas vencidas con UPDATEs por lotes acotados,
+    recorriendo el índice (status, appointment_date). Con dry_run solo cuenta.
+    Devuelve las métricas de la ejecución.
+    """
+    started = time.monotonic()
+    now = now or datetime.now()
+    cutoff = now - SWEEP_GRACE
+    metrics = {
+        'started_at': now.isoformat(),
+        'cutoff': cutoff.isoformat(),
+        'dry_run': dry_run,
+        'transitions': {},
+        'batches': 0
+    }
+
+    for old_status, new_status in SWEEP_TRANSITIONS:
+        key = f'{old_status}->{new_status}'
+        stale = (Appointment.status == old_status, Appointment.appointment_date < cutoff)
+
+        if dry_run:
+            metrics['transitions'][key] = db.session.query(func.count(Appointment.id)).filter(*stale).scalar()
+            continue
+
+        updated = 0
+        while max_batches is None or metrics['batches'] < max_batches:
+            rows = db.session.execute(
+                select(Appointment.id, Appointment.appointment_date).where(*stale)
+                .order_by(Appointment.appointment_date).limit(batch_size)
+            ).all()
+            if not rows:
+                break
+            # Se repite la condición de estado por si la cita cambió entre el SELECT y el UPDATE
+            result = db.session.execute(
+                update(Appointment)
+                .where(Appointment.id.in_([row.id for row in rows]), Appointment.status == old_status)
+                .values(status=new_status, updated_at=datetime.utcnow())
+                .execution_options(synchronize_session=False)
+            )
+            db.session.commit()
+            updated += result.rowcount
+            metrics['batches'] += 1
+
+            # El UPDATE masivo no pasa por los hooks de sesión: un evento por día afectado
+            # para invalidar la agenda y avisar a los clientes SSE
+            days = sorted({row.appointment_date.date() for row in rows})
+            broker.publish([
+                {'type': 'appointment.swept', 'topic': 'appointments', 'appointment_date': day.isoformat(), 'status': new_status}
+                for day in days
+            ])
+        metrics['transitions'][key] = updated
+
+    expired_offers = (WaitlistEntry.status == 'ofrecida', WaitlistEntry.offer_expires_at <= now)
+    if dry_run:
+        metrics['expired_offers'] = db.session.query(func.count(WaitlistEntry.id)).filter(*expired_offers).scalar()
+    else:
+        metrics['expired_offers'], metrics['reoffered'] = reoffer_expired_offers(now)
+
+    metrics['active_remaining'] = db.session.query(func.count(Appointment.id)).filter(
+        Appointment.status.in_(['pendiente', 'confirmada'])
+    ).scalar()
+    metrics['elapsed_ms'] = round((time.monotonic() - started) * 1000, 1)
+
+    if not dry_run:
+        cache.set(LAST_RUN_KEY, metrics, ttl=LAST_RUN_TTL)
+        logger.info('Barrido de citas: %s', metrics)
+    return metrics
+
+def reoffer_expired_offers(now=None, limit=REOFFER_BATCH_SIZE):
+    """
+    Ofertas de la lista de espera vencidas sin respuesta: la solicitud vuelve a la espera y,
+    si la hora sigue libre y es futura, pasa al siguiente candidato. Devuelve (vencidas, reofrecidas).
+    """
+    now = now or datetime.now()
+    expired = WaitlistEntry.query.filter(
+        WaitlistEntry.status == 'ofrecida', WaitlistEntry.offer_expires_at <= now
+    ).order_by(WaitlistEntry.offer_expires_at).limit(limit).all()
+    slots = [(entry.id, release_offer(entry)) for entry in expired]
+    db.session.commit()
+
+    reoffered = 0
+    for entry_id, (doctor_id, start, duration) in slots:
+        if start is None or start <= now or find_conflicts(doctor_id, [(start, duration)]):
+            continue
+        if offer_freed_slot(doctor_id, start, duration, exclude_ids=[entry_id], now=now):
+            reoffered += 1
+    return len(expired), reoffered
+
+def last_sweep():
+    return cache.get(LAST_RUN_KEY)
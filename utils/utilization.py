@@ -0,0 +1,82 @@
+from datetime import date, timedelta
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+
+# Cálculo de ocupación de médicos sobre arreglos simples (minutos desde 1970-01-01).
+# No importa modelos ni la app: las funciones se pueden ejecutar en procesos hijos.
+
+MINUTES_PER_DAY = 1440
+EPOCH = date(1970, 1, 1)            # Jueves: los lunes son los días con (día + 3) % 7 == 0
+
+def merge_intervals(starts, ends):
+    """Une intervalos [inicio, fin) ordenados por inicio; devuelve (inicios, fines) sin solapes"""
+    merged_starts, merged_ends = [], []
+    for start, end in zip(starts, ends):
+        if merged_ends and start <= merged_ends[-1]:
+            if end > merged_ends[-1]:
+                merged_ends[-1] = end
+        else:
+            merged_starts.append(start)
+            merged_ends.append(end)
+    return merged_starts, merged_ends
+
+def _week_of(minute):
+    return (minute // MINUTES_PER_DAY + 3) // 7
+
+def week_start(week):
+    return EPOCH + timedelta(days=week * 7 - 3)
+
+def doctor_report(item):
+    """
+    Estadísticas semanales de un médico.
+    item = (doctor_id, starts, durations, statuses, available_minutes), con starts ordenado.
+    """
+    doctor_id, starts, durations, statuses, available_minutes = item
+    weeks = {}
+    for start, duration, status in zip(starts, durations, statuses):
+        week = weeks.setdefault(_week_of(start), {'starts': [], 'ends': [], 'total': 0, 'cancelled': 0, 'no_show': 0})
+        week['total'] += 1
+        if status == 'cancelada':
+            week['cancelled'] += 1
+            continue
+        if status == 'no_asistio':
+            week['no_show'] += 1
+        week['starts'].append(start)
+        week['ends'].append(start + (duration or 0))
+
+    report = []
+    for week, data in sorted(weeks.items()):
+        scheduled = sum(end - start for start, end in zip(data['starts'], data['ends']))
+        merged_starts, merged_ends = merge_intervals(data['starts'], data['ends'])
+        booked = sum(end - start for start, end in zip(merged_starts, merged_ends))
+
+        # Huecos entre citas consecutivas del mismo día
+        gaps = [
+            next_start - previous_end
+            for previous_end, next_start in zip(merged_ends, merged_starts[1:])
+            if previous_end // MINUTES_PER_DAY == next_start // MINUTES_PER_DAY
+        ]
+        attended = data['total'] - data['cancelled']
+        report.append({
+            'week': week,
+            'appointments': data['total'],
+            'scheduled_minutes': scheduled,
+            'booked_minutes': booked,
+            'overlap_minutes': scheduled - booked,
+            'idle_gap_minutes': sum(gaps),
+            'max_idle_gap_minutes': max(gaps, default=0),
+            'utilization': round(booked / available_minutes, 4) if available_minutes else None,
+            'cancellation_rate': round(data['cancelled'] / data['total'], 4),
+            'no_show_rate': round(data['no_show'] / attended, 4) if attended else None
+        })
+    return doctor_id, report
+
+def utilization_report(items, workers=0):
+    """
+    Aplica doctor_report a cada médico. Con workers > 0 reparte los médicos en un pool de
+    procesos (spawn: no hereda conexiones ni hilos del servidor).
+    """
+    if workers:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+            return dict(pool.map(doctor_report, items, chunksize=max(1, len(items) // (workers * 4))))
+    return dict(map(doctor_report, items))
@@ -0,0 +1,45 @@
+import re
+
+_BLOOD_PRESSURE = re.compile(r'^\s*(\d{2,3})\s*/\s*(\d{2,3})')
+
+def parse_blood_pressure(value):
+    """'120/80' -> (120, 80); (None, None) si el texto no tiene el formato sistólica/diastólica"""
+    match = _BLOOD_PRESSURE.match(value or '')
+    if not match:
+        return None, None
+    return int(match.group(1)), int(match.group(2))
+
+def lttb(xs, ys, threshold):
+    """
+    Largest-Triangle-Three-Buckets: índices de a lo sumo `threshold` puntos que conservan
+    la forma visual de la serie (picos y valles), incluidos el primero y el último.
+    xs debe estar ordenado de menor a mayor.
+    """
+    n = len(xs)
+    if threshold >= n or threshold < 3:
+        return list(range(n))
+
+    selected = [0]
+    bucket_size = (n - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        start = int(i * bucket_size) + 1
+        end = int((i + 1) * bucket_size) + 1
+
+        # Promedio del bucket siguiente (el último punto para el bucket final)
+        next_start, next_end = end, min(int((i + 2) * bucket_size) + 1, n)
+        count = next_end - next_start
+        avg_x = sum(xs[next_start:next_end]) / count
+        avg_y = sum(ys[next_start:next_end]) / count
+
+        best, best_area = start, -1.0
+        ax, ay = xs[a], ys[a]
+        for j in range(start, end):
+            area = abs((ax - avg_x) * (ys[j] - ay) - (ax - xs[j]) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = j, area
+        selected.append(best)
+        a = best
+
+    selected.append(n - 1)
+    return selected
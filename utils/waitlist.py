@@ -0,0 +1,137 @@
+import logging
+import threading
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import select, func, and_, or_
+from models import db, User, Patient, WaitlistEntry, WaitlistWindow
+from utils.notifiers import build_notifier
+
+logger = logging.getLogger(__name__)
+
+# Ofertas automáticas de la lista de espera: cuando una cita se cancela o elimina, la hora
+# liberada se reserva para el mejor candidato y se le avisa sin intervención de recepción.
+
+OFFER_HOLD = timedelta(hours=2)     # Tiempo que la hora queda reservada para el paciente notificado
+
+def _window_contains(start, end):
+    """Ventanas que contienen [start, end): en PostgreSQL usa el índice GiST sobre tsrange"""
+    if db.engine.dialect.name == 'postgresql':
+        return func.tsrange(WaitlistWindow.window_start, WaitlistWindow.window_end).op('@>')(func.tsrange(start, end))
+    return and_(WaitlistWindow.window_start <= start, WaitlistWindow.window_end >= end)
+
+def _available(now):
+    """Solicitudes que pueden recibir una oferta (incluye ofertas vencidas sin respuesta)"""
+    return or_(
+        WaitlistEntry.status == 'activa',
+        and_(WaitlistEntry.status == 'ofrecida', WaitlistEntry.offer_expires_at < now)
+    )
+
+def held_offers(doctor_id, start, end, exclude_entry_id=None, now=None):
+    """Ofertas vigentes del médico que se solapan con [start, end): esas horas siguen reservadas"""
+    now = now or datetime.now()
+    conditions = [
+        WaitlistEntry.status == 'ofrecida',
+        WaitlistEntry.offered_doctor_id == doctor_id,
+        WaitlistEntry.offer_expires_at > now,
+        WaitlistEntry.offered_date < end,
+        WaitlistEntry.offered_date > start - timedelta(days=1)     # Ninguna cita dura más de un día
+    ]
+    if exclude_entry_id is not None:
+        conditions.append(WaitlistEntry.id != exclude_entry_id)
+    return [
+        entry for entry in WaitlistEntry.query.filter(*conditions).all()
+        if entry.offered_date + timedelta(minutes=entry.offered_duration or 0) > start
+    ]
+
+def find_candidates(doctor, start, duration, exclude_ids=(), limit=1, now=None):
+    """
+    Mejores solicitudes para la hora [start, start + duration) del médico: alguna ventana la
+    contiene, piden ese médico (o su especialidad) y caben en la duración. Orden: prioridad
+    descendente y luego antigüedad. Las filas quedan bloqueadas (FOR UPDATE SKIP LOCKED en
+    PostgreSQL) para que dos cancelaciones simultáneas no ofrezcan a la misma persona.
+    """
+    now = now or datetime.now()
+    end = start + timedelta(minutes=duration)
+    matching_window = select(WaitlistWindow.id).where(
+        WaitlistWindow.entry_id == WaitlistEntry.id,
+        or_(
+            WaitlistWindow.doctor_id == doctor.id,
+            and_(WaitlistWindow.doctor_id.is_(None), WaitlistWindow.specialty == doctor.specialty)
+        ),
+        _window_contains(start, end)
+    ).exists()
+    conditions = [_available(now), WaitlistEntry.duration_minutes <= duration, matching_window]
+    if exclude_ids:
+        conditions.append(WaitlistEntry.id.notin_(list(exclude_ids)))
+    return db.session.execute(
+        select(WaitlistEntry).where(*conditions)
+        .order_by(WaitlistEntry.priority.desc(), WaitlistEntry.created_at, WaitlistEntry.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True, of=WaitlistEntry)
+    ).scalars().all()
+
+def _offer_payload(entry, doctor):
+    patient = db.session.get(Patient, entry.patient_id)
+    return {
+        'kind': 'waitlist_offer',
+        'waitlist_id': entry.id,
+        'appointment_date': entry.offered_date.isoformat(),
+        'appointment_type': entry.appointment_type,
+        'doctor_name': doctor.full_name,
+        'patient_name': patient.full_name if patient else None,
+        'patient_email': patient.email if patient else None,
+        'patient_phone': patient.phone if patient else None,
+        'offer_expires_at': entry.offer_expires_at.isoformat()
+    }
+
+def _notify_async(payload):
+    """El envío (SMTP, webhook) va en un hilo: no consume el tiempo de la petición de cancelación"""
+    notifier = build_notifier(current_app.config)
+
+    def send():
+        try:
+            notifier.send_batch([payload])
+        except Exception:
+            logger.exception('No se pudo notificar la oferta de lista de espera %s', payload['waitlist_id'])
+
+    threading.Thread(target=send, name='waitlist-offer', daemon=True).start()
+
+def release_offer(entry):
+    """La solicitud vuelve a la espera; devuelve la hora que tenía reservada (médico, inicio, duración)"""
+    slot = (entry.offered_doctor_id, entry.offered_date, entry.offered_duration)
+    entry.status = 'activa'
+    entry.offered_doctor_id = entry.offered_date = entry.offered_duration = entry.offer_expires_at = None
+    return slot
+
+def offer_freed_slot(doctor_id, start, duration, exclude_ids=(), now=None):
+    """
+    Ofrece una hora recién liberada al mejor candidato de la lista de espera.
+    Se llama después del commit de la cancelación; un error aquí nunca la revierte.
+    Devuelve la solicitud ofrecida (dict) o None.
+    """
+    now = now or datetime.now()
+    if doctor_id is None or start is None or start <= now:
+        return None
+    try:
+        doctor = db.session.get(User, doctor_id)
+        if doctor is None:
+            return None
+        candidates = find_candidates(doctor, start, duration or 30, exclude_ids, now=now)
+        if not candidates:
+            db.session.rollback()                   # Libera los bloqueos de la búsqueda
+            return None
+
+        entry = candidates[0]
+        entry.status = 'ofrecida'
+        entry.offered_doctor_id = doctor.id
+        entry.offered_date = start
+        entry.offered_duration = duration or 30
+        entry.offer_expires_at = min(now + OFFER_HOLD, start)
+        db.session.commit()
+
+        _notify_async(_offer_payload(entry, doctor))
+        return entry.to_dict()
+    except Exception:
+        db.session.rollback()
+        logger.exception('Error buscando candidatos de lista de espera para el médico %s', doctor_id)
+        return None